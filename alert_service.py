@@ -0,0 +1,131 @@
+"""
+خدمة تنبيهات انتهاء الاشتراكات في الخلفية
+تقرأ التنبيهات المستحقة التي لم تُرسل من فهرس جزئي وتسجل لكل عميل تاريخ
+الانتهاء الذي أُرسل تنبيهه، لذلك يعتمد عمل كل استيقاظ على عدد التنبيهات
+المستحقة فقط وليس على عدد العملاء، ولا يتكرر التنبيه بعد إعادة التشغيل،
+ويُنبه العميل المضاف أو المجدد حتى لو كان موعد تنبيهه قد مضى.
+
+على Android تعمل كخدمة (services في buildozer.spec) وتستقبل مسار قاعدة
+البيانات في PYTHON_SERVICE_ARGUMENT، وعلى Linux يمكن تشغيلها مباشرة:
+    python alert_service.py --db subscriptions.db --once
+"""
+
+import argparse
+import os
+import threading
+from datetime import datetime
+
+from repository import DB_PATH, CustomerRepository
+
+APP_NAME = 'Subscription Manager'
+
+# عدد العملاء في كل إشعار
+BATCH_SIZE = 10
+
+# أقصى مدة نوم، حتى تُلتقط تنبيهات العملاء المضافين من الواجهة أثناء النوم
+MAX_SLEEP = 60 * 60
+
+
+def print_notification(title, message):
+    """إشعار نصي عند عدم توفر plyer (Linux بدون واجهة)"""
+    print(f'{title}: {message}')
+
+
+def default_notifier():
+    """إشعارات النظام عبر plyer إن وُجدت"""
+    try:
+        from plyer import notification
+    except ImportError:
+        return print_notification
+
+    def notify(title, message):
+        notification.notify(title=title, message=message, app_name=APP_NAME)
+    return notify
+
+
+class AlertService:
+    """إرسال تنبيهات انتهاء الاشتراكات من طابور مرتب حسب موعد التنبيه"""
+
+    def __init__(self, repo, notify=print_notification, batch_size=BATCH_SIZE,
+                 max_sleep=MAX_SLEEP, now=datetime.now):
+        """
+        notify: دالة (title, message) لإظهار الإشعار
+        now: مصدر الوقت الحالي (يمكن تبديله عند التجربة)
+        """
+        self.repo = repo
+        self.notify = notify
+        self.batch_size = batch_size
+        self.max_sleep = max_sleep
+        self.now = now
+        self.stopped = threading.Event()
+
+    def today(self):
+        """تاريخ اليوم بصيغة قاعدة البيانات"""
+        return self.now().date().isoformat()
+
+    def run_once(self):
+        """إرسال كل التنبيهات المستحقة على دفعات، ويعيد عدد العملاء"""
+        today = self.today()
+        sent = 0
+
+        while not self.stopped.is_set():
+            batch = self.repo.due_alerts(today, self.batch_size)
+            if not batch:
+                break
+
+            self.notify(*self.format_batch(batch))
+            self.repo.mark_alerted(batch)
+            sent += len(batch)
+
+            if len(batch) < self.batch_size:
+                break
+
+        return sent
+
+    def format_batch(self, batch):
+        """عنوان ونص إشعار دفعة من العملاء"""
+        title = f'اشتراكات قاربت على الانتهاء ({len(batch)})'
+        message = '، '.join(f"{c['name']} ({c['end_date']})" for c in batch)
+        return title, message
+
+    def seconds_until_next(self):
+        """مدة النوم حتى موعد التنبيه التالي"""
+        now = self.now()
+        next_date = self.repo.next_alert_date(now.date().isoformat())
+        if next_date is None:
+            return self.max_sleep
+
+        wake = datetime.fromisoformat(next_date)
+        return max(1, min(self.max_sleep, (wake - now).total_seconds()))
+
+    def run_forever(self):
+        """حلقة الخدمة: إرسال المستحق ثم النوم حتى الموعد التالي"""
+        while not self.stopped.is_set():
+            self.run_once()
+            self.stopped.wait(self.seconds_until_next())
+
+    def stop(self):
+        """إيقاف الحلقة (من thread آخر)"""
+        self.stopped.set()
+
+
+def main():
+    """نقطة تشغيل الخدمة"""
+    parser = argparse.ArgumentParser(description='خدمة تنبيهات انتهاء الاشتراكات')
+    parser.add_argument('--db', default=os.environ.get('PYTHON_SERVICE_ARGUMENT') or DB_PATH)
+    parser.add_argument('--once', action='store_true', help='إرسال المستحق ثم الخروج')
+    args = parser.parse_args()
+
+    repo = CustomerRepository(args.db)
+    service = AlertService(repo, notify=default_notifier())
+    try:
+        if args.once:
+            service.run_once()
+        else:
+            service.run_forever()
+    finally:
+        repo.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+"""
+إحصائيات الاشتراكات: الإيراد الشهري والمشتركون النشطون لكل باقة ونسبة التجديد
+والإيراد المتوقع. تُحسب من جدول ملخص يومي لكل (يوم, باقة) تحدّثه triggers
+عند كل إضافة أو تعديل أو حذف، لذلك يعتمد زمن الاستعلام على عدد الأيام
+والباقات فقط وليس على عدد العملاء.
+
+يُعتبر التعديل تجديداً إذا تأخر تاريخا البداية والانتهاء معاً، وعندها تبقى
+الفترة السابقة في الملخص (تنتهي قبل بداية الجديدة) ويُحسب لها تجديد.
+أي تعديل آخر يُعامل كتصحيح: تُحذف مساهمة الصف القديم وتُضاف الجديدة.
+"""
+
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+# أعمدة الملخص اليومي
+# revenue/starts: حسب تاريخ بداية الاشتراك، ends/ends_amount/renewals: حسب تاريخ انتهائه
+# ends_amount: مبالغ الفترات المنتهية التي لم تُجدد بعد (أساس الإيراد المتوقع)
+SUMMARY_COLUMNS = ('revenue', 'starts', 'ends', 'ends_amount', 'renewals')
+
+# فترة حساب نسبة التجديد والإيراد المتوقع (بالأيام)
+ANALYTICS_DAYS = 30
+
+# عدد الشهور في جدول الإيراد الشهري
+REVENUE_MONTHS = 12
+
+INSERT_TRIGGER_NAME = 'customers_summary_insert'
+UPDATE_TRIGGER_NAMES = ('customers_summary_update', 'customers_summary_renew')
+
+
+def summary_upsert_sql(day, package, **values):
+    """إضافة قيم إلى صف الملخص (day, package) أو إنشاؤه"""
+    columns = ', '.join(SUMMARY_COLUMNS)
+    params = ', '.join(str(values.get(column, 0)) for column in SUMMARY_COLUMNS)
+    updates = ', '.join(f'{column} = {column} + excluded.{column}' for column in SUMMARY_COLUMNS)
+    return f'''
+        INSERT INTO daily_summary (day, package, {columns}) VALUES ({day}, {package}, {params})
+        ON CONFLICT (day, package) DO UPDATE SET {updates};
+    '''
+
+
+def add_period_sql(prefix, sign=''):
+    """مساهمة فترة اشتراك في الملخص (sign='-' لحذفها)"""
+    p = prefix
+    return (
+        summary_upsert_sql(f'{p}start_date', f'{p}package', revenue=f'{sign}{p}amount', starts=f'{sign}1')
+        + summary_upsert_sql(f'{p}end_date', f'{p}package', ends=f'{sign}1', ends_amount=f'{sign}{p}amount')
+    )
+
+
+RENEWAL_WHEN_SQL = 'new.start_date > old.start_date AND new.end_date > old.end_date'
+
+# الفترة السابقة تنتهي على الأكثر قبل بداية الجديدة بيوم (حتى لا يُحسب العميل مرتين)
+RENEWED_END_SQL = "MIN(old.end_date, date(new.start_date, '-1 day'))"
+
+INSERT_TRIGGER_SQL = f'''
+    CREATE TRIGGER IF NOT EXISTS {INSERT_TRIGGER_NAME} AFTER INSERT ON customers
+    BEGIN
+        {add_period_sql('new.')}
+    END
+'''
+
+TRIGGERS_SQL = f'''
+    CREATE TRIGGER IF NOT EXISTS customers_summary_delete AFTER DELETE ON customers
+    BEGIN
+        {add_period_sql('old.', '-')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS customers_summary_update
+    AFTER UPDATE OF package, amount, start_date, end_date ON customers
+    WHEN NOT ({RENEWAL_WHEN_SQL})
+    BEGIN
+        {add_period_sql('old.', '-')}
+        {add_period_sql('new.')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS customers_summary_renew
+    AFTER UPDATE OF package, amount, start_date, end_date ON customers
+    WHEN {RENEWAL_WHEN_SQL}
+    BEGIN
+        {summary_upsert_sql('old.end_date', 'old.package', ends='-1', ends_amount='-old.amount')}
+        {summary_upsert_sql(RENEWED_END_SQL, 'old.package', ends='1', renewals='1')}
+        {add_period_sql('new.')}
+    END;
+'''
+
+
+def backfill_sql(where=''):
+    """إضافة مساهمة مجموعة من العملاء إلى الملخص دفعة واحدة"""
+    columns = ', '.join(SUMMARY_COLUMNS)
+    updates = ', '.join(f'{column} = {column} + excluded.{column}' for column in SUMMARY_COLUMNS)
+    # WHERE true مطلوبة قبل ON CONFLICT بعد SELECT لتجنب غموض الصياغة
+    return f'''
+        INSERT INTO daily_summary (day, package, {columns})
+        SELECT day, package, SUM(revenue), SUM(starts), SUM(ends), SUM(ends_amount), 0 FROM (
+            SELECT start_date AS day, package, amount AS revenue, 1 AS starts, 0 AS ends, 0 AS ends_amount
+            FROM customers {where}
+            UNION ALL
+            SELECT end_date, package, 0, 0, 1, amount FROM customers {where}
+        ) WHERE true GROUP BY day, package
+        ON CONFLICT (day, package) DO UPDATE SET {updates}
+    '''
+
+
+BACKFILL_SQL = backfill_sql()
+BACKFILL_NEW_SQL = backfill_sql('WHERE id > :last_id')
+
+MONTHLY_REVENUE_SQL = '''
+    SELECT substr(day, 1, 7) AS month, SUM(revenue) FROM daily_summary
+    WHERE day >= ? AND day <= ?
+    GROUP BY month ORDER BY month
+'''
+ACTIVE_BY_PACKAGE_SQL = '''
+    SELECT package,
+        SUM(CASE WHEN day <= ? THEN starts ELSE 0 END) - SUM(CASE WHEN day < ? THEN ends ELSE 0 END) AS active
+    FROM daily_summary
+    GROUP BY package HAVING active > 0
+    ORDER BY active DESC
+'''
+RENEWALS_SQL = '''
+    SELECT COALESCE(SUM(renewals), 0), COALESCE(SUM(ends), 0) FROM daily_summary
+    WHERE day >= ? AND day < ?
+'''
+# الفترة المجددة تبقى في ends مع renewals، فالمستحق = ends - renewals (مثل ends_amount)
+DUE_AMOUNT_SQL = '''
+    SELECT COALESCE(SUM(ends_amount), 0), COALESCE(SUM(ends - renewals), 0) FROM daily_summary
+    WHERE day >= ? AND day < ?
+'''
+# دمج صفوف ملخص باقة في صفوف اسمها الجديد
+RENAME_PACKAGE_SQL = f'''
+    INSERT INTO daily_summary (day, package, {', '.join(SUMMARY_COLUMNS)})
+    SELECT day, :new, {', '.join(SUMMARY_COLUMNS)} FROM daily_summary WHERE package = :old
+    ON CONFLICT (day, package) DO UPDATE SET {', '.join(f'{c} = {c} + excluded.{c}' for c in SUMMARY_COLUMNS)}
+'''
+
+
+# فترات العميل السابقة (المجددة) في سجل الاشتراكات مع بداية الفترة التالية لكل منها
+RENEWED_PERIODS_SQL = '''
+    SELECT * FROM (
+        SELECT start_date, end_date, package, amount, (
+            SELECT next.start_date FROM subscriptions AS next
+            WHERE next.customer_id = previous.customer_id AND next.id > previous.id
+            ORDER BY next.id LIMIT 1
+        ) AS next_start
+        FROM subscriptions AS previous
+        WHERE customer_id = old.id AND id != old.current_subscription_id
+    ) WHERE next_start IS NOT NULL
+'''
+
+
+def summary_upsert_select_sql(select):
+    """
+    إضافة صفوف (day, package, ...أعمدة الملخص) من استعلام إلى الملخص
+    الاستعلام ينتهي بـ WHERE لتجنب غموض الصياغة قبل ON CONFLICT
+    """
+    columns = ', '.join(SUMMARY_COLUMNS)
+    updates = ', '.join(f'{column} = {column} + excluded.{column}' for column in SUMMARY_COLUMNS)
+    return f'''
+        INSERT INTO daily_summary (day, package, {columns})
+        {select}
+        ON CONFLICT (day, package) DO UPDATE SET {updates};
+    '''
+
+
+# حذف العميل يحذف سجل اشتراكاته، فتُحذف فتراته المجددة من الملخص أيضاً (بعكس ما أضافه
+# trigger التجديد) وليس فترته الحالية فقط، وإلا تبقى نافذة الفترة السابقة نشطة بعد الحذف.
+# BEFORE لأن سجل الاشتراكات يُحذف مع العميل (ON DELETE CASCADE)
+DELETE_RENEWED_TRIGGER_SQL = f'''
+    CREATE TRIGGER IF NOT EXISTS customers_summary_delete_renewed BEFORE DELETE ON customers
+    BEGIN
+        {summary_upsert_select_sql(
+            f'SELECT start_date, package, -amount, -1, 0, 0, 0 FROM ({RENEWED_PERIODS_SQL}) WHERE true'
+        )}
+        {summary_upsert_select_sql(
+            "SELECT MIN(end_date, date(next_start, '-1 day')), package, 0, 0, -1, 0, -1 "
+            f'FROM ({RENEWED_PERIODS_SQL}) WHERE true'
+        )}
+    END
+'''
+
+
+def setup_renewed_delete(conn):
+    """trigger حذف الفترات المجددة مع العميل (بعد إنشاء سجل الاشتراكات)"""
+    conn.execute(DELETE_RENEWED_TRIGGER_SQL)
+
+
+def create_triggers(conn):
+    """triggers الحذف والتعديل والتجديد (الموجود منها لا يتغير)"""
+    for statement in TRIGGERS_SQL.split('END;'):
+        if statement.strip():
+            conn.execute(statement + 'END')
+
+
+def setup_summary(conn):
+    """إنشاء جدول الملخص اليومي وربطه بجدول العملاء (يُستدعى داخل معاملة)"""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'daily_summary'").fetchone() is not None
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_summary (
+            day TEXT NOT NULL,
+            package TEXT NOT NULL,
+            revenue REAL NOT NULL DEFAULT 0,
+            starts INTEGER NOT NULL DEFAULT 0,
+            ends INTEGER NOT NULL DEFAULT 0,
+            ends_amount REAL NOT NULL DEFAULT 0,
+            renewals INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, package)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute(INSERT_TRIGGER_SQL)
+    create_triggers(conn)
+
+    # ملخص العملاء الموجودين مسبقاً عند إنشاء الجدول لأول مرة
+    if not exists:
+        conn.execute(BACKFILL_SQL)
+
+
+@contextmanager
+def deferred_summary(conn):
+    """
+    إيقاف تحديث الملخص صفاً بصف أثناء إدراج كمية كبيرة من العملاء ثم تجميعهم دفعة واحدة
+    يجب استخدامه داخل معاملة حتى يُستعاد الـ trigger عند التراجع
+    """
+    last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM customers').fetchone()[0]
+    conn.execute(f'DROP TRIGGER IF EXISTS {INSERT_TRIGGER_NAME}')
+    yield
+    conn.execute(BACKFILL_NEW_SQL, {'last_id': last_id})
+    conn.execute(INSERT_TRIGGER_SQL)
+
+
+@contextmanager
+def renamed_package(conn, old, new):
+    """
+    إعادة تسمية باقة في الملخص: تُوقف triggers التعديل أثناء تغيير اسم الباقة في جدول
+    العملاء (الفترات نفسها لا تتغير)، ثم تُنقل كل صفوف الاسم القديم إلى الجديد دفعة واحدة
+    يجب استخدامه داخل معاملة حتى تُستعاد الـ triggers عند التراجع
+    """
+    for name in UPDATE_TRIGGER_NAMES:
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+    yield
+    conn.execute(RENAME_PACKAGE_SQL, {'old': old, 'new': new})
+    conn.execute('DELETE FROM daily_summary WHERE package = ?', (old,))
+    create_triggers(conn)
+
+
+def month_start(day, months_back):
+    """أول يوم في الشهر قبل عدد من الشهور"""
+    month = day.year * 12 + day.month - 1 - months_back
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def dashboard(conn, today=None, days=ANALYTICS_DAYS, months=REVENUE_MONTHS):
+    """جميع أرقام لوحة الإحصائيات"""
+    today = today or date.today()
+    today_text = today.isoformat()
+    window_start = (today - timedelta(days=days)).isoformat()
+    window_end = (today + timedelta(days=days)).isoformat()
+
+    monthly = conn.execute(
+        MONTHLY_REVENUE_SQL, (month_start(today, months - 1).isoformat(), today_text)
+    ).fetchall()
+    active = conn.execute(ACTIVE_BY_PACKAGE_SQL, (today_text, today_text)).fetchall()
+
+    renewals, ended = conn.execute(RENEWALS_SQL, (window_start, today_text)).fetchone()
+    renewal_rate = renewals / ended if ended else None
+
+    due_amount, due_count = conn.execute(DUE_AMOUNT_SQL, (today_text, window_end)).fetchone()
+    # بدون تاريخ تجديد كافٍ يُفترض تجديد كل الاشتراكات المستحقة
+    expected = due_amount * (renewal_rate if renewal_rate is not None else 1)
+
+    return {
+        'monthly_revenue': monthly,
+        'active_by_package': active,
+        'active_total': sum(count for package, count in active),
+        'renewals': renewals,
+        'ended': ended,
+        'renewal_rate': renewal_rate,
+        'churn_rate': 1 - renewal_rate if renewal_rate is not None else None,
+        'due_count': due_count,
+        'due_amount': due_amount,
+        'expected_revenue': expected,
+        'days': days
+    }
@@ -0,0 +1,337 @@
+"""
+نسخ احتياطي تزايدي مضغوط لقاعدة البيانات واستعادتها
+تُؤخذ لقطة متسقة بواجهة SQLite backup على اتصال مستقل (على دفعات حتى لا
+تُحجب الكتابة)، ثم تُقسم إلى صفحات ويُحفظ كل صفحة لم تُحفظ من قبل مرة واحدة
+فقط مضغوطة في ملف pack خاص باللقطة. كل لقطة لها manifest بقائمة بصمات صفحاتها
+بالترتيب، وفهرس مشترك index.json يحدد مكان كل صفحة:
+
+    backups/
+        index.json                      بصمة الصفحة -> (pack, موضع, طول)
+        20261018_101500.json            manifest اللقطة
+        20261018_101500.pack            الصفحات الجديدة في هذه اللقطة
+
+الاستعادة تتحقق من بصمة كل صفحة ومن سلامة القاعدة (quick_check) قبل استبدال
+الملف، وعند حذف اللقطات القديمة تُنقل صفحاتها التي ما زالت مستخدمة إلى pack جديد.
+
+النسخ والحذف والاستعادة تعمل واحدة في كل مرة: قفل للـ threads في نفس العملية
+وقفل ملف (.lock) للعمليات الأخرى مثل سطر الأوامر.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: قفل الـ threads فقط
+    fcntl = None
+
+BACKUP_DIR = 'backups'
+INDEX_FILE = 'index.json'
+LOCK_FILE = '.lock'
+
+# قفل مشترك بين كل كائنات BackupStore في العملية (النسخ التلقائي وزر النسخ لهما كائنان مختلفان)
+STORE_LOCK = threading.Lock()
+
+# عدد اللقطات المحتفظ بها
+KEEP_SNAPSHOTS = 7
+
+# أقل فترة بين النسخ التلقائية (بالساعات)
+AUTO_BACKUP_HOURS = 24
+
+# عدد الصفحات المنسوخة في كل خطوة من backup (يسمح للكتابة بالاستمرار بين الخطوات)
+BACKUP_STEP_PAGES = 1024
+
+COMPRESS_LEVEL = 6
+
+# أقصى انتظار (بالثواني) لإغلاق الاتصالات الأخرى بالقاعدة قبل الاستعادة
+RESTORE_WAIT_SECONDS = 10
+
+# اسم اللقطة بطول ثابت حتى الميكروثانية، وترتيبها الفعلي برقمها التسلسلي في الـ manifest
+SNAPSHOT_FORMAT = '%Y%m%d_%H%M%S_%f'
+
+
+class BackupError(Exception):
+    """نسخة احتياطية تالفة أو غير موجودة"""
+    pass
+
+
+def page_hash(page):
+    """بصمة صفحة"""
+    return hashlib.blake2b(page, digest_size=16).hexdigest()
+
+
+def write_json(path, data):
+    """كتابة JSON بشكل ذري (ملف مؤقت ثم استبدال)"""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def read_json(path, default=None):
+    """قراءة JSON أو القيمة الافتراضية إن لم يوجد الملف"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def snapshot_database(db_path, snapshot_path, step_pages=BACKUP_STEP_PAGES):
+    """نسخة متسقة من القاعدة بواجهة backup، ويعيد حجم الصفحة"""
+    source = sqlite3.connect(db_path, timeout=10)
+    try:
+        target = sqlite3.connect(snapshot_path)
+        try:
+            source.backup(target, pages=step_pages)
+        finally:
+            target.close()
+        return source.execute('PRAGMA page_size').fetchone()[0]
+    finally:
+        source.close()
+
+
+class BackupStore:
+    """لقطات قاعدة البيانات في مجلد النسخ الاحتياطي"""
+
+    def __init__(self, directory=BACKUP_DIR):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_FILE)
+
+    def path(self, name):
+        """مسار ملف داخل مجلد النسخ"""
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def locked(self):
+        """تنفيذ عملية على المجلد دون أي نسخ أو حذف أو استعادة آخر في نفس الوقت"""
+        os.makedirs(self.directory, exist_ok=True)
+        with STORE_LOCK, open(self.path(LOCK_FILE), 'a') as lock_file:
+            if fcntl is not None:
+                # يُحرر القفل عند إغلاق الملف
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def snapshots(self):
+        """أسماء اللقطات من الأقدم إلى الأحدث (حسب رقمها التسلسلي ثم الاسم للنسخ القديمة بدون رقم)"""
+        if not os.path.isdir(self.directory):
+            return []
+        names = [
+            name[:-5] for name in os.listdir(self.directory)
+            if name.endswith('.json') and name != INDEX_FILE
+        ]
+        return sorted(names, key=lambda name: (self.manifest(name).get('sequence', 0), name))
+
+    def manifest(self, snapshot):
+        """بيانات لقطة"""
+        manifest = read_json(self.path(snapshot + '.json'))
+        if manifest is None:
+            raise BackupError(f'النسخة {snapshot} غير موجودة')
+        return manifest
+
+    def last_backup_time(self):
+        """وقت آخر لقطة أو None"""
+        snapshots = self.snapshots()
+        return datetime.strptime(snapshots[-1][:15], '%Y%m%d_%H%M%S') if snapshots else None
+
+    def backup(self, db_path, keep=KEEP_SNAPSHOTS):
+        """أخذ لقطة جديدة وحفظ الصفحات المتغيرة فقط، ويعيد ملخصها"""
+        with self.locked():
+            return self.take_snapshot(db_path, keep)
+
+    def take_snapshot(self, db_path, keep):
+        """عمل backup بعد أخذ القفل"""
+        started = time.perf_counter()
+        snapshots = self.snapshots()
+        sequence = self.manifest(snapshots[-1]).get('sequence', 0) + 1 if snapshots else 1
+        snapshot = datetime.now().strftime(SNAPSHOT_FORMAT)
+        while os.path.exists(self.path(snapshot + '.json')):
+            snapshot = datetime.now().strftime(SNAPSHOT_FORMAT)
+
+        temp_path = self.path(snapshot + '.db.tmp')
+        index = read_json(self.index_path, {})
+        pages = []
+        written = 0
+        pack_bytes = 0
+        try:
+            page_size = snapshot_database(db_path, temp_path)
+            pack_name = snapshot + '.pack'
+            with open(temp_path, 'rb') as db, open(self.path(pack_name), 'wb') as pack:
+                while True:
+                    page = db.read(page_size)
+                    if not page:
+                        break
+                    digest = page_hash(page)
+                    pages.append(digest)
+                    if digest in index:
+                        continue
+                    data = zlib.compress(page, COMPRESS_LEVEL)
+                    index[digest] = (pack_name, pack_bytes, len(data))
+                    pack.write(data)
+                    pack_bytes += len(data)
+                    written += 1
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        # الفهرس قبل الـ manifest: اللقطة لا تظهر إلا وصفحاتها مفهرسة
+        write_json(self.index_path, index)
+        write_json(self.path(snapshot + '.json'), {
+            'snapshot': snapshot,
+            'sequence': sequence,
+            'page_size': page_size,
+            'pack': pack_name,
+            'pages': pages
+        })
+        self.remove_old(keep)
+
+        return {
+            'snapshot': snapshot,
+            'pages': len(pages),
+            'written': written,
+            'bytes': pack_bytes,
+            'seconds': time.perf_counter() - started
+        }
+
+    def prune(self, keep=KEEP_SNAPSHOTS):
+        """حذف اللقطات الأقدم من آخر keep لقطة ونقل صفحاتها المستخدمة إلى pack جديد"""
+        with self.locked():
+            return self.remove_old(keep)
+
+    def remove_old(self, keep):
+        """عمل prune بعد أخذ القفل"""
+        snapshots = self.snapshots()
+        if len(snapshots) <= keep:
+            return 0
+        removed = snapshots[:-keep]
+        kept = [self.manifest(snapshot) for snapshot in snapshots[-keep:]]
+
+        live = set()
+        for manifest in kept:
+            live.update(manifest['pages'])
+        owned_packs = {manifest['pack'] for manifest in kept}
+
+        index = read_json(self.index_path, {})
+        packs = {entry[0] for entry in index.values()}
+        # packs اللقطات المحذوفة التي فيها صفحات لم تعد مستخدمة: تُنقل صفحاتها المستخدمة فقط
+        stale_packs = {entry[0] for digest, entry in index.items() if digest not in live} - owned_packs
+        carry = sorted(
+            (digest for digest, entry in index.items() if entry[0] in stale_packs and digest in live),
+            key=lambda digest: (index[digest][0], index[digest][1])
+        )
+
+        if carry:
+            # اسم فريد: الحذف مرتين بنفس أحدث لقطة لا يكتب فوق pack ما زال مستخدماً
+            carry_name = f'carry_{uuid.uuid4().hex}.pack'
+            offset = 0
+            handles = {}
+            try:
+                with open(self.path(carry_name), 'wb') as out:
+                    for digest in carry:
+                        data = self.read_page_data(index[digest], handles)
+                        out.write(data)
+                        index[digest] = (carry_name, offset, len(data))
+                        offset += len(data)
+            finally:
+                for handle in handles.values():
+                    handle.close()
+
+        index = {digest: entry for digest, entry in index.items() if digest in live}
+        write_json(self.index_path, index)
+
+        for snapshot in removed:
+            os.remove(self.path(snapshot + '.json'))
+        used_packs = {entry[0] for entry in index.values()} | owned_packs
+        for pack in packs - used_packs:
+            if os.path.exists(self.path(pack)):
+                os.remove(self.path(pack))
+        return len(removed)
+
+    def read_page_data(self, entry, handles):
+        """بيانات صفحة مضغوطة من ملف pack (handles: ملفات packs المفتوحة لإعادة استخدامها)"""
+        pack, offset, length = entry
+        handle = handles.get(pack)
+        if handle is None:
+            handle = handles[pack] = open(self.path(pack), 'rb')
+        handle.seek(offset)
+        return handle.read(length)
+
+    def restore(self, snapshot, db_path):
+        """
+        استعادة لقطة إلى db_path بعد التحقق منها
+        يجب إغلاق كل اتصالات القاعدة قبل الاستدعاء (بما فيها خدمة التنبيهات)
+        """
+        with self.locked():
+            return self.replace_database(snapshot, db_path)
+
+    def replace_database(self, snapshot, db_path):
+        """عمل restore بعد أخذ القفل"""
+        manifest = self.manifest(snapshot)
+        index = read_json(self.index_path, {})
+        temp_path = db_path + '.restore'
+
+        handles = {}
+        try:
+            with open(temp_path, 'wb') as out:
+                for digest in manifest['pages']:
+                    entry = index.get(digest)
+                    if entry is None:
+                        raise BackupError(f'صفحة مفقودة في النسخة {snapshot}')
+                    try:
+                        page = zlib.decompress(self.read_page_data(entry, handles))
+                    except zlib.error:
+                        page = b''
+                    if page_hash(page) != digest:
+                        raise BackupError(f'صفحة تالفة في النسخة {snapshot}')
+                    out.write(page)
+
+            conn = sqlite3.connect(temp_path)
+            try:
+                result = conn.execute('PRAGMA quick_check').fetchone()[0]
+            finally:
+                conn.close()
+            if result != 'ok':
+                raise BackupError(f'النسخة {snapshot} غير سليمة: {result}')
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+        # قفل حصري على اتصال جديد: الخروج من WAL يفشل إن كانت عملية أخرى تفتح القاعدة،
+        # ويبقى القفل حتى استبدال الملف فلا تكتب فيه عملية أخرى أثناء ذلك
+        guard = sqlite3.connect(db_path, timeout=RESTORE_WAIT_SECONDS, isolation_level=None)
+        try:
+            try:
+                mode = guard.execute('PRAGMA journal_mode=DELETE').fetchone()[0]
+                guard.execute('BEGIN EXCLUSIVE')
+            except sqlite3.OperationalError:
+                mode = None
+            if mode != 'delete':
+                os.remove(temp_path)
+                raise BackupError('القاعدة مفتوحة في عملية أخرى، أغلقها ثم أعد المحاولة')
+
+            # ملفات WAL القديمة لا تخص القاعدة المستعادة
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+            os.replace(temp_path, db_path)
+        finally:
+            guard.close()
+        return len(manifest['pages'])
+
+    def needs_backup(self, hours=AUTO_BACKUP_HOURS):
+        """هل مضى على آخر لقطة وقت كافٍ لنسخة تلقائية"""
+        last = self.last_backup_time()
+        return last is None or (datetime.now() - last).total_seconds() >= hours * 3600
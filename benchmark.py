@@ -0,0 +1,305 @@
+"""
+قياس أداء مسار البيانات بدون واجهة
+يُنشئ جداول عملاء وهمية بأسماء عربية وأرقام هواتف وتواريخ متنوعة، ثم يقيس
+زمن وذاكرة كل عملية (تحميل القائمة، البحث، التنبيهات، الإضافة والتعديل
+والحذف، التصدير) ويحفظ النتائج في JSON للمقارنة بين الإصدارات:
+
+    python benchmark.py --sizes 1000,10000 --output after.json --compare before.json
+
+مع --data-dir تُعاد القواعد المولّدة سابقاً، فإذا كانت من إصدار أقدم يُسجل زمن كل ترقية لمخططها.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from backup import BackupStore
+from business import add_months
+from exporter import export_customers
+from records import today_ordinal
+from repository import PAGE_SIZE, CustomerRepository
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# نسبة الزيادة في الزمن التي تُعتبر تراجعاً عند المقارنة
+REGRESSION_RATIO = 1.2
+
+# العمليات الأسرع من هذا الزمن لا تُقارن (فروقها ضجيج قياس)
+MIN_COMPARE_MS = 1.0
+
+FIRST_NAMES = (
+    'محمد', 'أحمد', 'محمود', 'مصطفى', 'علي', 'عمر', 'يوسف', 'إبراهيم', 'خالد', 'حسن',
+    'حسين', 'طارق', 'كريم', 'عبد الله', 'عبد الرحمن', 'سامح', 'هشام', 'وليد', 'إسلام', 'أيمن',
+    'فاطمة', 'مريم', 'آية', 'نورا', 'سارة', 'هدى', 'منى', 'دعاء', 'ياسمين', 'رحمة'
+)
+FAMILY_NAMES = (
+    'السيد', 'عبد العزيز', 'الشافعي', 'المصري', 'حسانين', 'عبد الحميد', 'سليمان', 'رمضان',
+    'عثمان', 'فؤاد', 'الجمال', 'النجار', 'القاضي', 'الشرقاوي', 'منصور', 'زكي', 'شلبي', 'عيسى'
+)
+PACKAGES = (
+    ('باقة 100 جنيه شهرياً', 100, 1),
+    ('باقة 150 جنيه شهرياً', 150, 1),
+    ('باقة 75 جنيه شهرياً', 75, 1),
+    ('باقة 100 جنيه - 3 شهور', 100, 3),
+    ('باقة  جنيه - 6 شهور', 0, 6),
+    ('باقة  جنيه - سنة', 0, 12)
+)
+ARABIC_DIGITS = str.maketrans('0123456789', '٠١٢٣٤٥٦٧٨٩')
+
+GENERATE_CHUNK = 10000
+
+# عدد الصفوف الظاهرة على الشاشة (تُحسب حالتها فقط كما في الواجهة)
+VISIBLE_ROWS = 15
+
+
+def fake_phone(rng):
+    """رقم هاتف مصري بأحد الأشكال التي يكتبها المستخدمون"""
+    number = rng.choice(('010', '011', '012', '015')) + ''.join(rng.choice('0123456789') for _ in range(8))
+    shape = rng.random()
+    if shape < 0.1:
+        return ''
+    if shape < 0.2:
+        return '+2' + number
+    if shape < 0.3:
+        return number.translate(ARABIC_DIGITS)
+    return number
+
+
+def generate_customers(count, seed=1, today=None):
+    """عملاء وهميون بتواريخ موزعة حول اليوم (منتهي وتحذير ونشط)"""
+    rng = random.Random(seed)
+    today = today or date.today()
+
+    for i in range(count):
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(FAMILY_NAMES)}'
+        package, price, months = rng.choice(PACKAGES)
+        # بداية في الماضي وانتهاء حسب مدة الباقة (حتى 4 شهور مضت)
+        start = today - timedelta(days=rng.randint(0, months * 30 + 120))
+        end = add_months(start, months)
+        yield {
+            'name': name,
+            'phone': fake_phone(rng),
+            'package': package,
+            'amount': float(price or rng.choice((500, 900, 1500))),
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            'notification_days': rng.randint(3, 7),
+            'notes': 'ملاحظة' if rng.random() < 0.2 else ''
+        }
+
+
+def create_database(path, count, seed=1):
+    """إنشاء قاعدة بيانات بعدد معين من العملاء، ويعيد زمن الإضافة بالثواني"""
+    repo = CustomerRepository(path)
+    try:
+        started = time.perf_counter()
+        chunk = []
+        for customer in generate_customers(count, seed):
+            chunk.append(customer)
+            if len(chunk) == GENERATE_CHUNK:
+                repo.add_customers(chunk)
+                chunk = []
+        if chunk:
+            repo.add_customers(chunk)
+        return time.perf_counter() - started
+    finally:
+        repo.close()
+
+
+def measure(func, repeat):
+    """أقل ووسيط زمن التنفيذ، ثم أقصى ذاكرة في تشغيل منفصل (tracemalloc يبطئ التنفيذ)"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'min_ms': round(min(times), 3),
+        'median_ms': round(statistics.median(times), 3),
+        'peak_kb': round(peak / 1024, 1)
+    }
+
+
+def show_rows(records):
+    """حساب نص الحالة للصفوف الظاهرة كما تفعل القائمة عند العرض"""
+    today = today_ordinal()
+    for record in records[:VISIBLE_ROWS]:
+        record.status_text(today)
+    return records
+
+
+def operations(repo, work_dir):
+    """عمليات مسار البيانات المقاسة بأسمائها"""
+    sample = repo.list_customers('', None, 1)[0]
+    phone_prefix = ''.join(c for c in sample['phone'] if c.isdigit())[:6] or '0101'
+    new_customer = next(generate_customers(1, seed=99))
+    added = []
+
+    def first_page():
+        show_rows(repo.list_records('', None, PAGE_SIZE))
+
+    def scroll_pages():
+        after = None
+        for _ in range(10):
+            records = show_rows(repo.list_records('', after, PAGE_SIZE))
+            if len(records) < PAGE_SIZE:
+                break
+            after = (records[-1].end_date, records[-1].id)
+
+    def search(term):
+        return lambda: show_rows(repo.list_records(term, None, PAGE_SIZE))
+
+    def add():
+        added.append(repo.get_customer(repo.add_customer(new_customer)))
+
+    def update():
+        repo.update_customer(sample['id'], dict(new_customer, name=sample['name']))
+
+    def delete():
+        # حذف العملاء الذين أضافتهم عملية الإضافة حتى يبقى حجم الجدول ثابتاً
+        if added:
+            repo.delete_customer(added.pop()['id'])
+
+    def export():
+        export_customers(repo, os.path.join(work_dir, 'export.csv'))
+
+    # بعد أول نسخة تُحفظ الصفحات المتغيرة فقط (نتيجة عمليات التعديل السابقة)
+    backups = BackupStore(os.path.join(work_dir, f'backups_{os.path.basename(repo.path)}'))
+
+    return [
+        ('first_page', first_page),
+        ('scroll_10_pages', scroll_pages),
+        ('search_short', search('مح')),
+        ('search_name', search('محمود')),
+        ('search_phone', search(phone_prefix)),
+        ('status_counts', repo.status_counts),
+        ('notifications', repo.notifications),
+        ('new_alerts', lambda: repo.new_alerts((date.today() - timedelta(days=1)).isoformat())),
+        ('add_customer', add),
+        ('update_customer', update),
+        ('delete_customer', delete),
+        ('export_csv', export),
+        ('backup', lambda: backups.backup(repo.path)),
+        ('recompute_end_dates', lambda: repo.recompute_end_dates(sample['package']))
+    ]
+
+
+def run_size(count, repeat, data_dir, seed=1):
+    """قياس كل العمليات على جدول بعدد معين من العملاء"""
+    path = os.path.join(data_dir, f'bench_{count}_{seed}.db')
+    result = {}
+    if not os.path.exists(path):
+        result['generate_s'] = round(create_database(path, count, seed), 3)
+
+    repo = CustomerRepository(path)
+    try:
+        # قاعدة بيانات من إصدار سابق في --data-dir: زمن ترقية مخططها
+        if repo.applied_migrations:
+            result['migrations_ms'] = {name: round(ms, 1) for version, name, ms in repo.applied_migrations}
+        result['operations'] = {}
+        for name, func in operations(repo, data_dir):
+            result['operations'][name] = measure(func, repeat)
+            print(f"{count:>9} {name:<16} {result['operations'][name]['median_ms']:>10.2f} ms")
+    finally:
+        repo.close()
+
+    result['db_mb'] = round(os.path.getsize(path) / 1024 / 1024, 2)
+    return result
+
+
+def app_version():
+    """رقم إصدار التطبيق من main.py بدون استيراد Kivy"""
+    try:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py'), encoding='utf-8') as f:
+            match = re.search(r"^__version__ = ['\"](.*)['\"]", f.read(), re.M)
+        return match.group(1) if match else None
+    except OSError:
+        return None
+
+
+def run(sizes, repeat, data_dir):
+    """تشغيل القياس لكل الأحجام"""
+    return {
+        'version': app_version(),
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'sizes': {str(count): run_size(count, repeat, data_dir) for count in sizes}
+    }
+
+
+def compare(old, new, ratio=REGRESSION_RATIO):
+    """مقارنة نتيجتين، ويعيد قائمة العمليات التي تراجع أداؤها"""
+    regressions = []
+    for size, result in new['sizes'].items():
+        old_result = old.get('sizes', {}).get(size)
+        if old_result is None:
+            continue
+        for name, timing in result['operations'].items():
+            old_timing = old_result['operations'].get(name)
+            if old_timing is None:
+                continue
+            # أقل زمن أقل تأثراً بانشغال الجهاز من الوسيط
+            before, after = old_timing['min_ms'], timing['min_ms']
+            change = after / before if before else 1.0
+            flag = ''
+            if change > ratio and after >= MIN_COMPARE_MS:
+                flag = '  <-- تراجع'
+                regressions.append((size, name, before, after))
+            print(f'{size:>9} {name:<16} {before:>10.2f} -> {after:>10.2f} ms  x{change:.2f}{flag}')
+    return regressions
+
+
+def main():
+    """نقطة التشغيل"""
+    parser = argparse.ArgumentParser(description='قياس أداء مسار البيانات')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='أعداد العملاء مفصولة بفواصل (مثلاً 1000,10000,100000,1000000)')
+    parser.add_argument('--repeat', type=int, default=5, help='عدد مرات تكرار كل عملية')
+    parser.add_argument('--data-dir', help='مجلد لحفظ قواعد البيانات المولّدة وإعادة استخدامها')
+    parser.add_argument('--output', help='ملف JSON لحفظ النتائج')
+    parser.add_argument('--compare', help='ملف JSON لنتائج سابقة للمقارنة')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+
+    if args.data_dir:
+        os.makedirs(args.data_dir, exist_ok=True)
+        results = run(sizes, args.repeat, args.data_dir)
+    else:
+        with tempfile.TemporaryDirectory() as data_dir:
+            results = run(sizes, args.repeat, data_dir)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), results)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,11 +4,18 @@ package.name = subscriptionmanager
 package.domain = org.subscription
 source.dir = .
 source.include_exts = py,png,jpg,db
-version = 1.0
-requirements = python3,kivy==2.2.1
+# أدوات التطوير لا تُضمَّن في التطبيق
+source.exclude_dirs = tests
+source.exclude_patterns = benchmark.py,sync_server.py,cli.py
+version.regex = __version__ = ['"](.*)['"]
+version.filename = %(source.dir)s/main.py
+requirements = python3,kivy==2.2.1,plyer
 orientation = portrait
 fullscreen = 0
-android.permissions = WRITE_EXTERNAL_STORAGE,READ_EXTERNAL_STORAGE
+android.permissions = WRITE_EXTERNAL_STORAGE,READ_EXTERNAL_STORAGE,FOREGROUND_SERVICE,POST_NOTIFICATIONS
+
+# خدمة تنبيهات انتهاء الاشتراكات في الخلفية
+services = Alerts:alert_service.py
 android.api = 33
 android.minapi = 21
 android.ndk = 25b
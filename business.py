@@ -0,0 +1,171 @@
+"""
+قواعد العمل المشتركة بين الواجهة والاستيراد وسطر الأوامر
+دوال بسيطة لا تعتمد على Kivy ولا على قاعدة البيانات.
+"""
+
+from calendar import monthrange
+from datetime import date, datetime
+
+DATE_FORMAT = '%Y-%m-%d'
+
+# أيام التنبيه الافتراضية قبل انتهاء الاشتراك
+DEFAULT_NOTIFICATION_DAYS = 5
+
+# الباقات الافتراضية التي يبدأ بها جدول الباقات في قاعدة البيانات:
+# السعر (0 = يُدخل يدوياً) والمدة بالشهور (0 = تاريخ الانتهاء يدوياً)
+OTHER_PACKAGE = 'أخرى'
+DEFAULT_PACKAGES = {
+    "باقة 100 جنيه شهرياً": {"price": 100, "months": 1},
+    "باقة 150 جنيه شهرياً": {"price": 150, "months": 1},
+    "باقة 75 جنيه شهرياً": {"price": 75, "months": 1},
+    "باقة 100 جنيه - 3 شهور": {"price": 100, "months": 3},
+    # سعر باقتي 6 شهور والسنة يُدخل يدوياً لكل عميل، والتجديد يكرر آخر مبلغ مدفوع
+    "باقة  جنيه - 6 شهور": {"price": 0, "months": 6},
+    "باقة  جنيه - سنة": {"price": 0, "months": 12},
+    OTHER_PACKAGE: {"price": 0, "months": 0}
+}
+
+# عملاء وصلوا من جهاز آخر بباقة غير موجودة هنا (لا تُحذف ولا يتغير اسمها)
+UNASSIGNED_PACKAGE = 'بدون باقة'
+
+
+class ValidationError(ValueError):
+    """بيانات عميل غير صالحة (الرسالة معروضة للمستخدم)"""
+
+
+def parse_date(text):
+    """تحويل نص YYYY-MM-DD إلى تاريخ"""
+    try:
+        # fromisoformat أسرع بكثير من strptime عند استيراد آلاف الصفوف
+        return datetime.fromisoformat(text.strip())
+    except (AttributeError, ValueError):
+        raise ValidationError(f'تاريخ غير صالح: {text}')
+
+
+def add_months(start, months):
+    """
+    إضافة شهور تقويمية إلى تاريخ (date أو datetime)
+    اليوم يبقى كما هو إلا إذا تجاوز طول الشهر فيصبح آخر يوم فيه (31 يناير + شهر = 28 أو 29 فبراير)
+    """
+    month = start.month - 1 + months
+    year = start.year + month // 12
+    month = month % 12 + 1
+    return start.replace(year=year, month=month, day=min(start.day, monthrange(year, month)[1]))
+
+
+def add_months_text(text, months):
+    """add_months لتاريخ بصيغة قاعدة البيانات (دالة SQLite add_months)، و None للتاريخ غير الصالح"""
+    try:
+        return add_months(date.fromisoformat(text[:10]), months).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def package_end_date(start, package):
+    """تاريخ انتهاء الاشتراك حسب مدة الباقة بالشهور التقويمية"""
+    return add_months(start, package['months'])
+
+
+def renewal_dates(end_date, package, today):
+    """
+    فترة التجديد بمدة الباقة (بداية, انتهاء) بصيغة قاعدة البيانات
+    تبدأ من انتهاء الاشتراك الحالي، أو من اليوم إن كان قد انتهى
+    """
+    start = max(parse_date(end_date).date(), today)
+    return start.isoformat(), package_end_date(start, package).isoformat()
+
+
+def is_renewal(old, new):
+    """
+    هل تعديل الاشتراك تجديد (فترة جديدة) وليس تصحيحاً للفترة الحالية
+    يُعتبر تجديداً إذا تأخر تاريخا البداية والانتهاء معاً (نفس قاعدة ملخص الإحصائيات)
+    """
+    return new['start_date'] > old['start_date'] and new['end_date'] > old['end_date']
+
+
+def status_text(status, days_remaining):
+    """نص حالة الاشتراك المعروض في القائمة"""
+    if status == 'expired':
+        return f"منتهي منذ {abs(days_remaining)} يوم"
+    if status == 'warning':
+        return f"تحذير - باقي {days_remaining} يوم"
+    return f"نشط - باقي {days_remaining} يوم"
+
+
+def validate_package(data):
+    """التحقق من بيانات باقة (قيم نصية) وإرجاعها جاهزة للحفظ"""
+    name = (data.get('name') or '').strip()
+    if not name:
+        raise ValidationError('يرجى إدخال اسم الباقة')
+
+    try:
+        price = float(str(data.get('price') or '0').strip())
+    except ValueError:
+        raise ValidationError('السعر يجب أن يكون رقماً')
+
+    try:
+        months = int(str(data.get('months') or '0').strip())
+    except ValueError:
+        raise ValidationError('المدة يجب أن تكون عدداً صحيحاً من الشهور')
+
+    if price < 0 or months < 0:
+        raise ValidationError('السعر والمدة لا يمكن أن يكونا بالسالب')
+
+    return {'name': name, 'price': price, 'months': months}
+
+
+def validate_customer(data, packages=None, default_notification_days=DEFAULT_NOTIFICATION_DAYS):
+    """
+    التحقق من بيانات عميل وإرجاعها جاهزة للحفظ
+    data: قيم نصية بأسماء حقول جدول العملاء
+    packages: إن وُجدت يجب أن تكون الباقة من ضمنها
+    default_notification_days: قيمة أيام التنبيه الفارغة (None = مطلوبة كما في النموذج)
+    """
+    name = (data.get('name') or '').strip()
+    if not name:
+        raise ValidationError('يرجى إدخال اسم العميل')
+
+    amount_text = str(data.get('amount') or '').strip()
+    if not amount_text:
+        raise ValidationError('يرجى إدخال المبلغ')
+
+    try:
+        amount = float(amount_text)
+    except ValueError:
+        raise ValidationError('المبلغ يجب أن يكون رقماً')
+
+    notification_text = str(data.get('notification_days') or '').strip()
+    if not notification_text and default_notification_days is None:
+        raise ValidationError('أيام التنبيه يجب أن تكون رقماً صحيحاً')
+    try:
+        notification_days = int(notification_text) if notification_text else default_notification_days
+    except ValueError:
+        raise ValidationError('أيام التنبيه يجب أن تكون رقماً صحيحاً')
+
+    package_name = (data.get('package') or '').strip()
+    package = None
+    if packages is not None:
+        if not package_name:
+            raise ValidationError('يرجى اختيار الباقة')
+        if package_name not in packages:
+            raise ValidationError(f'الباقة غير موجودة: {package_name}')
+        package = packages[package_name]
+
+    start = parse_date(data.get('start_date') or '')
+    if data.get('end_date'):
+        end = parse_date(data['end_date'])
+    elif package is not None and package['months'] > 0:
+        end = package_end_date(start, package)
+    else:
+        raise ValidationError('يرجى إدخال تاريخ انتهاء الاشتراك')
+
+    return {
+        'name': name,
+        'phone': (data.get('phone') or '').strip(),
+        'package': package_name,
+        'amount': amount,
+        'start_date': start.date().isoformat(),
+        'end_date': end.date().isoformat(),
+        'notification_days': notification_days,
+        'notes': (data.get('notes') or '').strip()
+    }
@@ -0,0 +1,255 @@
+"""
+إدارة الاشتراكات من سطر الأوامر بدون واجهة (لا يستورد Kivy)
+يستخدم نفس قاعدة البيانات وقواعد العمل التي يستخدمها التطبيق، ويصلح للتشغيل
+على نسخة من القاعدة في خادم عبر cron للمهام الليلية:
+
+    python -m cli --db subscriptions.db list --status warning
+    python -m cli search 0101234
+    python -m cli due --days 7
+    python -m cli renew --expired --package "باقة 100 جنيه شهرياً"
+    python -m cli import customers.xlsx
+    python -m cli export report.html --status expired
+    python -m cli export october.csv --from 2026-10-01 --to 2026-10-31
+    python -m cli recompute "باقة 100 جنيه - 3 شهور"
+
+    # كل ليلة: تقرير بالاشتراكات المنتهية خلال أسبوع
+    0 2 * * * cd /srv/subscriptions && python -m cli due --days 7 --csv > due.csv
+"""
+
+import argparse
+import csv
+import sys
+from datetime import date, timedelta
+
+from business import ValidationError, parse_date
+from repository import DB_PATH, STATUS_WHERE_SQL, CustomerRepository
+
+# أعمدة المخرجات النصية
+OUTPUT_COLUMNS = ('id', 'name', 'phone', 'package', 'amount', 'end_date', 'days_remaining', 'status')
+
+DEFAULT_LIMIT = 50
+
+
+def write_rows(rows, as_csv=False, out=None):
+    """كتابة صفوف العملاء مفصولة بـ Tab (أو CSV)، ويعيد عددها"""
+    out = out or sys.stdout
+    writer = csv.writer(out, delimiter=',' if as_csv else '\t', lineterminator='\n')
+    writer.writerow(OUTPUT_COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow([row[column] for column in OUTPUT_COLUMNS])
+        count += 1
+    return count
+
+
+def limited(rows, limit):
+    """أول limit صف (0 = الكل)"""
+    for count, row in enumerate(rows, 1):
+        yield row
+        if count == limit:
+            return
+
+
+def iso_date(text):
+    """نوع argparse لتاريخ YYYY-MM-DD"""
+    try:
+        return parse_date(text).date().isoformat()
+    except ValidationError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def id_list(text):
+    """نوع argparse لأرقام عملاء مفصولة بفواصل"""
+    try:
+        ids = [int(customer_id) for customer_id in text.split(',') if customer_id.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'أرقام العملاء يجب أن تكون أرقاماً صحيحة مفصولة بفواصل: {text}')
+    if not ids:
+        raise argparse.ArgumentTypeError('يرجى إدخال رقم عميل واحد على الأقل')
+    return ids
+
+
+def known_package(repo, name):
+    """هل الباقة موجودة (None = بدون تحديد باقة)، مع رسالة خطأ إن لم تكن"""
+    if name is None or name in repo.packages():
+        return True
+    print(f'الباقة غير موجودة: {name}', file=sys.stderr)
+    return False
+
+
+def due_range(days, today=None):
+    """نطاق تواريخ الانتهاء المستحقة خلال عدد من الأيام"""
+    today = today or date.today()
+    return today.isoformat(), (today + timedelta(days=days)).isoformat()
+
+
+def cmd_list(repo, args):
+    """قائمة العملاء"""
+    if not known_package(repo, args.package):
+        return 2
+    rows = repo.iter_customers(status=args.status, package=args.package)
+    write_rows(limited(rows, args.limit), args.csv)
+    return 0
+
+
+def cmd_search(repo, args):
+    """البحث بنفس فهرس بحث التطبيق"""
+    write_rows(repo.list_customers(args.term, None, args.limit or sys.maxsize), args.csv)
+    return 0
+
+
+def cmd_due(repo, args):
+    """تقرير الاشتراكات المستحقة مع إجمالي قيمتها"""
+    if not known_package(repo, args.package):
+        return 2
+    end_from, end_to = due_range(args.days)
+    rows = list(repo.iter_customers(package=args.package, end_from=end_from, end_to=end_to))
+    write_rows(rows, args.csv)
+    total = sum(row['amount'] for row in rows)
+    print(f'# {len(rows)} اشتراك ينتهي حتى {end_to} بقيمة {total:.0f}', file=sys.stderr)
+    return 0
+
+
+def cmd_renew(repo, args):
+    """تجديد جماعي بنفس قواعد التجديد في التطبيق"""
+    if not (known_package(repo, args.package) and known_package(repo, args.only_package)):
+        return 2
+    packages = repo.packages()
+
+    if args.ids:
+        ids = args.ids
+    elif args.expired:
+        ids = [row['id'] for row in repo.iter_customers(status='expired', package=args.only_package)]
+    else:
+        end_from, end_to = due_range(args.due_days)
+        ids = [row['id'] for row in repo.iter_customers(package=args.only_package, end_from=end_from, end_to=end_to)]
+
+    if args.dry_run:
+        print(f'# سيتم تجديد {len(ids)} عميل', file=sys.stderr)
+        return 0
+
+    pairs, skipped = repo.renew_customers(ids, packages, args.package)
+    write_rows((new for old, new in pairs), args.csv)
+    print(f'# تم تجديد {len(pairs)} عميل، ولم يُجدد {len(skipped)} (الباقة بدون مدة)', file=sys.stderr)
+    return 0
+
+
+def cmd_import(repo, args):
+    """استيراد ملف، ويعيد 1 إذا رُفضت صفوف"""
+    from importer import import_customers, write_error_report
+
+    result = import_customers(repo, args.file, repo.packages())
+    print(f'تم استيراد {result.imported} من {result.processed} عميل', file=sys.stderr)
+    if result.errors:
+        write_error_report(result, args.errors)
+        print(f'صفوف مرفوضة: {len(result.errors)} (التفاصيل في {args.errors})', file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_export(repo, args):
+    """تصدير إلى ملف"""
+    from exporter import export_customers
+
+    if not known_package(repo, args.package):
+        return 2
+    count = export_customers(
+        repo, args.file, status=args.status, package=args.package, end_from=args.end_from, end_to=args.end_to
+    )
+    print(f'تم تصدير {count} عميل إلى {args.file}', file=sys.stderr)
+    return 0
+
+
+def cmd_packages(repo, args):
+    """قائمة الباقات بأسعارها ومددها"""
+    writer = csv.writer(sys.stdout, delimiter=',' if args.csv else '\t', lineterminator='\n')
+    writer.writerow(('name', 'price', 'months'))
+    for name, package in repo.packages().items():
+        writer.writerow((name, package['price'], package['months']))
+    return 0
+
+
+def cmd_recompute(repo, args):
+    """إعادة حساب تواريخ انتهاء عملاء باقة من تاريخ البداية ومدة الباقة"""
+    package = repo.packages().get(args.package)
+    if package is None or package['months'] <= 0:
+        print(f'الباقة غير موجودة أو بدون مدة: {args.package}', file=sys.stderr)
+        return 2
+    count = repo.recompute_end_dates(args.package)
+    print(f'تم تعديل تاريخ انتهاء {count} عميل', file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    """أوامر سطر الأوامر"""
+    parser = argparse.ArgumentParser(prog='python -m cli', description='إدارة اشتراكات العملاء من سطر الأوامر')
+    parser.add_argument('--db', default=DB_PATH, help='ملف قاعدة البيانات')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument('--csv', action='store_true', help='مخرجات CSV بدلاً من Tab')
+
+    command = commands.add_parser('list', parents=[output], help='قائمة العملاء بترتيب تاريخ الانتهاء')
+    command.add_argument('--status', choices=list(STATUS_WHERE_SQL))
+    command.add_argument('--package')
+    command.add_argument('--limit', type=int, default=0, help='أقصى عدد (0 = الكل)')
+    command.set_defaults(handler=cmd_list)
+
+    command = commands.add_parser('search', parents=[output], help='البحث بالاسم أو رقم الهاتف')
+    command.add_argument('term')
+    command.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    command.set_defaults(handler=cmd_search)
+
+    command = commands.add_parser('due', parents=[output], help='الاشتراكات التي تنتهي خلال عدد من الأيام')
+    command.add_argument('--days', type=int, default=7)
+    command.add_argument('--package')
+    command.set_defaults(handler=cmd_due)
+
+    command = commands.add_parser('renew', parents=[output], help='تجديد مجموعة عملاء في معاملة واحدة')
+    selection = command.add_mutually_exclusive_group(required=True)
+    selection.add_argument('--ids', type=id_list, help='أرقام العملاء مفصولة بفواصل')
+    selection.add_argument('--expired', action='store_true', help='كل المنتهية اشتراكاتهم')
+    selection.add_argument('--due-days', type=int, help='التي تنتهي خلال عدد من الأيام')
+    command.add_argument('--only-package', help='تجديد عملاء هذه الباقة فقط')
+    command.add_argument('--package', help='باقة التجديد (الافتراضي: باقة كل عميل)')
+    command.add_argument('--dry-run', action='store_true', help='عرض العدد فقط')
+    command.set_defaults(handler=cmd_renew)
+
+    command = commands.add_parser('import', help='استيراد عملاء من CSV أو Excel')
+    command.add_argument('file')
+    command.add_argument('--errors', default='import_errors.csv', help='ملف تقرير الصفوف المرفوضة')
+    command.set_defaults(handler=cmd_import)
+
+    command = commands.add_parser('export', help='تصدير العملاء (csv / json / html حسب الامتداد)')
+    command.add_argument('file')
+    command.add_argument('--status', choices=list(STATUS_WHERE_SQL))
+    command.add_argument('--package')
+    command.add_argument('--from', dest='end_from', type=iso_date, help='تاريخ انتهاء من (YYYY-MM-DD)')
+    command.add_argument('--to', dest='end_to', type=iso_date, help='تاريخ انتهاء حتى (YYYY-MM-DD)')
+    command.set_defaults(handler=cmd_export)
+
+    command = commands.add_parser('packages', parents=[output], help='قائمة الباقات')
+    command.set_defaults(handler=cmd_packages)
+
+    command = commands.add_parser('recompute', help='إعادة حساب تواريخ انتهاء عملاء باقة بعد تغيير مدتها')
+    command.add_argument('package')
+    command.set_defaults(handler=cmd_recompute)
+
+    return parser
+
+
+def main(argv=None):
+    """نقطة التشغيل، وتعيد رمز الخروج"""
+    args = build_parser().parse_args(argv)
+    repo = CustomerRepository(args.db)
+    try:
+        return args.handler(repo, args)
+    except (ValidationError, ValueError) as e:
+        print(f'خطأ: {e}', file=sys.stderr)
+        return 1
+    finally:
+        repo.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
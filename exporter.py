@@ -0,0 +1,118 @@
+"""
+تصدير بيانات العملاء إلى CSV و JSON و HTML (قابل للطباعة كـ PDF)
+الصفوف تُقرأ من قاعدة البيانات وتُكتب مباشرة في الملف دون تجميعها في الذاكرة.
+"""
+
+import csv
+import html
+import json
+import os
+
+from repository import EXPORT_COLUMNS
+
+# عناوين الأعمدة في الملفات المصدّرة
+COLUMN_TITLES = {
+    'id': 'رقم العميل',
+    'name': 'اسم العميل',
+    'phone': 'رقم الهاتف',
+    'package': 'الباقة',
+    'amount': 'المبلغ المدفوع',
+    'start_date': 'تاريخ بداية الاشتراك',
+    'end_date': 'تاريخ انتهاء الاشتراك',
+    'notification_days': 'التنبيه قبل (أيام)',
+    'notes': 'ملاحظات',
+    'created_at': 'تاريخ الإضافة',
+    'days_remaining': 'الأيام المتبقية',
+    'status': 'الحالة'
+}
+
+STATUS_TITLES = {
+    'expired': 'منتهي',
+    'warning': 'تحذير',
+    'active': 'نشط'
+}
+
+
+def write_csv(rows, f):
+    """كتابة الصفوف بصيغة CSV"""
+    writer = csv.writer(f)
+    writer.writerow([COLUMN_TITLES[column] for column in EXPORT_COLUMNS])
+    count = 0
+    for row in rows:
+        writer.writerow([row[column] for column in EXPORT_COLUMNS])
+        count += 1
+    return count
+
+
+def write_json(rows, f):
+    """كتابة الصفوف كمصفوفة JSON عنصراً بعنصر"""
+    f.write('[')
+    count = 0
+    for row in rows:
+        f.write(',\n' if count else '\n')
+        f.write(json.dumps(row, ensure_ascii=False))
+        count += 1
+    f.write('\n]\n')
+    return count
+
+
+def write_html(rows, f):
+    """كتابة الصفوف كجدول HTML جاهز للطباعة أو الحفظ كـ PDF"""
+    f.write(
+        '<!DOCTYPE html>\n<html dir="rtl" lang="ar">\n<head>\n<meta charset="utf-8">\n'
+        '<title>تقرير اشتراكات العملاء</title>\n'
+        '<style>\n'
+        'body { font-family: sans-serif; font-size: 11px; }\n'
+        'table { border-collapse: collapse; width: 100%; }\n'
+        'th, td { border: 1px solid #999; padding: 3px 5px; }\n'
+        'thead { display: table-header-group; }\n'
+        'tr { page-break-inside: avoid; }\n'
+        '.expired { background: #ffcdd2; } .warning { background: #ffe0b2; }\n'
+        '</style>\n</head>\n<body>\n<h2>تقرير اشتراكات العملاء</h2>\n<table>\n<thead><tr>'
+    )
+    f.write(''.join(f'<th>{COLUMN_TITLES[column]}</th>' for column in EXPORT_COLUMNS))
+    f.write('</tr></thead>\n<tbody>\n')
+
+    count = 0
+    for row in rows:
+        cells = dict(row, status=STATUS_TITLES.get(row['status'], row['status']))
+        f.write(f'<tr class="{row["status"]}">')
+        f.write(''.join(
+            f'<td>{html.escape(str(cells[column]) if cells[column] is not None else "")}</td>'
+            for column in EXPORT_COLUMNS
+        ))
+        f.write('</tr>\n')
+        count += 1
+
+    f.write(f'</tbody>\n</table>\n<p>عدد العملاء: {count}</p>\n</body>\n</html>\n')
+    return count
+
+
+WRITERS = {
+    'csv': write_csv,
+    'json': write_json,
+    'html': write_html
+}
+
+
+def export_customers(repo, path, status=None, package=None, end_from=None, end_to=None):
+    """
+    تصدير العملاء إلى ملف حسب امتداده (csv / json / html) وإرجاع عدد الصفوف
+    يُكتب الملف باسم مؤقت أولاً حتى لا يبقى ملف ناقص عند حدوث خطأ
+    """
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension not in WRITERS:
+        raise ValueError(f'نوع ملف غير مدعوم: {extension}')
+
+    rows = repo.iter_customers(status=status, package=package, end_from=end_from, end_to=end_to)
+    temp_path = path + '.tmp'
+    try:
+        # utf-8-sig حتى يتعرف Excel على الحروف العربية في ملفات CSV
+        encoding = 'utf-8-sig' if extension == 'csv' else 'utf-8'
+        with open(temp_path, 'w', newline='', encoding=encoding) as f:
+            count = WRITERS[extension](rows, f)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return count
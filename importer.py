@@ -0,0 +1,136 @@
+"""
+استيراد قوائم العملاء من ملفات CSV و Excel
+يقرأ الملف على دفعات ويتحقق من كل صف بنفس قواعد نموذج الإضافة،
+ويكتب كل دفعة في معاملة واحدة مع تقرير بأخطاء الصفوف المرفوضة.
+"""
+
+import csv
+import os
+from datetime import date, datetime
+
+from business import ValidationError, validate_customer, DATE_FORMAT
+
+# عدد الصفوف في كل دفعة (معاملة واحدة لكل دفعة)
+CHUNK_SIZE = 5000
+
+# أسماء الأعمدة المقبولة في رأس الملف
+COLUMN_ALIASES = {
+    'name': ('name', 'الاسم', 'اسم العميل'),
+    'phone': ('phone', 'الهاتف', 'رقم الهاتف'),
+    'package': ('package', 'الباقة'),
+    'amount': ('amount', 'المبلغ', 'المبلغ المدفوع'),
+    'start_date': ('start_date', 'تاريخ البداية', 'تاريخ بداية الاشتراك'),
+    'end_date': ('end_date', 'تاريخ الانتهاء', 'تاريخ انتهاء الاشتراك'),
+    'notification_days': ('notification_days', 'أيام التنبيه', 'التنبيه قبل (أيام)'),
+    'notes': ('notes', 'ملاحظات')
+}
+HEADER_FIELDS = {alias: field for field, aliases in COLUMN_ALIASES.items() for alias in aliases}
+
+
+class ImportResult:
+    """نتيجة الاستيراد"""
+
+    def __init__(self):
+        self.processed = 0
+        self.imported = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        """تسجيل خطأ في صف (رقم السطر في الملف)"""
+        self.errors.append((line, message))
+
+
+def map_header(header):
+    """أسماء حقول جدول العملاء المقابلة لأعمدة الملف"""
+    return [HEADER_FIELDS.get(str(column or '').strip().lower()) for column in header]
+
+
+def cell_text(value):
+    """تحويل قيمة خلية إلى نص بنفس صيغة النموذج"""
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.strftime(DATE_FORMAT)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def read_csv(path):
+    """صفوف ملف CSV كقوائم قيم، أولها رأس الملف"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        yield from csv.reader(f)
+
+
+def read_xlsx(path):
+    """صفوف أول ورقة في ملف Excel (يتطلب openpyxl)"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValidationError('استيراد ملفات Excel يتطلب مكتبة openpyxl')
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield [cell_text(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(path):
+    """قراءة الملف حسب امتداده"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return read_csv(path)
+    if extension in ('.xlsx', '.xlsm'):
+        return read_xlsx(path)
+    raise ValidationError(f'نوع ملف غير مدعوم: {extension}')
+
+
+def import_customers(repo, path, packages, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    استيراد العملاء من ملف إلى قاعدة البيانات
+    progress: تُستدعى بعد كل دفعة بـ (عدد الصفوف المقروءة, عدد المستورد)
+    """
+    result = ImportResult()
+    rows = read_rows(path)
+
+    header = next(rows, None)
+    if header is None:
+        return result
+    fields = map_header(header)
+    if 'name' not in fields:
+        raise ValidationError('لم يتم العثور على عمود اسم العميل في الملف')
+
+    batch = []
+    for line, values in enumerate(rows, start=2):
+        if not any(values):
+            continue
+
+        result.processed += 1
+        data = {field: value for field, value in zip(fields, values) if field}
+        try:
+            batch.append(validate_customer(data, packages))
+        except ValidationError as e:
+            result.add_error(line, str(e))
+
+        if len(batch) >= chunk_size:
+            result.imported += repo.add_customers(batch)
+            batch = []
+            if progress is not None:
+                progress(result.processed, result.imported)
+
+    if batch:
+        result.imported += repo.add_customers(batch)
+    if progress is not None:
+        progress(result.processed, result.imported)
+
+    return result
+
+
+def write_error_report(result, path):
+    """حفظ أخطاء الصفوف في ملف CSV"""
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['السطر', 'الخطأ'])
+        writer.writerows(result.errors)
@@ -1,31 +1,76 @@
 """
 تطبيق إدارة اشتراكات العملاء - نسخة أندرويد
 باستخدام Kivy Framework
+
+البدء على مراحل: الواجهة الأساسية (العنوان والبحث والقائمة الفارغة) تُعرض
+أولاً، ثم يُبنى النموذج وتُحمّل القائمة والتنبيهات بعد أول إطار.
+النوافذ المنبثقة والاستيراد والتصدير تُستورد عند أول استخدام فقط.
 """
 
+# أول استيراد حتى يشمل قياس البدء زمن استيراد Kivy
+from startup_timing import StartupTimer
+
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.gridlayout import GridLayout
 from kivy.uix.scrollview import ScrollView
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.textinput import TextInput
-from kivy.uix.spinner import Spinner
-from kivy.uix.popup import Popup
+from kivy.uix.togglebutton import ToggleButton
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.core.window import Window
+from kivy.clock import Clock
+from kivy.logger import Logger
 from kivy.metrics import dp
-from kivy.utils import get_color_from_hex
-from datetime import datetime, timedelta
-import sqlite3
+from kivy.utils import get_color_from_hex, platform
+from datetime import date, datetime
+from bisect import bisect_left
 import os
+import threading
+
+from business import (
+    OTHER_PACKAGE, UNASSIGNED_PACKAGE, ValidationError, package_end_date, parse_date, validate_customer,
+    validate_package
+)
+from migrations import migrations_summary
+from profiler import PROFILER
+from records import CustomerRecord, today_ordinal
+from repository import CustomerRepository, PAGE_SIZE
+from worker import DatabaseWorker
+from search_index import is_refinement, matches
+
+__version__ = '1.0'
 
 # تعيين ألوان الخلفية
 Window.clearcolor = get_color_from_hex('#1a1a2e')
 
+# لون اسم العميل المحدد في وضع التحديد المتعدد
+SELECTED_COLOR = get_color_from_hex('#00d9ff')
+
+# ألوان حالات الاشتراك
+STATUS_COLORS = {
+    'expired': get_color_from_hex('#b71c1c'),
+    'warning': get_color_from_hex('#f57f17'),
+    'active': get_color_from_hex('#1b5e20')
+}
+
+# مهلة انتظار توقف الكتابة قبل تنفيذ البحث (بالثواني)
+SEARCH_DEBOUNCE = 0.25
+
+# الفترة بين كل فحص دوري للتنبيهات (بالثواني)
+NOTIFICATION_INTERVAL = 60 * 60
+
+# الفترة بين تحديثات شريط القياس (بالثواني)
+PROFILE_REFRESH = 1
+
 
 class DatePicker(BoxLayout):
     """مكون اختيار التاريخ"""
     def __init__(self, **kwargs):
+        from kivy.uix.spinner import Spinner
+        
         super().__init__(**kwargs)
         self.orientation = 'horizontal'
         self.spacing = dp(5)
@@ -78,75 +123,88 @@ class DatePicker(BoxLayout):
         self.day.text = str(date_obj.day).zfill(2)
 
 
-class CustomerRow(BoxLayout):
-    """صف العميل في القائمة"""
-    def __init__(self, customer_data, on_click, **kwargs):
+class CustomerRow(RecycleDataViewBehavior, BoxLayout):
+    """صف العميل في القائمة - يعاد استخدامه داخل RecycleView"""
+    def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.orientation = 'vertical'
-        self.size_hint_y = None
-        self.height = dp(100)
         self.spacing = dp(2)
-        self.customer_data = customer_data
-        self.on_click = on_click
-        
-        # تحديد اللون حسب الحالة
-        status = customer_data['status']
-        if status == 'expired':
-            bg_color = get_color_from_hex('#b71c1c')
-        elif status == 'warning':
-            bg_color = get_color_from_hex('#f57f17')
-        else:
-            bg_color = get_color_from_hex('#1b5e20')
+        self.index = None
+        self.customer_data = None
         
         # زر العميل
-        btn = Button(
-            background_color=bg_color,
+        self.btn = Button(
             background_normal='',
-            on_press=lambda x: self.on_click(customer_data)
+            on_press=lambda x: self.on_click()
         )
         
         # محتوى البطاقة
-        content = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(5))
+        self.content = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(5))
+        self.btn.bind(pos=self.content.setter('pos'), size=self.content.setter('size'))
         
         # الاسم
-        name_label = Label(
-            text=customer_data['name'],
+        self.name_label = Label(
             font_size=dp(18),
             bold=True,
             halign='right',
             valign='middle',
             color=(1, 1, 1, 1)
         )
-        name_label.bind(size=name_label.setter('text_size'))
+        self.name_label.bind(size=self.name_label.setter('text_size'))
         
         # المعلومات
-        info_text = f"الباقة: {customer_data['package']} | المبلغ: {customer_data['amount']} ج.م"
-        info_label = Label(
-            text=info_text,
+        self.info_label = Label(
             font_size=dp(14),
             halign='right',
             valign='middle',
             color=(0.9, 0.9, 0.9, 1)
         )
-        info_label.bind(size=info_label.setter('text_size'))
+        self.info_label.bind(size=self.info_label.setter('text_size'))
         
         # تاريخ الانتهاء والحالة
-        status_text = f"ينتهي في: {customer_data['end_date']} | {customer_data['status_text']}"
-        status_label = Label(
-            text=status_text,
+        self.status_label = Label(
             font_size=dp(12),
             halign='right',
             valign='middle',
             color=(1, 1, 1, 1)
         )
-        status_label.bind(size=status_label.setter('text_size'))
+        self.status_label.bind(size=self.status_label.setter('text_size'))
+        
+        self.content.add_widget(self.name_label)
+        self.content.add_widget(self.info_label)
+        self.content.add_widget(self.status_label)
         
-        content.add_widget(name_label)
-        content.add_widget(info_label)
-        content.add_widget(status_label)
+        self.btn.add_widget(self.content)
+        self.add_widget(self.btn)
+    
+    def refresh_view_attrs(self, rv, index, data):
+        """تحديث الصف ببيانات عميل آخر عند إعادة الاستخدام"""
+        self.index = index
+        self.customer_data = data
+        today = today_ordinal()
+        
+        # تحديد اللون حسب الحالة
+        self.btn.background_color = STATUS_COLORS[data.status(today)]
         
-        btn.add_widget(content)
-        self.add_widget(btn)
+        # العملاء المحددون للتجديد الجماعي
+        if data.id in App.get_running_app().selected_ids:
+            self.name_label.text = f'✓ {data.name}'
+            self.name_label.color = SELECTED_COLOR
+        else:
+            self.name_label.text = data.name
+            self.name_label.color = (1, 1, 1, 1)
+        self.info_label.text = f"الباقة: {data.package} | المبلغ: {data.amount} ج.م"
+        self.status_label.text = f"ينتهي في: {data.end_date} | {data.status_text(today)}"
+    
+    def on_click(self):
+        """عند النقر على الصف"""
+        if self.customer_data is None:
+            return
+        app = App.get_running_app()
+        if app.selecting:
+            app.toggle_selected(self.customer_data)
+        else:
+            app.on_customer_click(self.customer_data)
 
 
 class SubscriptionManagerApp(App):
@@ -154,39 +212,47 @@ class SubscriptionManagerApp(App):
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.packages = {
-            "باقة 100 جنيه شهرياً": {"price": 100, "months": 1},
-            "باقة 150 جنيه شهرياً": {"price": 150, "months": 1},
-            "باقة 75 جنيه شهرياً": {"price": 75, "months": 1},
-            "باقة 100 جنيه - 3 شهور": {"price": 100, "months": 3},
-            "باقة  جنيه - 6 شهور": {"price": 0, "months": 6},
-            "باقة  جنيه - سنة": {"price": 0, "months": 12},
-            "أخرى": {"price": 0, "months": 0}
-        }
+        self.startup = StartupTimer()
+        self.startup.mark('imports')
         self.selected_customer = None
+        self.selecting = False
+        self.syncing = False
+        self.selected_ids = set()
+        self.search_event = None
+        self.search_term = ''
+        self.search_results = None
+        self.status_counts = None
+        self.has_more = False
+        self.last_key = None
+        self.page_loading = False
+        self.list_generation = 0
+        self.notifications_checked = None
+        self.form_layout = None
         self.setup_database()
+        self.startup.mark('database')
     
     def setup_database(self):
         """إنشاء قاعدة البيانات"""
-        self.conn = sqlite3.connect('subscriptions.db')
-        self.cursor = self.conn.cursor()
-        
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS customers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                phone TEXT,
-                package TEXT NOT NULL,
-                amount REAL NOT NULL,
-                start_date TEXT NOT NULL,
-                end_date TEXT NOT NULL,
-                notification_days INTEGER DEFAULT 5,
-                notes TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        self.repo = CustomerRepository('subscriptions.db')
+        if self.repo.applied_migrations:
+            Logger.info(f'Database: ترقية المخطط: {migrations_summary(self.repo.applied_migrations)}')
+        self.packages = self.repo.packages()
         
-        self.conn.commit()
+        # جميع الاستعلامات تُنفذ في thread منفصل وتصل نتائجها إلى الواجهة عبر Clock
+        self.worker = DatabaseWorker(deliver=self.deliver, on_busy=self.on_worker_busy)
+    
+    def deliver(self, callback, *args):
+        """تنفيذ استدعاء النتيجة في thread الواجهة"""
+        Clock.schedule_once(lambda dt: callback(*args))
+    
+    def on_worker_busy(self, busy):
+        """إظهار حالة التحميل أثناء عمل قاعدة البيانات"""
+        if hasattr(self, 'loading_label'):
+            self.loading_label.text = 'جارِ التحميل...' if busy else ''
+    
+    def on_db_error(self, error):
+        """عرض خطأ قاعدة البيانات"""
+        self.show_popup('خطأ', f'حدث خطأ: {str(error)}')
     
     def build(self):
         """بناء الواجهة"""
@@ -216,6 +282,10 @@ class SubscriptionManagerApp(App):
         header.add_widget(header_bg)
         main_layout.add_widget(header)
         
+        # شريط قياس الأداء (عند تفعيل profiler فقط)
+        if PROFILER.enabled:
+            main_layout.add_widget(self.create_profile_bar())
+        
         # قسم المحتوى
         content_layout = BoxLayout(orientation='horizontal', spacing=dp(10))
         
@@ -223,21 +293,132 @@ class SubscriptionManagerApp(App):
         self.customers_list = self.create_customers_list()
         content_layout.add_widget(self.customers_list)
         
-        # نموذج الإدخال (يمين)
-        form_scroll = ScrollView(size_hint_x=0.5)
-        self.form_layout = self.create_form()
-        form_scroll.add_widget(self.form_layout)
-        content_layout.add_widget(form_scroll)
+        # نموذج الإدخال (يمين) - يُبنى بعد أول إطار
+        self.form_scroll = ScrollView(size_hint_x=0.5)
+        content_layout.add_widget(self.form_scroll)
         
         main_layout.add_widget(content_layout)
         
-        # تحميل البيانات
+        # بقية البدء بعد عرض الواجهة الأساسية
+        Window.bind(on_flip=self.on_first_frame)
+        self.startup.mark('build')
+        
+        return main_layout
+    
+    def on_first_frame(self, *args):
+        """بعد عرض أول إطار"""
+        Window.unbind(on_flip=self.on_first_frame)
+        self.startup.mark('first_frame')
+        Clock.schedule_once(self.finish_startup)
+    
+    def finish_startup(self, dt):
+        """تحميل البيانات وبناء النموذج بعد ظهور الواجهة"""
+        self.startup.wait_for('form', 'list')
+        
+        # الاستعلامات تبدأ في thread قاعدة البيانات أثناء بناء النموذج
         self.load_customers()
+        self.update_status_counts()
         
-        # فحص التنبيهات
+        # فحص التنبيهات عند البدء ثم دورياً
         self.check_notifications()
+        Clock.schedule_interval(self.recheck_notifications, NOTIFICATION_INTERVAL)
         
-        return main_layout
+        self.ensure_form()
+        
+        # تنبيهات الخلفية أثناء إغلاق التطبيق
+        self.start_alert_service()
+        
+        # نسخة احتياطية تلقائية يومية
+        self.start_backup(auto=True)
+    
+    def ensure_form(self):
+        """بناء نموذج الإدخال عند أول حاجة إليه"""
+        if self.form_layout is None:
+            self.form_layout = self.create_form()
+            self.form_scroll.add_widget(self.form_layout)
+            self.startup_step('form')
+    
+    def startup_step(self, name):
+        """انتهاء مرحلة من البدء، وتسجيل الأزمنة عند اكتمالها"""
+        if not self.startup.done(name):
+            return
+        
+        self.startup.mark('interactive')
+        Logger.info(f'Startup: {self.startup.summary()}')
+        try:
+            self.startup.save(__version__, platform)
+        except OSError as e:
+            Logger.warning(f'Startup: تعذر حفظ أزمنة البدء: {e}')
+    
+    def start_alert_service(self):
+        """تشغيل خدمة التنبيهات (alert_service.py) على Android"""
+        if platform != 'android':
+            return
+        try:
+            from jnius import autoclass
+            service = autoclass('org.subscription.subscriptionmanager.ServiceAlerts')
+            activity = autoclass('org.kivy.android.PythonActivity').mActivity
+            service.start(activity, os.path.abspath(self.repo.path))
+        except Exception as e:
+            Logger.warning(f'Alerts: تعذر تشغيل خدمة التنبيهات: {e}')
+    
+    def stop_alert_service(self):
+        """إيقاف خدمة التنبيهات حتى تغلق اتصالها بالقاعدة (قبل استعادة نسخة)"""
+        if platform != 'android':
+            return
+        try:
+            from jnius import autoclass
+            service = autoclass('org.subscription.subscriptionmanager.ServiceAlerts')
+            activity = autoclass('org.kivy.android.PythonActivity').mActivity
+            service.stop(activity)
+        except Exception as e:
+            Logger.warning(f'Alerts: تعذر إيقاف خدمة التنبيهات: {e}')
+    
+    def create_profile_bar(self):
+        """شريط يعرض أزمنة الإطارات والقائمة وأبطأ الاستعلامات"""
+        bar = BoxLayout(size_hint_y=None, height=dp(90), spacing=dp(5))
+        
+        self.profile_label = Label(
+            font_size=dp(11),
+            halign='left',
+            valign='top',
+            color=get_color_from_hex('#00d9ff')
+        )
+        self.profile_label.bind(size=self.profile_label.setter('text_size'))
+        
+        export_btn = Button(
+            text='تصدير القياس',
+            size_hint_x=None,
+            width=dp(110),
+            background_color=get_color_from_hex('#78909c'),
+            background_normal=''
+        )
+        export_btn.bind(on_press=lambda x: self.export_profile())
+        
+        bar.add_widget(self.profile_label)
+        bar.add_widget(export_btn)
+        
+        Clock.schedule_interval(self.record_frame, 0)
+        Clock.schedule_interval(self.update_profile_bar, PROFILE_REFRESH)
+        return bar
+    
+    def record_frame(self, dt):
+        """زمن الإطار"""
+        PROFILER.record('frame', dt * 1000)
+    
+    def update_profile_bar(self, dt):
+        """تحديث ملخص القياس"""
+        self.profile_label.text = PROFILER.summary(('frame', 'list.page', 'list.reset', 'popup'))
+    
+    def export_profile(self):
+        """حفظ ملخص القياس في ملف JSON"""
+        path = os.path.join(os.getcwd(), f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        try:
+            PROFILER.export(path)
+        except OSError as e:
+            self.show_popup('خطأ', f'تعذر حفظ القياس: {e}')
+            return
+        self.show_popup('القياس', f'تم حفظ القياس في:\n{path}')
     
     def create_customers_list(self):
         """إنشاء قائمة العملاء"""
@@ -267,22 +448,81 @@ class SubscriptionManagerApp(App):
         search_box.add_widget(self.search_input)
         list_layout.add_widget(search_box)
         
-        # قائمة العملاء القابلة للتمرير
-        scroll = ScrollView()
-        self.customers_container = BoxLayout(
+        # عدد العملاء حسب الحالة وحالة التحميل
+        status_bar = BoxLayout(size_hint_y=None, height=dp(30), spacing=dp(5))
+        
+        self.loading_label = Label(
+            size_hint_x=0.3,
+            color=get_color_from_hex('#00d9ff')
+        )
+        
+        self.counts_label = Label(
+            size_hint_x=0.7,
+            halign='right',
+            valign='middle',
+            color=(0.9, 0.9, 0.9, 1)
+        )
+        self.counts_label.bind(size=self.counts_label.setter('text_size'))
+        
+        status_bar.add_widget(self.loading_label)
+        status_bar.add_widget(self.counts_label)
+        list_layout.add_widget(status_bar)
+        
+        # التحديد المتعدد والتجديد الجماعي
+        selection_bar = BoxLayout(size_hint_y=None, height=dp(40), spacing=dp(5))
+        
+        self.select_toggle = ToggleButton(
+            text='تحديد متعدد',
+            background_color=get_color_from_hex('#16213e'),
+            color=(1, 1, 1, 1)
+        )
+        self.select_toggle.bind(state=self.on_select_mode)
+        
+        select_all_btn = Button(
+            text='تحديد الكل',
+            background_color=get_color_from_hex('#16213e'),
+            color=(1, 1, 1, 1)
+        )
+        select_all_btn.bind(on_press=lambda x: self.select_all())
+        
+        self.renew_btn = Button(
+            text='تجديد المحدد (0)',
+            background_color=get_color_from_hex('#00d9ff'),
+            color=get_color_from_hex('#16213e'),
+            bold=True,
+            background_normal='',
+            disabled=True
+        )
+        self.renew_btn.bind(on_press=self.open_batch_renew)
+        
+        selection_bar.add_widget(self.select_toggle)
+        selection_bar.add_widget(select_all_btn)
+        selection_bar.add_widget(self.renew_btn)
+        list_layout.add_widget(selection_bar)
+        
+        # قائمة العملاء القابلة للتمرير (لا تُنشأ إلا الصفوف الظاهرة)
+        self.customers_view = RecycleView()
+        customers_layout = RecycleBoxLayout(
+            viewclass=CustomerRow,
             orientation='vertical',
             spacing=dp(5),
-            size_hint_y=None
+            size_hint_y=None,
+            default_size=(None, dp(100)),
+            default_size_hint=(1, None)
         )
-        self.customers_container.bind(minimum_height=self.customers_container.setter('height'))
+        customers_layout.bind(minimum_height=customers_layout.setter('height'))
+        self.customers_view.bind(scroll_y=self.on_list_scroll)
         
-        scroll.add_widget(self.customers_container)
-        list_layout.add_widget(scroll)
+        self.customers_view.add_widget(customers_layout)
+        list_layout.add_widget(self.customers_view)
         
         return list_layout
     
     def create_form(self):
         """إنشاء نموذج الإدخال"""
+        from kivy.uix.gridlayout import GridLayout
+        from kivy.uix.spinner import Spinner
+        
         form = GridLayout(
             cols=1,
             spacing=dp(10),
@@ -362,7 +602,7 @@ class SubscriptionManagerApp(App):
         form.add_widget(self.notes_input)
         
         # الأزرار
-        buttons_layout = GridLayout(cols=1, spacing=dp(5), size_hint_y=None, height=dp(220))
+        buttons_layout = GridLayout(cols=1, spacing=dp(5), size_hint_y=None, height=dp(550))
         
         # زر إضافة
         add_btn = Button(
@@ -416,6 +656,84 @@ class SubscriptionManagerApp(App):
         clear_btn.bind(on_press=lambda x: self.clear_fields())
         buttons_layout.add_widget(clear_btn)
         
+        # زر استيراد
+        import_btn = Button(
+            text='استيراد من ملف',
+            size_hint_y=None,
+            height=dp(50),
+            background_color=get_color_from_hex('#5c6bc0'),
+            color=(1, 1, 1, 1),
+            bold=True,
+            background_normal=''
+        )
+        import_btn.bind(on_press=self.open_import)
+        buttons_layout.add_widget(import_btn)
+        
+        # زر تصدير
+        export_btn = Button(
+            text='تصدير / تقرير',
+            size_hint_y=None,
+            height=dp(50),
+            background_color=get_color_from_hex('#26a69a'),
+            color=(1, 1, 1, 1),
+            bold=True,
+            background_normal=''
+        )
+        export_btn.bind(on_press=self.open_export)
+        buttons_layout.add_widget(export_btn)
+        
+        # زر الإحصائيات
+        dashboard_btn = Button(
+            text='الإحصائيات',
+            size_hint_y=None,
+            height=dp(50),
+            background_color=get_color_from_hex('#8d6e63'),
+            color=(1, 1, 1, 1),
+            bold=True,
+            background_normal=''
+        )
+        dashboard_btn.bind(on_press=self.open_dashboard)
+        buttons_layout.add_widget(dashboard_btn)
+        
+        # زر المزامنة
+        sync_btn = Button(
+            text='مزامنة الأجهزة',
+            size_hint_y=None,
+            height=dp(50),
+            background_color=get_color_from_hex('#5c6bc0'),
+            color=(1, 1, 1, 1),
+            bold=True,
+            background_normal=''
+        )
+        sync_btn.bind(on_press=self.open_sync)
+        buttons_layout.add_widget(sync_btn)
+        
+        # زر النسخ الاحتياطي
+        backup_btn = Button(
+            text='النسخ الاحتياطي',
+            size_hint_y=None,
+            height=dp(50),
+            background_color=get_color_from_hex('#26a69a'),
+            color=(1, 1, 1, 1),
+            bold=True,
+            background_normal=''
+        )
+        backup_btn.bind(on_press=self.open_backups)
+        buttons_layout.add_widget(backup_btn)
+        
+        # زر إدارة الباقات
+        packages_btn = Button(
+            text='إدارة الباقات',
+            size_hint_y=None,
+            height=dp(50),
+            background_color=get_color_from_hex('#8d6e63'),
+            color=(1, 1, 1, 1),
+            bold=True,
+            background_normal=''
+        )
+        packages_btn.bind(on_press=self.open_packages)
+        buttons_layout.add_widget(packages_btn)
+        
         form.add_widget(buttons_layout)
         
         return form
@@ -445,9 +763,17 @@ class SubscriptionManagerApp(App):
             input_filter=input_type if input_type == 'number' else None
         )
     
+    def set_packages(self, packages):
+        """استبدال الباقات المعروضة (بعد تغييرها في قاعدة البيانات)"""
+        self.packages = packages
+        if self.form_layout is not None:
+            self.package_spinner.values = list(packages.keys())
+            if self.package_spinner.text not in packages:
+                self.package_spinner.text = 'اختر الباقة'
+    
     def on_package_selected(self, spinner, text):
         """عند اختيار باقة"""
-        if text in self.packages and text != "أخرى":
+        if text in self.packages and text != OTHER_PACKAGE:
             package = self.packages[text]
             self.amount_input.text = str(package['price'])
             self.calculate_end_date()
@@ -458,56 +784,28 @@ class SubscriptionManagerApp(App):
         if package_name in self.packages:
             package = self.packages[package_name]
             if package['months'] > 0:
-                start = self.start_date_picker.get_date()
-                end = start + timedelta(days=package['months'] * 30)
-                self.end_date_picker.set_date(end)
+                self.end_date_picker.set_date(package_end_date(self.start_date_picker.get_date(), package))
     
     def add_customer(self, instance):
         """إضافة عميل جديد"""
         # التحقق من البيانات
-        if not self.name_input.text.strip():
-            self.show_popup('خطأ', 'يرجى إدخال اسم العميل')
-            return
-        
-        if not self.amount_input.text.strip():
-            self.show_popup('خطأ', 'يرجى إدخال المبلغ')
-            return
-        
-        try:
-            amount = float(self.amount_input.text)
-        except ValueError:
-            self.show_popup('خطأ', 'المبلغ يجب أن يكون رقماً')
-            return
-        
-        try:
-            notification_days = int(self.notification_input.text)
-        except ValueError:
-            self.show_popup('خطأ', 'أيام التنبيه يجب أن تكون رقماً صحيحاً')
+        values = self.form_values()
+        if values is None:
             return
         
         # إضافة إلى قاعدة البيانات
-        try:
-            self.cursor.execute('''
-                INSERT INTO customers (name, phone, package, amount, start_date, end_date, notification_days, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                self.name_input.text.strip(),
-                self.phone_input.text.strip(),
-                self.package_spinner.text,
-                amount,
-                self.start_date_picker.get_date().strftime('%Y-%m-%d'),
-                self.end_date_picker.get_date().strftime('%Y-%m-%d'),
-                notification_days,
-                self.notes_input.text.strip()
-            ))
-            
-            self.conn.commit()
-            self.load_customers()
-            self.clear_fields()
-            self.show_popup('نجح', 'تمت إضافة العميل بنجاح')
-            
-        except Exception as e:
-            self.show_popup('خطأ', f'حدث خطأ: {str(e)}')
+        self.worker.submit(
+            lambda values: self.repo.get_customer(self.repo.add_customer(values)),
+            values,
+            on_result=self.on_customer_added, on_error=self.on_db_error
+        )
+    
+    def on_customer_added(self, customer):
+        """بعد حفظ العميل الجديد"""
+        self.insert_row(customer)
+        self.change_status_count(None, customer)
+        self.clear_fields()
+        self.show_popup('نجح', 'تمت إضافة العميل بنجاح')
     
     def update_customer(self, instance):
         """تحديث بيانات عميل"""
@@ -515,47 +813,42 @@ class SubscriptionManagerApp(App):
             self.show_popup('تحذير', 'يرجى اختيار عميل للتحديث')
             return
         
-        if not self.name_input.text.strip():
-            self.show_popup('خطأ', 'يرجى إدخال اسم العميل')
-            return
-        
-        try:
-            amount = float(self.amount_input.text)
-        except ValueError:
-            self.show_popup('خطأ', 'المبلغ يجب أن يكون رقماً')
-            return
-        
-        try:
-            notification_days = int(self.notification_input.text)
-        except ValueError:
-            self.show_popup('خطأ', 'أيام التنبيه يجب أن تكون رقماً صحيحاً')
+        values = self.form_values()
+        if values is None:
             return
         
+        self.worker.submit(
+            self.repo.update_customer, self.selected_customer.id, values,
+            on_result=self.on_customer_updated, on_error=self.on_db_error
+        )
+    
+    def on_customer_updated(self, result):
+        """بعد حفظ تعديلات العميل"""
+        old, customer = result
+        self.remove_row(old)
+        self.insert_row(customer)
+        self.change_status_count(old, customer)
+        self.clear_fields()
+        self.selected_customer = None
+        self.show_popup('نجح', 'تم تحديث بيانات العميل بنجاح')
+    
+    def form_values(self):
+        """بيانات العميل من حقول النموذج بعد التحقق منها، أو None مع عرض الخطأ"""
         try:
-            self.cursor.execute('''
-                UPDATE customers
-                SET name=?, phone=?, package=?, amount=?, start_date=?, end_date=?, notification_days=?, notes=?
-                WHERE id=?
-            ''', (
-                self.name_input.text.strip(),
-                self.phone_input.text.strip(),
-                self.package_spinner.text,
-                amount,
-                self.start_date_picker.get_date().strftime('%Y-%m-%d'),
-                self.end_date_picker.get_date().strftime('%Y-%m-%d'),
-                notification_days,
-                self.notes_input.text.strip(),
-                self.selected_customer['id']
-            ))
-            
-            self.conn.commit()
-            self.load_customers()
-            self.clear_fields()
-            self.selected_customer = None
-            self.show_popup('نجح', 'تم تحديث بيانات العميل بنجاح')
-            
-        except Exception as e:
-            self.show_popup('خطأ', f'حدث خطأ: {str(e)}')
+            package = self.package_spinner.text
+            return validate_customer({
+                'name': self.name_input.text,
+                'phone': self.phone_input.text,
+                'package': package if package in self.packages else '',
+                'amount': self.amount_input.text,
+                'start_date': self.start_date_picker.get_date().strftime('%Y-%m-%d'),
+                'end_date': self.end_date_picker.get_date().strftime('%Y-%m-%d'),
+                'notification_days': self.notification_input.text,
+                'notes': self.notes_input.text
+            }, self.packages, default_notification_days=None)
+        except ValidationError as e:
+            self.show_popup('خطأ', str(e))
+            return None
     
     def delete_customer(self, instance):
         """حذف عميل"""
@@ -563,11 +856,13 @@ class SubscriptionManagerApp(App):
             self.show_popup('تحذير', 'يرجى اختيار عميل للحذف')
             return
         
+        from kivy.uix.popup import Popup
+        
         # نافذة تأكيد الحذف
         content = BoxLayout(orientation='vertical', spacing=dp(10), padding=dp(10))
         
         message = Label(
-            text=f"هل أنت متأكد من حذف العميل '{self.selected_customer['name']}'؟",
+            text=f"هل أنت متأكد من حذف العميل '{self.selected_customer.name}'؟",
             size_hint_y=0.7
         )
         
@@ -579,17 +874,19 @@ class SubscriptionManagerApp(App):
             size_hint=(0.8, 0.3)
         )
         
+        def on_deleted(old):
+            self.remove_row(old)
+            self.change_status_count(old, None)
+            self.clear_fields()
+            self.selected_customer = None
+            popup.dismiss()
+            self.show_popup('نجح', 'تم حذف العميل بنجاح')
+        
         def confirm_delete(instance):
-            try:
-                self.cursor.execute('DELETE FROM customers WHERE id=?', (self.selected_customer['id'],))
-                self.conn.commit()
-                self.load_customers()
-                self.clear_fields()
-                self.selected_customer = None
-                popup.dismiss()
-                self.show_popup('نجح', 'تم حذف العميل بنجاح')
-            except Exception as e:
-                self.show_popup('خطأ', f'حدث خطأ: {str(e)}')
+            self.worker.submit(
+                self.repo.delete_customer, self.selected_customer.id,
+                on_result=on_deleted, on_error=self.on_db_error
+            )
         
         yes_btn = Button(
             text='نعم',
@@ -613,165 +910,1116 @@ class SubscriptionManagerApp(App):
         
         popup.open()
     
-    def load_customers(self, search_term=''):
-        """تحميل قائمة العملاء"""
-        self.customers_container.clear_widgets()
-        
-        if search_term:
-            self.cursor.execute('''
-                SELECT * FROM customers 
-                WHERE LOWER(name) LIKE ? OR LOWER(phone) LIKE ?
-                ORDER BY end_date ASC
-            ''', (f'%{search_term.lower()}%', f'%{search_term.lower()}%'))
-        else:
-            self.cursor.execute('SELECT * FROM customers ORDER BY end_date ASC')
+    def open_import(self, instance):
+        """اختيار ملف CSV أو Excel للاستيراد"""
+        from kivy.uix.filechooser import FileChooserListView
+        from kivy.uix.popup import Popup
         
-        customers = self.cursor.fetchall()
-        today = datetime.now().date()
+        content = BoxLayout(orientation='vertical', spacing=dp(10), padding=dp(10))
         
-        for customer in customers:
-            customer_id, name, phone, package, amount, start_date, end_date, notification_days, notes, created_at = customer
-            
-            end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
-            days_remaining = (end_date_obj - today).days
-            
-            # تحديد الحالة
-            if days_remaining < 0:
-                status = 'expired'
-                status_text = f"منتهي منذ {abs(days_remaining)} يوم"
-            elif days_remaining <= notification_days:
-                status = 'warning'
-                status_text = f"تحذير - باقي {days_remaining} يوم"
-            else:
-                status = 'active'
-                status_text = f"نشط - باقي {days_remaining} يوم"
-            
-            customer_data = {
-                'id': customer_id,
-                'name': name,
-                'phone': phone if phone else '-',
-                'package': package,
-                'amount': amount,
-                'start_date': start_date,
-                'end_date': end_date,
-                'notification_days': notification_days,
-                'notes': notes,
-                'status': status,
-                'status_text': status_text
-            }
-            
-            row = CustomerRow(customer_data, self.on_customer_click)
-            self.customers_container.add_widget(row)
-    
-    def on_customer_click(self, customer_data):
-        """عند النقر على عميل"""
-        self.selected_customer = customer_data
+        chooser = FileChooserListView(
+            path=os.getcwd(),
+            filters=['*.csv', '*.xlsx']
+        )
         
-        # ملء الحقول
-        self.name_input.text = customer_data['name']
-        self.phone_input.text = customer_data['phone'] if customer_data['phone'] != '-' else ''
-        self.package_spinner.text = customer_data['package']
-        self.amount_input.text = str(customer_data['amount'])
+        buttons = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
         
-        start_date = datetime.strptime(customer_data['start_date'], '%Y-%m-%d')
-        end_date = datetime.strptime(customer_data['end_date'], '%Y-%m-%d')
+        popup = Popup(
+            title='استيراد العملاء',
+            content=content,
+            size_hint=(0.9, 0.9)
+        )
         
-        self.start_date_picker.set_date(start_date)
-        self.end_date_picker.set_date(end_date)
+        def start_import(instance):
+            if not chooser.selection:
+                return
+            popup.dismiss()
+            self.import_file(chooser.selection[0])
+        
+        import_btn = Button(
+            text='استيراد',
+            background_color=get_color_from_hex('#00d9ff'),
+            background_normal=''
+        )
+        import_btn.bind(on_press=start_import)
         
-        self.notification_input.text = str(customer_data['notification_days'])
-        self.notes_input.text = customer_data['notes'] if customer_data['notes'] else ''
+        cancel_btn = Button(
+            text='إلغاء',
+            background_color=get_color_from_hex('#78909c'),
+            background_normal=''
+        )
+        cancel_btn.bind(on_press=popup.dismiss)
+        
+        buttons.add_widget(cancel_btn)
+        buttons.add_widget(import_btn)
+        
+        content.add_widget(chooser)
+        content.add_widget(buttons)
+        
+        popup.open()
     
-    def on_search(self, instance, value):
-        """البحث عن العملاء"""
-        self.load_customers(value)
+    def import_file(self, path):
+        """استيراد ملف العملاء في thread قاعدة البيانات مع عرض التقدم"""
+        from importer import CHUNK_SIZE, import_customers
+        
+        def progress(processed, imported):
+            self.deliver(self.show_import_progress, processed, imported)
+        
+        self.worker.submit(
+            import_customers, self.repo, path, self.packages, CHUNK_SIZE, progress,
+            on_result=lambda result: self.on_import_done(path, result),
+            on_error=self.on_db_error
+        )
     
-    def clear_fields(self):
-        """مسح جميع الحقول"""
-        self.name_input.text = ''
-        self.phone_input.text = ''
-        self.package_spinner.text = 'اختر الباقة'
-        self.amount_input.text = ''
-        self.start_date_picker.set_date(datetime.now())
-        self.end_date_picker.set_date(datetime.now())
-        self.notification_input.text = '5'
-        self.notes_input.text = ''
-        self.selected_customer = None
+    def show_import_progress(self, processed, imported):
+        """عرض تقدم الاستيراد"""
+        self.loading_label.text = f'استيراد: {imported} / {processed}'
     
-    def check_notifications(self):
-        """فحص التنبيهات"""
-        today = datetime.now().date()
-        
-        self.cursor.execute('SELECT * FROM customers')
-        customers = self.cursor.fetchall()
+    def on_import_done(self, path, result):
+        """بعد انتهاء الاستيراد"""
+        from importer import write_error_report
         
-        warnings = []
-        expired = []
+        self.load_customers(self.search_term)
+        self.update_status_counts()
         
-        for customer in customers:
-            customer_id, name, phone, package, amount, start_date, end_date, notification_days, notes, created_at = customer
+        message = f"تم استيراد {result.imported} من {result.processed} عميل"
+        if result.errors:
+            report_path = os.path.splitext(path)[0] + '_errors.csv'
+            write_error_report(result, report_path)
             
-            end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
-            days_remaining = (end_date_obj - today).days
-            
-            if days_remaining < 0:
-                expired.append(f"• {name} - انتهى منذ {abs(days_remaining)} يوم")
-            elif 0 <= days_remaining <= notification_days:
-                warnings.append(f"• {name} - باقي {days_remaining} يوم")
+            message += f"\n\nصفوف مرفوضة: {len(result.errors)}\n"
+            message += "\n".join(f"• سطر {line}: {error}" for line, error in result.errors[:5])
+            if len(result.errors) > 5:
+                message += f"\n... و {len(result.errors) - 5} آخرين"
+            message += f"\n\nتقرير الأخطاء: {report_path}"
         
-        if expired or warnings:
-            notification_message = ""
-            
-            if expired:
-                notification_message += "⚠️ اشتراكات منتهية:\n"
-                notification_message += "\n".join(expired[:5])
-                if len(expired) > 5:
-                    notification_message += f"\n... و {len(expired) - 5} آخرين"
-                notification_message += "\n\n"
-            
-            if warnings:
-                notification_message += "🔔 تنبيهات الاشتراكات:\n"
-                notification_message += "\n".join(warnings[:5])
-                if len(warnings) > 5:
-                    notification_message += f"\n... و {len(warnings) - 5} آخرين"
-            
-            self.show_popup('تنبيهات الاشتراكات', notification_message)
+        self.show_popup('الاستيراد', message)
     
-    def show_popup(self, title, message):
-        """عرض نافذة منبثقة"""
-        content = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
+    def open_export(self, instance):
+        """اختيار صيغة التصدير والتصفية"""
+        from kivy.uix.popup import Popup
+        from kivy.uix.spinner import Spinner
+        from exporter import STATUS_TITLES
         
-        message_label = Label(
-            text=message,
-            size_hint_y=0.8,
-            halign='right',
-            valign='middle'
-        )
-        message_label.bind(size=message_label.setter('text_size'))
+        content = BoxLayout(orientation='vertical', spacing=dp(10), padding=dp(10))
         
-        close_btn = Button(
-            text='إغلاق',
-            size_hint_y=0.2,
-            background_color=get_color_from_hex('#00d9ff'),
-            background_normal=''
+        spinner_options = dict(
+            size_hint_y=None,
+            height=dp(50),
+            background_color=get_color_from_hex('#16213e'),
+            color=(1, 1, 1, 1)
         )
         
-        content.add_widget(message_label)
-        content.add_widget(close_btn)
+        format_spinner = Spinner(text='CSV', values=['CSV', 'JSON', 'HTML'], **spinner_options)
+        
+        all_text = 'الكل'
+        statuses = {title: status for status, title in STATUS_TITLES.items()}
+        status_spinner = Spinner(text=all_text, values=[all_text] + list(statuses), **spinner_options)
+        package_spinner = Spinner(text=all_text, values=[all_text] + list(self.packages.keys()), **spinner_options)
+        
+        content.add_widget(self.create_label('الصيغة:'))
+        content.add_widget(format_spinner)
+        content.add_widget(self.create_label('الحالة:'))
+        content.add_widget(status_spinner)
+        content.add_widget(self.create_label('الباقة:'))
+        content.add_widget(package_spinner)
+        
+        # نطاق تاريخ الانتهاء (اختياري)
+        dates = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
+        end_from_input = self.create_input()
+        end_from_input.hint_text = 'ينتهي من YYYY-MM-DD'
+        end_to_input = self.create_input()
+        end_to_input.hint_text = 'حتى YYYY-MM-DD'
+        dates.add_widget(end_from_input)
+        dates.add_widget(end_to_input)
+        content.add_widget(self.create_label('تاريخ الانتهاء:'))
+        content.add_widget(dates)
+        
+        buttons = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
         
         popup = Popup(
-            title=title,
+            title='تصدير العملاء',
             content=content,
-            size_hint=(0.8, 0.4)
+            size_hint=(0.8, 0.85)
         )
         
-        close_btn.bind(on_press=popup.dismiss)
+        def start_export(instance):
+            try:
+                end_from, end_to = (
+                    parse_date(text_input.text).date().isoformat() if text_input.text.strip() else None
+                    for text_input in (end_from_input, end_to_input)
+                )
+            except ValidationError as e:
+                self.show_popup('خطأ', str(e))
+                return
+            popup.dismiss()
+            file_name = f"customers_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format_spinner.text.lower()}"
+            self.export_file(
+                os.path.join(os.getcwd(), file_name),
+                status=statuses.get(status_spinner.text),
+                package=package_spinner.text if package_spinner.text != all_text else None,
+                end_from=end_from,
+                end_to=end_to
+            )
+        
+        export_btn = Button(
+            text='تصدير',
+            background_color=get_color_from_hex('#00d9ff'),
+            background_normal=''
+        )
+        export_btn.bind(on_press=start_export)
+        
+        cancel_btn = Button(
+            text='إلغاء',
+            background_color=get_color_from_hex('#78909c'),
+            background_normal=''
+        )
+        cancel_btn.bind(on_press=popup.dismiss)
+        
+        buttons.add_widget(cancel_btn)
+        buttons.add_widget(export_btn)
+        content.add_widget(buttons)
+        
+        popup.open()
+    
+    def export_file(self, path, **filters):
+        """تصدير العملاء في thread قاعدة البيانات"""
+        from exporter import export_customers
+        
+        self.worker.submit(
+            lambda: export_customers(self.repo, path, **filters),
+            on_result=lambda count: self.show_popup('التصدير', f'تم تصدير {count} عميل إلى:\n{path}'),
+            on_error=self.on_db_error
+        )
+    
+    def open_dashboard(self, instance):
+        """تحميل الإحصائيات في thread قاعدة البيانات ثم عرضها"""
+        self.worker.submit(self.repo.dashboard, on_result=self.show_dashboard, on_error=self.on_db_error)
+    
+    def open_sync(self, instance):
+        """تحميل إعدادات المزامنة المحفوظة ثم عرضها"""
+        self.worker.submit(
+            lambda: (self.repo.get_state('sync_url', ''), self.repo.get_state('sync_token', '')),
+            on_result=self.show_sync, on_error=self.on_db_error
+        )
+    
+    def show_sync(self, settings):
+        """إعداد خادم المزامنة وبدء المزامنة"""
+        from kivy.uix.popup import Popup
+        
+        url, token = settings        
+        content = BoxLayout(orientation='vertical', spacing=dp(10), padding=dp(10))
+        
+        input_options = dict(
+            multiline=False,
+            size_hint_y=None,
+            height=dp(45),
+            background_color=get_color_from_hex('#16213e'),
+            foreground_color=(1, 1, 1, 1),
+            cursor_color=(1, 1, 1, 1)
+        )
+        url_input = TextInput(
+            text=url,
+            hint_text='عنوان الخادم مثل http://192.168.1.10:8765',
+            **input_options
+        )
+        token_input = TextInput(
+            text=token,
+            hint_text='رمز الخادم (اختياري)',
+            password=True,
+            **input_options
+        )
+        
+        buttons = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
+        
+        popup = Popup(
+            title='مزامنة الأجهزة',
+            content=content,
+            size_hint=(0.9, 0.5)
+        )
+        
+        def start_sync(instance):
+            url = url_input.text.strip()
+            if not url:
+                self.show_popup('خطأ', 'الرجاء إدخال عنوان الخادم')
+                return
+            popup.dismiss()
+            self.start_sync(url, token_input.text.strip())
+        
+        sync_btn = Button(
+            text='مزامنة الآن',
+            background_color=get_color_from_hex('#5c6bc0'),
+            background_normal=''
+        )
+        sync_btn.bind(on_press=start_sync)
+        
+        cancel_btn = Button(
+            text='إلغاء',
+            background_color=get_color_from_hex('#78909c'),
+            background_normal=''
+        )
+        cancel_btn.bind(on_press=popup.dismiss)
+        
+        buttons.add_widget(cancel_btn)
+        buttons.add_widget(sync_btn)
+        
+        content.add_widget(url_input)
+        content.add_widget(token_input)
+        content.add_widget(Label())
+        content.add_widget(buttons)
+        
+        popup.open()
+    
+    def start_sync(self, url, token):
+        """
+        المزامنة في thread مستقل: طلبات الشبكة لا تشغل thread قاعدة البيانات،
+        وعمليات القاعدة فقط تُرسل إليه بالترتيب مع باقي المهام
+        """
+        if self.syncing:
+            self.show_popup('المزامنة', 'المزامنة جارية بالفعل')
+            return
+        self.syncing = True
+        
+        def run():
+            try:
+                result = self.sync_now(url, token)
+            except Exception as e:
+                self.deliver(self.on_sync_error, e)
+            else:
+                self.deliver(self.on_synced, result)
+        
+        threading.Thread(target=run, name='sync', daemon=True).start()
+    
+    def sync_now(self, url, token):
+        """حفظ إعدادات الخادم والمزامنة (في thread المزامنة)"""
+        from sync import SyncClient
+        
+        call = self.worker.call
+        call(self.repo.set_state, 'sync_url', url)
+        call(self.repo.set_state, 'sync_token', token)
+        result = SyncClient(self.repo, url, token or None, run_db=call).sync()
+        result['packages'] = call(self.repo.packages)
+        return result
+    
+    def on_sync_error(self, error):
+        """فشل المزامنة"""
+        self.syncing = False
+        self.on_db_error(error)
+    
+    def on_synced(self, result):
+        """تحديث القائمة إذا وصلت تغييرات من الأجهزة الأخرى"""
+        self.syncing = False
+        self.set_packages(result['packages'])
+        if result['applied']:
+            self.load_customers(self.search_term)
+            self.update_status_counts()
+        
+        message = (
+            f"أُرسل {result['pushed']} تغيير واستُقبل {result['received']} (طُبق {result['applied']})\n"
+            f"حجم البيانات: {(result['sent_bytes'] + result['received_bytes']) / 1024:.1f} KB"
+        )
+        if result['unassigned']:
+            message += f"\n{result['unassigned']} عميل بباقة غير موجودة هنا: تم حفظهم في '{UNASSIGNED_PACKAGE}'"
+        self.show_popup('المزامنة', message)
+    
+    def start_backup(self, auto=False):
+        """
+        نسخة احتياطية في thread مستقل باتصال خاص بها (لا تشغل thread قاعدة البيانات)
+        auto: فقط إذا مضى وقت كافٍ على آخر نسخة
+        """
+        from backup import BackupStore
+        
+        store = BackupStore(os.path.join(os.getcwd(), 'backups'))
+        
+        def run():
+            try:
+                # ترتيب اللقطات يقرأ ملفاتها، لذلك يتم التحقق هنا وليس في واجهة المستخدم
+                if auto and not store.needs_backup():
+                    return
+                result = store.backup(self.repo.path)
+            except Exception as e:
+                Logger.warning(f'Backup: تعذر إنشاء النسخة الاحتياطية: {e}')
+                if not auto:
+                    self.deliver(self.on_db_error, e)
+                return
+            Logger.info(
+                f"Backup: {result['snapshot']} {result['written']}/{result['pages']} صفحة "
+                f"{result['bytes'] / 1024:.0f} KB في {result['seconds']:.1f} ث"
+            )
+            if not auto:
+                self.deliver(self.show_popup, 'النسخ الاحتياطي', (
+                    f"تم إنشاء النسخة {result['snapshot']}\n"
+                    f"صفحات متغيرة: {result['written']} من {result['pages']} ({result['bytes'] / 1024:.0f} KB)"
+                ))
+        
+        threading.Thread(target=run, name='backup', daemon=True).start()
+    
+    def open_backups(self, instance):
+        """إنشاء نسخة احتياطية أو استعادة نسخة سابقة"""
+        from kivy.uix.popup import Popup
+        from kivy.uix.spinner import Spinner
+        from backup import BackupStore
+        
+        store = BackupStore(os.path.join(os.getcwd(), 'backups'))
+        snapshots = store.snapshots()[::-1]
+        
+        content = BoxLayout(orientation='vertical', spacing=dp(10), padding=dp(10))
+        
+        snapshot_spinner = Spinner(
+            text=snapshots[0] if snapshots else 'لا توجد نسخ',
+            values=snapshots,
+            size_hint_y=None,
+            height=dp(50),
+            background_color=get_color_from_hex('#16213e'),
+            color=(1, 1, 1, 1)
+        )
+        
+        buttons = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
+        
+        popup = Popup(
+            title='النسخ الاحتياطي',
+            content=content,
+            size_hint=(0.9, 0.45)
+        )
+        
+        def backup_now(instance):
+            popup.dismiss()
+            self.start_backup()
+        
+        def restore(instance):
+            popup.dismiss()
+            self.confirm_restore(snapshot_spinner.text)
+        
+        backup_btn = Button(
+            text='نسخة الآن',
+            background_color=get_color_from_hex('#26a69a'),
+            background_normal=''
+        )
+        backup_btn.bind(on_press=backup_now)
+        
+        restore_btn = Button(
+            text='استعادة',
+            background_color=get_color_from_hex('#ef5350'),
+            background_normal='',
+            disabled=not snapshots
+        )
+        restore_btn.bind(on_press=restore)
+        
+        cancel_btn = Button(
+            text='إغلاق',
+            background_color=get_color_from_hex('#78909c'),
+            background_normal=''
+        )
+        cancel_btn.bind(on_press=popup.dismiss)
+        
+        buttons.add_widget(cancel_btn)
+        buttons.add_widget(restore_btn)
+        buttons.add_widget(backup_btn)
+        
+        content.add_widget(Label(text='اختر نسخة للاستعادة:', size_hint_y=None, height=dp(30)))
+        content.add_widget(snapshot_spinner)
+        content.add_widget(Label())
+        content.add_widget(buttons)
+        
+        popup.open()
+    
+    def confirm_restore(self, snapshot):
+        """تأكيد استبدال البيانات الحالية بنسخة احتياطية"""
+        from kivy.uix.popup import Popup
+        
+        content = BoxLayout(orientation='vertical', spacing=dp(10), padding=dp(10))
+        
+        message = Label(
+            text=f'سيتم استبدال جميع البيانات الحالية بالنسخة {snapshot}. هل أنت متأكد؟',
+            size_hint_y=0.7,
+            halign='center',
+            valign='middle'
+        )
+        message.bind(size=message.setter('text_size'))
+        
+        buttons = BoxLayout(size_hint_y=0.3, spacing=dp(10))
+        
+        popup = Popup(
+            title='تأكيد الاستعادة',
+            content=content,
+            size_hint=(0.8, 0.35)
+        )
+        
+        def confirm(instance):
+            popup.dismiss()
+            self.worker.submit(
+                self.restore_backup, snapshot,
+                on_result=self.on_backup_restored, on_error=self.on_db_error
+            )
+        
+        yes_btn = Button(
+            text='نعم',
+            background_color=get_color_from_hex('#ef5350'),
+            background_normal=''
+        )
+        yes_btn.bind(on_press=confirm)
+        
+        no_btn = Button(
+            text='لا',
+            background_color=get_color_from_hex('#78909c'),
+            background_normal=''
+        )
+        no_btn.bind(on_press=popup.dismiss)
+        
+        buttons.add_widget(no_btn)
+        buttons.add_widget(yes_btn)
+        
+        content.add_widget(message)
+        content.add_widget(buttons)
+        
+        popup.open()
+    
+    def restore_backup(self, snapshot):
+        """
+        استعادة نسخة (في thread قاعدة البيانات) ثم ترقية مخططها إن كانت من إصدار أقدم
+        خدمة التنبيهات تُوقف أثناء الاستبدال ثم تُشغل على القاعدة المستعادة
+        """
+        from backup import BackupStore
+        
+        store = BackupStore(os.path.join(os.getcwd(), 'backups'))
+        self.stop_alert_service()
+        self.repo.close()
+        try:
+            store.restore(snapshot, self.repo.path)
+        finally:
+            self.repo.fts = self.repo.setup()
+            self.deliver(self.start_alert_service)
+        return snapshot, self.repo.packages()
+    
+    def on_backup_restored(self, result):
+        """إعادة تحميل كل البيانات بعد الاستعادة"""
+        snapshot, packages = result
+        self.set_packages(packages)
+        self.clear_fields()
+        self.load_customers(self.search_term)
+        self.update_status_counts()
+        self.check_notifications()
+        self.show_popup('نجح', f'تمت استعادة النسخة {snapshot}')
+    
+    def open_packages(self, instance):
+        """تحميل عدد العملاء في كل باقة ثم عرض إدارة الباقات"""
+        self.worker.submit(
+            lambda: (self.repo.packages(), self.repo.package_counts()),
+            on_result=self.show_packages, on_error=self.on_db_error
+        )
+    
+    def show_packages(self, result):
+        """إضافة باقة أو تعديل أسعار ومدد الباقات وأسمائها أو حذفها"""
+        from kivy.uix.popup import Popup
+        from kivy.uix.spinner import Spinner
+        
+        packages, counts = result
+        new_text = 'باقة جديدة'
+        
+        content = BoxLayout(orientation='vertical', spacing=dp(10), padding=dp(10))
+        
+        package_spinner = Spinner(
+            text=new_text,
+            values=[new_text] + list(packages.keys()),
+            size_hint_y=None,
+            height=dp(50),
+            background_color=get_color_from_hex('#16213e'),
+            color=(1, 1, 1, 1)
+        )
+        
+        input_options = dict(
+            multiline=False,
+            size_hint_y=None,
+            height=dp(45),
+            background_color=get_color_from_hex('#16213e'),
+            foreground_color=(1, 1, 1, 1),
+            cursor_color=(1, 1, 1, 1)
+        )
+        name_input = TextInput(hint_text='اسم الباقة', **input_options)
+        price_input = TextInput(hint_text='السعر (0 = يُدخل يدوياً)', input_filter='float', **input_options)
+        months_input = TextInput(hint_text='المدة بالشهور (0 = تاريخ الانتهاء يدوياً)', input_filter='int', **input_options)
+        count_label = Label(text='', size_hint_y=None, height=dp(30))
+        
+        # بعد تغيير المدة: تاريخ الانتهاء = البداية + المدة الجديدة لكل عملاء الباقة
+        recompute_toggle = ToggleButton(
+            text='إعادة حساب تواريخ انتهاء عملائها',
+            size_hint_y=None,
+            height=dp(45),
+            background_color=get_color_from_hex('#16213e'),
+            color=(1, 1, 1, 1)
+        )
+        
+        buttons = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
+        
+        popup = Popup(
+            title='إدارة الباقات',
+            content=content,
+            size_hint=(0.9, 0.75)
+        )
+        
+        def selected_id():
+            package = packages.get(package_spinner.text)
+            return package['id'] if package else None
+        
+        def on_package_chosen(spinner, text):
+            package = packages.get(text)
+            if package is None:
+                name_input.text = price_input.text = months_input.text = count_label.text = ''
+            else:
+                name_input.text = text
+                price_input.text = str(package['price'])
+                months_input.text = str(package['months'])
+                count_label.text = f"عدد العملاء: {counts.get(package['id'], 0)}"
+            delete_btn.disabled = package is None
+            recompute_toggle.state = 'normal'
+        
+        def save(instance):
+            try:
+                package = validate_package({
+                    'name': name_input.text,
+                    'price': price_input.text,
+                    'months': months_input.text
+                })
+            except ValidationError as e:
+                self.show_popup('خطأ', str(e))
+                return
+            popup.dismiss()
+            self.worker.submit(
+                self.save_package, selected_id(), package, recompute_toggle.state == 'down',
+                on_result=self.on_packages_changed, on_error=self.on_package_error
+            )
+        
+        def delete(instance):
+            popup.dismiss()
+            self.worker.submit(
+                self.delete_package, selected_id(), package_spinner.text,
+                on_result=self.on_packages_changed, on_error=self.on_package_error
+            )
+        
+        package_spinner.bind(text=on_package_chosen)
+        
+        save_btn = Button(
+            text='حفظ',
+            background_color=get_color_from_hex('#00d9ff'),
+            color=get_color_from_hex('#16213e'),
+            background_normal=''
+        )
+        save_btn.bind(on_press=save)
+        
+        delete_btn = Button(
+            text='حذف',
+            background_color=get_color_from_hex('#ef5350'),
+            background_normal='',
+            disabled=True
+        )
+        delete_btn.bind(on_press=delete)
+        
+        cancel_btn = Button(
+            text='إغلاق',
+            background_color=get_color_from_hex('#78909c'),
+            background_normal=''
+        )
+        cancel_btn.bind(on_press=popup.dismiss)
+        
+        buttons.add_widget(cancel_btn)
+        buttons.add_widget(delete_btn)
+        buttons.add_widget(save_btn)
+        
+        content.add_widget(package_spinner)
+        content.add_widget(name_input)
+        content.add_widget(price_input)
+        content.add_widget(months_input)
+        content.add_widget(count_label)
+        content.add_widget(recompute_toggle)
+        content.add_widget(Label())
+        content.add_widget(buttons)
+        
         popup.open()
     
+    def save_package(self, package_id, package, recompute):
+        """حفظ باقة وإعادة حساب تواريخ عملائها إن طُلب (في thread قاعدة البيانات)"""
+        self.repo.save_package(package_id, package)
+        message = f"تم حفظ الباقة {package['name']}"
+        if recompute:
+            message += f"\nتم تعديل تاريخ انتهاء {self.repo.recompute_end_dates(package['name'])} عميل"
+        return self.repo.packages(), message
+    
+    def delete_package(self, package_id, name):
+        """حذف باقة (في thread قاعدة البيانات)"""
+        self.repo.delete_package(package_id)
+        return self.repo.packages(), f'تم حذف الباقة {name}'
+    
+    def on_packages_changed(self, result):
+        """تحديث الباقات في النموذج والقائمة (الاسم والتواريخ ربما تغيرت)"""
+        packages, message = result
+        self.set_packages(packages)
+        self.load_customers(self.search_term)
+        self.update_status_counts()
+        self.show_popup('نجح', message)
+    
+    def on_package_error(self, error):
+        """عرض سبب رفض تعديل الباقة"""
+        if isinstance(error, ValidationError):
+            self.show_popup('خطأ', str(error))
+        else:
+            self.on_db_error(error)
+    
+    def show_dashboard(self, result):
+        """عرض الإحصائيات"""
+        from kivy.uix.popup import Popup
+        
+        days = result['days']
+        lines = ['الإيراد الشهري:']
+        lines += [f"• {month}: {revenue:.0f} ج.م" for month, revenue in result['monthly_revenue']] or ['• لا يوجد']
+        
+        lines += ['', f"المشتركون النشطون: {result['active_total']}"]
+        lines += [f"• {package}: {count}" for package, count in result['active_by_package']]
+        
+        lines.append('')
+        if result['renewal_rate'] is None:
+            lines.append(f'نسبة التجديد (آخر {days} يوم): لا توجد اشتراكات منتهية')
+        else:
+            lines.append(
+                f"نسبة التجديد (آخر {days} يوم): {result['renewal_rate']:.0%} "
+                f"({result['renewals']} من {result['ended']})"
+            )
+            lines.append(f"نسبة عدم التجديد: {result['churn_rate']:.0%}")
+        
+        lines.append(f"تنتهي خلال {days} يوم: {result['due_count']} اشتراك بقيمة {result['due_amount']:.0f} ج.م")
+        lines.append(f"الإيراد المتوقع خلال {days} يوم: {result['expected_revenue']:.0f} ج.م")
+        
+        content = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
+        
+        scroll = ScrollView()
+        message_label = Label(
+            text='\n'.join(lines),
+            size_hint_y=None,
+            halign='right',
+            valign='top'
+        )
+        message_label.bind(
+            width=lambda label, width: setattr(label, 'text_size', (width, None)),
+            texture_size=lambda label, size: setattr(label, 'height', size[1])
+        )
+        scroll.add_widget(message_label)
+        
+        close_btn = Button(
+            text='إغلاق',
+            size_hint_y=None,
+            height=dp(50),
+            background_color=get_color_from_hex('#00d9ff'),
+            background_normal=''
+        )
+        
+        content.add_widget(scroll)
+        content.add_widget(close_btn)
+        
+        popup = Popup(
+            title='الإحصائيات',
+            content=content,
+            size_hint=(0.9, 0.8)
+        )
+        
+        close_btn.bind(on_press=popup.dismiss)
+        popup.open()
+    
+    def on_select_mode(self, instance, state):
+        """تشغيل وإيقاف وضع التحديد المتعدد"""
+        self.selecting = state == 'down'
+        if not self.selecting:
+            self.clear_selection()
+    
+    def toggle_selected(self, customer):
+        """تحديد عميل أو إلغاء تحديده"""
+        if customer.id in self.selected_ids:
+            self.selected_ids.discard(customer.id)
+        else:
+            self.selected_ids.add(customer.id)
+        self.show_selection()
+    
+    def select_all(self):
+        """تحديد كل العملاء المحمّلين في القائمة (نتيجة البحث الحالية)"""
+        self.select_toggle.state = 'down'
+        self.selected_ids.update(customer.id for customer in self.search_results or ())
+        self.show_selection()
+    
+    def clear_selection(self):
+        """إلغاء كل التحديدات"""
+        self.selected_ids.clear()
+        self.show_selection()
+    
+    def show_selection(self):
+        """تحديث الصفوف الظاهرة وزر التجديد"""
+        self.renew_btn.text = f'تجديد المحدد ({len(self.selected_ids)})'
+        self.renew_btn.disabled = not self.selected_ids
+        self.customers_view.refresh_from_data()
+    
+    def open_batch_renew(self, instance):
+        """اختيار باقة التجديد الجماعي"""
+        from kivy.uix.popup import Popup
+        from kivy.uix.spinner import Spinner
+        
+        own_package = 'باقة كل عميل'
+        content = BoxLayout(orientation='vertical', spacing=dp(10), padding=dp(10))
+        
+        message = Label(
+            text=f'تجديد {len(self.selected_ids)} عميل بمدة الباقة من تاريخ انتهاء اشتراكهم',
+            halign='right',
+            valign='middle'
+        )
+        message.bind(size=message.setter('text_size'))
+        
+        package_spinner = Spinner(
+            text=own_package,
+            values=[own_package] + [name for name, package in self.packages.items() if package['months'] > 0],
+            size_hint_y=None,
+            height=dp(50),
+            background_color=get_color_from_hex('#16213e'),
+            color=(1, 1, 1, 1)
+        )
+        
+        buttons = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
+        
+        popup = Popup(
+            title='تجديد جماعي',
+            content=content,
+            size_hint=(0.8, 0.5)
+        )
+        
+        def start_renew(instance):
+            popup.dismiss()
+            package = package_spinner.text if package_spinner.text != own_package else None
+            self.worker.submit(
+                self.repo.renew_customers, list(self.selected_ids), self.packages, package,
+                on_result=self.on_customers_renewed, on_error=self.on_db_error
+            )
+        
+        renew_btn = Button(
+            text='تجديد',
+            background_color=get_color_from_hex('#00d9ff'),
+            background_normal=''
+        )
+        renew_btn.bind(on_press=start_renew)
+        
+        cancel_btn = Button(
+            text='إلغاء',
+            background_color=get_color_from_hex('#78909c'),
+            background_normal=''
+        )
+        cancel_btn.bind(on_press=popup.dismiss)
+        
+        buttons.add_widget(cancel_btn)
+        buttons.add_widget(renew_btn)
+        
+        content.add_widget(message)
+        content.add_widget(package_spinner)
+        content.add_widget(buttons)
+        
+        popup.open()
+    
+    def on_customers_renewed(self, result):
+        """تحديث القائمة مرة واحدة بعد التجديد الجماعي"""
+        pairs, skipped = result
+        
+        for old, customer in pairs:
+            self.remove_result(old)
+            self.insert_result(customer)
+            if self.status_counts is not None:
+                self.status_counts[old['status']] -= 1
+                self.status_counts[customer['status']] += 1
+        
+        with PROFILER.timed('list.renew'):
+            self.customers_view.data = self.search_results
+        # العملاء المجددون ينتقلون لما بعد الصفوف المحمّلة فقد تقصر القائمة عن الصفحة
+        if len(self.search_results) < PAGE_SIZE:
+            self.load_next_page()
+        if self.status_counts is not None:
+            self.show_status_counts(self.status_counts)
+        self.select_toggle.state = 'normal'
+        self.clear_selection()
+        
+        message = f'تم تجديد {len(pairs)} عميل'
+        if skipped:
+            message += f"\n\nلم يُجدد {len(skipped)} (الباقة بدون مدة):\n"
+            message += "\n".join(f"• {name}" for name in skipped[:5])
+            if len(skipped) > 5:
+                message += f"\n... و {len(skipped) - 5} آخرين"
+        self.show_popup('التجديد', message)
+    
+    def load_customers(self, search_term=''):
+        """تحميل قائمة العملاء (الصفحة الأولى فقط)"""
+        self.search_term = search_term
+        self.search_results = []
+        self.has_more = True
+        self.last_key = None
+        self.page_loading = False
+        with PROFILER.timed('list.reset'):
+            self.customers_view.data = []
+            self.customers_view.scroll_y = 1
+        
+        # أي صفحة قيد التحميل لقائمة سابقة تُهمل نتيجتها
+        self.list_generation += 1
+        self.load_next_page()
+    
+    def load_next_page(self):
+        """تحميل الصفحة التالية من العملاء بترتيب (end_date, id)"""
+        if not self.has_more or self.page_loading:
+            return
+        
+        self.page_loading = True
+        generation = self.list_generation
+        self.worker.submit(
+            self.fetch_page, generation, self.search_term, self.last_key,
+            on_result=lambda customers: self.on_page_loaded(generation, customers),
+            on_error=self.on_page_error
+        )
+    
+    def fetch_page(self, generation, search_term, after):
+        """جلب صفحة (في thread قاعدة البيانات) ما لم تصبح القائمة قديمة"""
+        if generation != self.list_generation:
+            return None
+        return self.repo.list_records(search_term, after, PAGE_SIZE)
+    
+    def on_page_error(self, error):
+        """فشل تحميل صفحة"""
+        self.page_loading = False
+        self.on_db_error(error)
+    
+    def on_page_loaded(self, generation, customers):
+        """إضافة الصفحة المحمّلة إلى القائمة"""
+        if generation != self.list_generation or customers is None:
+            return
+        
+        self.page_loading = False
+        
+        self.has_more = len(customers) == PAGE_SIZE
+        if customers:
+            self.last_key = (customers[-1].end_date, customers[-1].id)
+        
+        self.search_results.extend(customers)
+        with PROFILER.timed('list.page'):
+            self.customers_view.data.extend(customers)
+        self.startup_step('list')
+    
+    def insert_row(self, customer):
+        """إدراج عميل في موضعه حسب الترتيب دون إعادة تحميل القائمة"""
+        position = self.insert_result(customer)
+        if position is not None:
+            self.customers_view.data.insert(position, self.search_results[position])
+    
+    def remove_row(self, customer):
+        """حذف صف عميل من القائمة إن كان محمّلاً"""
+        position = self.remove_result(customer)
+        if position is not None:
+            del self.customers_view.data[position]
+    
+    def insert_result(self, customer):
+        """إدراج عميل في النتائج المحمّلة وإرجاع موضعه، أو None إن لم يُدرج"""
+        if customer is None or self.search_results is None:
+            return None
+        if self.search_term and not matches(customer['name'], customer['phone'], self.search_term):
+            return None
+        
+        # السجلات مرتبة حسب (end_date, id) فيمكن البحث فيها مباشرة
+        record = CustomerRecord.from_customer(customer)
+        position = bisect_left(self.search_results, record)
+        
+        # بعد آخر صف محمّل: سيظهر عند تحميل الصفحة التالية
+        if position == len(self.search_results) and self.has_more:
+            return None
+        
+        self.search_results.insert(position, record)
+        return position
+    
+    def remove_result(self, customer):
+        """حذف عميل من النتائج المحمّلة وإرجاع موضعه، أو None إن لم يكن محمّلاً"""
+        if customer is None or self.search_results is None:
+            return None
+        
+        record = CustomerRecord.from_customer(customer)
+        position = bisect_left(self.search_results, record)
+        if position < len(self.search_results) and self.search_results[position].id == record.id:
+            del self.search_results[position]
+            return position
+        return None
+    
+    def on_list_scroll(self, instance, scroll_y):
+        """تحميل صفحة جديدة عند الاقتراب من نهاية القائمة"""
+        if not self.has_more:
+            return
+        hidden = instance.layout_manager.height - instance.height
+        if scroll_y * hidden < instance.height:
+            self.load_next_page()
+    
+    def update_status_counts(self):
+        """تحديث شريط عدد العملاء حسب الحالة"""
+        self.worker.submit(self.repo.status_counts, on_result=self.show_status_counts, on_error=self.on_db_error)
+    
+    def change_status_count(self, old, new):
+        """تعديل عدد العملاء حسب الحالة بعد تعديل صف واحد"""
+        if self.status_counts is None:
+            return
+        if old is not None:
+            self.status_counts[old['status']] -= 1
+        if new is not None:
+            self.status_counts[new['status']] += 1
+        self.show_status_counts(self.status_counts)
+    
+    def show_status_counts(self, counts):
+        """عرض عدد العملاء حسب الحالة"""
+        self.status_counts = counts
+        self.counts_label.text = (
+            f"منتهي: {counts['expired']} | تحذير: {counts['warning']} | نشط: {counts['active']}"
+        )
+    
+    def on_customer_click(self, customer_data):
+        """عند النقر على عميل"""
+        self.ensure_form()
+        self.selected_customer = customer_data
+        
+        # ملء الحقول
+        self.name_input.text = customer_data.name
+        self.phone_input.text = customer_data.phone
+        self.package_spinner.text = customer_data.package
+        self.amount_input.text = str(customer_data.amount)
+        
+        self.notification_input.text = str(customer_data.notification_days)
+        self.end_date_picker.set_date(date.fromordinal(customer_data.end_day))
+        
+        # تحميل بقية بيانات العميل عند فتحه فقط
+        self.worker.submit(
+            self.repo.get_details, customer_data.id,
+            on_result=lambda details: self.show_customer_details(customer_data, details),
+            on_error=self.on_db_error
+        )
+    
+    def show_customer_details(self, customer_data, details):
+        """ملء الحقول التفصيلية بعد تحميلها"""
+        if self.selected_customer is not customer_data or details is None:
+            return
+        
+        start_date = datetime.strptime(details['start_date'], '%Y-%m-%d')
+        self.start_date_picker.set_date(start_date)
+        self.notes_input.text = details['notes'] if details['notes'] else ''
+    
+    def on_search(self, instance, value):
+        """البحث عن العملاء - ينتظر توقف الكتابة ويلغي أي بحث سابق لم يُنفذ"""
+        if self.search_event is not None:
+            self.search_event.cancel()
+        self.search_event = Clock.schedule_once(lambda dt: self.run_search(value), SEARCH_DEBOUNCE)
+    
+    def run_search(self, search_term):
+        """تنفيذ البحث"""
+        self.search_event = None
+        
+        # إذا كانت النتائج السابقة محمّلة بالكامل والنص الجديد امتداداً للسابق
+        # نضيّق النتائج الحالية بدون استعلام جديد
+        if (self.search_results is not None and not self.has_more
+                and is_refinement(self.search_term, search_term)):
+            rows = [c for c in self.search_results if matches(c.name, c.phone, search_term)]
+            self.search_term = search_term
+            self.search_results = rows
+            with PROFILER.timed('list.narrow'):
+                self.customers_view.data = rows
+        else:
+            self.load_customers(search_term)
+    
+    def clear_fields(self):
+        """مسح جميع الحقول"""
+        self.name_input.text = ''
+        self.phone_input.text = ''
+        self.package_spinner.text = 'اختر الباقة'
+        self.amount_input.text = ''
+        self.start_date_picker.set_date(datetime.now())
+        self.end_date_picker.set_date(datetime.now())
+        self.notification_input.text = '5'
+        self.notes_input.text = ''
+        self.selected_customer = None
+    
+    def check_notifications(self):
+        """فحص التنبيهات"""
+        self.notifications_checked = datetime.now().strftime('%Y-%m-%d')
+        self.worker.submit(self.repo.notifications, on_result=self.show_notifications, on_error=self.on_db_error)
+    
+    def recheck_notifications(self, dt):
+        """إعادة الفحص الدوري: تُعرض التنبيهات فقط عند استحقاق تنبيهات جديدة"""
+        since = self.notifications_checked
+        today = datetime.now().strftime('%Y-%m-%d')
+        if today != since:
+            # تغيّر اليوم: الأيام المتبقية والحالات تغيرت (مرة واحدة حتى لو لم تستحق تنبيهات جديدة)
+            self.notifications_checked = today
+            self.load_customers(self.search_term)
+            self.update_status_counts()
+        
+        def on_new_alerts(count):
+            if count:
+                self.check_notifications()
+        
+        self.worker.submit(self.repo.new_alerts, since, on_result=on_new_alerts, on_error=self.on_db_error)
+    
+    def show_notifications(self, result):
+        """عرض التنبيهات"""
+        expired = [f"• {name} - انتهى منذ {abs(days)} يوم" for name, days in result['expired']]
+        warnings = [f"• {name} - باقي {days} يوم" for name, days in result['warning']]
+        
+        if expired or warnings:
+            notification_message = ""
+            
+            if expired:
+                notification_message += "⚠️ اشتراكات منتهية:\n"
+                notification_message += "\n".join(expired)
+                if result['expired_count'] > len(expired):
+                    notification_message += f"\n... و {result['expired_count'] - len(expired)} آخرين"
+                notification_message += "\n\n"
+            
+            if warnings:
+                notification_message += "🔔 تنبيهات الاشتراكات:\n"
+                notification_message += "\n".join(warnings)
+                if result['warning_count'] > len(warnings):
+                    notification_message += f"\n... و {result['warning_count'] - len(warnings)} آخرين"
+            
+            self.show_popup('تنبيهات الاشتراكات', notification_message)
+    
+    def show_popup(self, title, message):
+        """عرض نافذة منبثقة"""
+        from kivy.uix.popup import Popup
+        
+        with PROFILER.timed('popup'):
+            content = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
+            
+            message_label = Label(
+                text=message,
+                size_hint_y=0.8,
+                halign='right',
+                valign='middle'
+            )
+            message_label.bind(size=message_label.setter('text_size'))
+            
+            close_btn = Button(
+                text='إغلاق',
+                size_hint_y=0.2,
+                background_color=get_color_from_hex('#00d9ff'),
+                background_normal=''
+            )
+            
+            content.add_widget(message_label)
+            content.add_widget(close_btn)
+            
+            popup = Popup(
+                title=title,
+                content=content,
+                size_hint=(0.8, 0.4)
+            )
+            
+            close_btn.bind(on_press=popup.dismiss)
+            popup.open()
+    
     def on_stop(self):
         """عند إغلاق التطبيق"""
-        if hasattr(self, 'conn'):
-            self.conn.close()
+        if hasattr(self, 'worker'):
+            self.worker.stop()
+        if hasattr(self, 'repo'):
+            self.repo.close()
 
 
 if __name__ == '__main__':
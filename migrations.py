@@ -0,0 +1,65 @@
+"""
+ترقية مخطط قاعدة البيانات حسب رقم الإصدار المحفوظ في PRAGMA user_version
+كل ترقية دالة تستقبل الاتصال وتُنفذ في معاملة مستقلة مع رفع رقم الإصدار،
+فإذا فشلت تبقى القاعدة على آخر إصدار سليم وتُعاد المحاولة عند التشغيل التالي.
+
+قواعد البيانات التي أُنشئت قبل ترقيم الإصدارات رقمها 0، لذلك يجب أن تكون كل
+ترقية قابلة للتنفيذ على جداول موجودة مسبقاً (IF NOT EXISTS وفحص الأعمدة).
+"""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def schema_version(conn):
+    """رقم إصدار المخطط الحالي"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def column_names(conn, table):
+    """أسماء أعمدة جدول"""
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+
+def table_exists(conn, name):
+    """هل يوجد جدول بهذا الاسم"""
+    return conn.execute('SELECT 1 FROM sqlite_master WHERE name = ?', (name,)).fetchone() is not None
+
+
+def migrate(conn, migrations):
+    """
+    تنفيذ الترقيات غير المطبقة بالترتيب (رقم الترقية = موضعها في القائمة بدءاً من 1)
+    migrations: قائمة (اسم, دالة)، ويعيد قائمة (رقم, اسم, زمن بالمللي ثانية) لما طُبق
+    الاتصال يجب أن يكون بدون معاملات تلقائية (isolation_level=None)
+    """
+    applied = []
+    if schema_version(conn) >= len(migrations):
+        return applied
+
+    for version, (name, upgrade) in enumerate(migrations, 1):
+        started = time.perf_counter()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # يُقرأ الإصدار داخل المعاملة: عملية أخرى (مثل خدمة التنبيهات) ربما طبقتها للتو
+            if schema_version(conn) >= version:
+                conn.execute('COMMIT')
+                continue
+            upgrade(conn)
+            conn.execute(f'PRAGMA user_version = {version}')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+        ms = (time.perf_counter() - started) * 1000
+        applied.append((version, name, ms))
+        logger.info('migration %d %s: %.1f ms', version, name, ms)
+
+    return applied
+
+
+def migrations_summary(applied):
+    """نص مختصر للترقيات المطبقة وأزمنتها"""
+    return ', '.join(f'{version} {name} {ms:.0f} ms' for version, name, ms in applied)
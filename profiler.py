@@ -0,0 +1,155 @@
+"""
+قياس أزمنة المسارات الساخنة عند الطلب (استعلامات SQL وتحديث القائمة والنوافذ والإطارات)
+يُفعّل بمتغير البيئة SUBSCRIPTIONS_PROFILE=1 أو بوجود الملف profile.enabled
+بجانب التطبيق. آخر العينات فقط تُحفظ لكل نوع (ring buffer) مع p50/p95/p99.
+
+عند عدم التفعيل لا تُستخدم الاتصالات المقاسة إطلاقاً، وtimed تعيد
+سياقاً فارغاً مشتركاً، لذلك لا يكاد يكون هناك أثر على الأداء.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+PROFILE_ENV = 'SUBSCRIPTIONS_PROFILE'
+PROFILE_FLAG = 'profile.enabled'
+
+# عدد العينات المحفوظة لكل نوع
+RING_SIZE = 500
+
+# أقصى طول لشكل الاستعلام المعروض
+SHAPE_LENGTH = 120
+
+SPACES_RE = re.compile(r'\s+')
+LITERALS_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+NULL_CONTEXT = nullcontext()
+
+
+def query_shape(sql):
+    """شكل الاستعلام: بدون المسافات الزائدة والقيم الثابتة"""
+    shape = LITERALS_RE.sub('?', SPACES_RE.sub(' ', sql).strip())
+    return 'sql: ' + shape[:SHAPE_LENGTH]
+
+
+def percentile(values, p):
+    """القيمة عند نسبة مئوية من قائمة مرتبة (nearest rank)"""
+    index = max(0, min(len(values) - 1, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+class Profiler:
+    """عينات الأزمنة بالمللي ثانية مجمعة حسب الاسم"""
+
+    def __init__(self, enabled=False, size=RING_SIZE):
+        self.enabled = enabled
+        self.size = size
+        self.series = {}
+        self.shapes = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, ms):
+        """إضافة عينة"""
+        with self.lock:
+            samples = self.series.get(name)
+            if samples is None:
+                samples = self.series[name] = deque(maxlen=self.size)
+            samples.append(ms)
+
+    def timed(self, name):
+        """سياق يقيس زمن ما بداخله عند التفعيل فقط"""
+        if not self.enabled:
+            return NULL_CONTEXT
+        return self.measure(name)
+
+    @contextmanager
+    def measure(self, name):
+        """قياس زمن ما بداخل السياق"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def record_sql(self, sql, ms):
+        """عينة استعلام مجمعة حسب شكله"""
+        shape = self.shapes.get(sql)
+        if shape is None:
+            shape = self.shapes[sql] = query_shape(sql)
+        self.record(shape, ms)
+
+    def stats(self):
+        """ملخص كل نوع: العدد و p50/p95/p99 والأقصى"""
+        with self.lock:
+            series = {name: sorted(samples) for name, samples in self.series.items()}
+
+        return {
+            name: {
+                'count': len(values),
+                'p50': round(percentile(values, 50), 3),
+                'p95': round(percentile(values, 95), 3),
+                'p99': round(percentile(values, 99), 3),
+                'max': round(values[-1], 3)
+            }
+            for name, values in series.items() if values
+        }
+
+    def summary(self, names=None, limit=3):
+        """نص مختصر للعرض: الأنواع المحددة ثم أبطأ الاستعلامات حسب p95"""
+        stats = self.stats()
+        lines = [
+            f"{name}: p50 {stats[name]['p50']:.1f} / p95 {stats[name]['p95']:.1f} ms"
+            for name in (names or ()) if name in stats
+        ]
+        queries = sorted(
+            (item for item in stats.items() if item[0].startswith('sql: ')),
+            key=lambda item: item[1]['p95'], reverse=True
+        )
+        lines.extend(f"{stat['p95']:.1f} ms  {name[5:60]}" for name, stat in queries[:limit])
+        return '\n'.join(lines)
+
+    def export(self, path):
+        """حفظ الملخص في ملف JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'ring_size': self.size,
+                'stats': self.stats()
+            }, f, ensure_ascii=False, indent=2)
+
+    def clear(self):
+        """حذف كل العينات"""
+        with self.lock:
+            self.series.clear()
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """اتصال يسجل زمن تنفيذ كل استعلام (حتى أول صف) في PROFILER"""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            PROFILER.record_sql(sql, (time.perf_counter() - started) * 1000)
+
+    def executemany(self, sql, parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, parameters)
+        finally:
+            PROFILER.record_sql(sql, (time.perf_counter() - started) * 1000)
+
+
+def connection_factory():
+    """نوع الاتصال المستخدم في sqlite3.connect"""
+    return ProfiledConnection if PROFILER.enabled else sqlite3.Connection
+
+
+PROFILER = Profiler(enabled=bool(os.environ.get(PROFILE_ENV)) or os.path.exists(PROFILE_FLAG))
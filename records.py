@@ -0,0 +1,91 @@
+"""
+سجل عميل مضغوط لقائمة العملاء في الذاكرة
+يستخدم __slots__ ويخزن تاريخ الانتهاء كرقم يوم (ordinal)، ولا تُحسب الحالة
+ونصها إلا للصفوف المعروضة فعلاً، وتبقى محفوظة حتى يتغير اليوم.
+"""
+
+from datetime import date
+from sys import intern
+
+from business import status_text
+
+# أعمدة قائمة العملاء بترتيب معاملات CustomerRecord
+RECORD_COLUMNS = ('id', 'name', 'phone', 'package', 'amount', 'end_date', 'notification_days')
+RECORD_COLUMNS_SQL = ', '.join(RECORD_COLUMNS)
+
+# المبالغ وأيام الانتهاء قيم قليلة ومتكررة: كائن واحد لكل قيمة
+SHARED_AMOUNTS = {}
+SHARED_DAYS = {}
+
+
+def today_ordinal():
+    """رقم يوم اليوم"""
+    return date.today().toordinal()
+
+
+class CustomerRecord:
+    """صف عميل في القائمة"""
+
+    __slots__ = ('id', 'name', 'phone', 'package', 'amount', 'end_day', 'notification_days',
+                 'cached_day', 'cached_status', 'cached_text')
+
+    def __init__(self, customer_id, name, phone, package, amount, end_date, notification_days):
+        self.id = customer_id
+        self.name = name
+        self.phone = phone or ''
+        # أسماء الباقات قليلة ومتكررة: نسخة واحدة من كل اسم
+        self.package = intern(package)
+        self.amount = SHARED_AMOUNTS.setdefault(amount, amount)
+        day = date.fromisoformat(end_date).toordinal()
+        self.end_day = SHARED_DAYS.setdefault(day, day)
+        self.notification_days = notification_days
+        self.cached_day = None
+
+    @classmethod
+    def from_customer(cls, customer):
+        """سجل من قاموس عميل (مثل نتيجة get_customer)"""
+        return cls(*(customer[column] for column in RECORD_COLUMNS))
+
+    @property
+    def end_date(self):
+        """تاريخ الانتهاء بصيغة قاعدة البيانات"""
+        return date.fromordinal(self.end_day).isoformat()
+
+    def __lt__(self, other):
+        # ترتيب القائمة (end_date, id) لاستخدام bisect مباشرة على السجلات
+        return (self.end_day, self.id) < (other.end_day, other.id)
+
+    def get(self, key, default=None):
+        """RecycleLayout يقرأ خصائص الحجم من عناصر البيانات، ولا يوجد منها شيء هنا"""
+        return default
+
+    def days_remaining(self, today=None):
+        """الأيام المتبقية حتى الانتهاء (سالبة بعده)"""
+        return self.end_day - (today or today_ordinal())
+
+    def refresh(self, today):
+        """حساب الحالة ونصها لليوم المحدد إن لم تكن محسوبة"""
+        if self.cached_day == today:
+            return
+
+        days = self.end_day - today
+        if days < 0:
+            status = 'expired'
+        elif days <= self.notification_days:
+            status = 'warning'
+        else:
+            status = 'active'
+
+        self.cached_day = today
+        self.cached_status = status
+        self.cached_text = status_text(status, days)
+
+    def status(self, today=None):
+        """حالة الاشتراك: expired أو warning أو active"""
+        self.refresh(today or today_ordinal())
+        return self.cached_status
+
+    def status_text(self, today=None):
+        """نص الحالة المعروض في القائمة"""
+        self.refresh(today or today_ordinal())
+        return self.cached_text
@@ -0,0 +1,840 @@
+"""
+طبقة الوصول إلى بيانات العملاء
+مستقلة عن Kivy بحيث يمكن استخدامها من مهام الخلفية أو سطر الأوامر أو القياس.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+import analytics
+from analytics import deferred_summary, renamed_package, setup_renewed_delete, setup_summary
+from business import (
+    DEFAULT_PACKAGES, UNASSIGNED_PACKAGE, ValidationError, add_months_text, is_renewal, renewal_dates
+)
+from profiler import connection_factory
+from records import RECORD_COLUMNS_SQL, CustomerRecord
+from migrations import column_names, migrate
+from sync import deferred_changes, setup_sync
+from search_index import (
+    PHONE_INDEX_SQL, register_functions, setup_search_index, has_fts, search_filter, deferred_indexing
+)
+
+DB_PATH = 'subscriptions.db'
+
+# إعدادات كل اتصال: WAL يسمح بالقراءة أثناء الكتابة، و synchronous=NORMAL آمن مع WAL
+# ويوفر مزامنة القرص عند كل معاملة، و cache_size بالكيلوبايت عند السالب
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-8000',
+    'PRAGMA mmap_size=67108864',
+    'PRAGMA foreign_keys=ON'
+)
+
+# عدد العملاء في كل صفحة من القائمة
+PAGE_SIZE = 200
+
+# حساب حالة الاشتراك داخل SQLite بدلاً من تحويل كل تاريخ في Python
+TODAY_SQL = "date('now', 'localtime')"
+DAYS_REMAINING_SQL = f"CAST(julianday(end_date) - julianday({TODAY_SQL}) AS INTEGER)"
+STATUS_SQL = f'''CASE
+    WHEN end_date < {TODAY_SQL} THEN 'expired'
+    WHEN {DAYS_REMAINING_SQL} <= notification_days THEN 'warning'
+    ELSE 'active'
+END'''
+
+# أعمدة قائمة العملاء (المعروضة فقط) مع الأيام المتبقية والحالة
+LIST_COLUMNS = ('id', 'name', 'phone', 'package', 'amount', 'end_date', 'notification_days',
+                'days_remaining', 'status')
+LIST_COLUMNS_SQL = f'''
+    id, name, phone, package, amount, end_date, notification_days,
+    {DAYS_REMAINING_SQL} AS days_remaining, {STATUS_SQL} AS status
+'''
+
+# تاريخ التنبيه = تاريخ الانتهاء - أيام التنبيه، يُحسب عند الحفظ ويُخزن مفهرساً
+def alert_date_sql(prefix=''):
+    """تعبير حساب تاريخ التنبيه (prefix مثل 'new.' داخل الـ triggers)"""
+    return f"date({prefix}end_date, printf('%+d days', -{prefix}notification_days))"
+
+
+# شروط الحالات تعتمد على فهرسي end_date و alert_date
+EXPIRED_WHERE_SQL = f"end_date < {TODAY_SQL}"
+# تاريخ التنبيه لا يسبق اليوم بأكثر من أكبر عدد أيام تنبيه، مما يحصر البحث في الفهرس
+WARNING_WHERE_SQL = f'''
+    alert_date <= {TODAY_SQL}
+    AND alert_date >= date({TODAY_SQL}, printf('%+d days', -(SELECT COALESCE(MAX(notification_days), 0) FROM customers)))
+    AND end_date >= {TODAY_SQL}
+'''
+
+# أعمدة التصدير (جميع بيانات العميل مع الحالة)
+EXPORT_COLUMNS = ('id', 'name', 'phone', 'package', 'amount', 'start_date', 'end_date', 'notification_days',
+                  'notes', 'created_at', 'days_remaining', 'status')
+EXPORT_COLUMNS_SQL = f'''
+    id, name, phone, package, amount, start_date, end_date, notification_days, notes, created_at,
+    {DAYS_REMAINING_SQL} AS days_remaining, {STATUS_SQL} AS status
+'''
+
+# شروط تصفية التصدير حسب الحالة
+STATUS_WHERE_SQL = {
+    'expired': EXPIRED_WHERE_SQL,
+    'warning': WARNING_WHERE_SQL,
+    'active': f"end_date >= {TODAY_SQL} AND {DAYS_REMAINING_SQL} > notification_days"
+}
+
+# عدد الصفوف المقروءة في كل مرة أثناء التصدير
+FETCH_SIZE = 500
+
+# أقصى عدد معاملات في استعلام IN واحد (حد SQLite القديم 999)
+IN_CHUNK_SIZE = 500
+
+# الحقول القابلة للتعديل بالترتيب المستخدم في INSERT و UPDATE
+CUSTOMER_FIELDS = ('name', 'phone', 'package', 'amount', 'start_date', 'end_date', 'notification_days', 'notes')
+
+INSERT_SQL = '''
+    INSERT INTO customers (name, phone, package, amount, start_date, end_date, notification_days, notes)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+UPDATE_SQL = '''
+    UPDATE customers
+    SET name=?, phone=?, package=?, amount=?, start_date=?, end_date=?, notification_days=?, notes=?
+    WHERE id=?
+'''
+DELETE_SQL = 'DELETE FROM customers WHERE id=?'
+CUSTOMER_SQL = f'SELECT {LIST_COLUMNS_SQL} FROM customers WHERE id=?'
+PERIOD_SQL = 'SELECT start_date, end_date, current_subscription_id FROM customers WHERE id=?'
+
+# سجل الاشتراكات والمدفوعات: صف جديد لكل اشتراك أو تجديد
+SUBSCRIPTION_FIELDS = ('package', 'amount', 'start_date', 'end_date')
+INSERT_SUBSCRIPTION_SQL = f'''
+    INSERT INTO subscriptions (customer_id, package, amount, start_date, end_date, paid_at)
+    VALUES (?, ?, ?, ?, ?, COALESCE(?, {TODAY_SQL}))
+'''
+RENEW_SQL = 'UPDATE customers SET package=?, amount=?, start_date=?, end_date=? WHERE id=?'
+SET_CURRENT_LATEST_SQL = '''
+    UPDATE customers SET current_subscription_id = (
+        SELECT MAX(id) FROM subscriptions WHERE customer_id = ?
+    )
+    WHERE id = ?
+'''
+CORRECT_SUBSCRIPTION_SQL = 'UPDATE subscriptions SET package=?, amount=?, start_date=?, end_date=? WHERE id=?'
+SET_CURRENT_SQL = 'UPDATE customers SET current_subscription_id=? WHERE id=?'
+# اشتراكات العملاء المضافين دفعة واحدة (تاريخ الدفع = تاريخ البداية)
+APPEND_SUBSCRIPTIONS_SQL = '''
+    INSERT INTO subscriptions (customer_id, package, amount, start_date, end_date, paid_at)
+    SELECT id, package, amount, start_date, end_date, start_date FROM customers
+    WHERE id > ? AND current_subscription_id IS NULL
+'''
+SET_CURRENT_ALL_SQL = '''
+    UPDATE customers SET current_subscription_id = (
+        SELECT MAX(id) FROM subscriptions WHERE subscriptions.customer_id = customers.id
+    )
+    WHERE id > ? AND current_subscription_id IS NULL
+'''
+SUBSCRIPTIONS_SQL = '''
+    SELECT id, package, amount, start_date, end_date, paid_at FROM subscriptions
+    WHERE customer_id = ?
+    ORDER BY end_date DESC
+'''
+DETAILS_SQL = 'SELECT start_date, notes FROM customers WHERE id=?'
+STATUS_COUNTS_SQL = f'''
+    SELECT
+        (SELECT COUNT(*) FROM customers WHERE {EXPIRED_WHERE_SQL}),
+        (SELECT COUNT(*) FROM customers WHERE {WARNING_WHERE_SQL}),
+        (SELECT COUNT(*) FROM customers)
+'''
+EXPIRED_SQL = f'''
+    SELECT name, {DAYS_REMAINING_SQL} FROM customers
+    WHERE {EXPIRED_WHERE_SQL}
+    ORDER BY end_date ASC
+    LIMIT ?
+'''
+WARNING_SQL = f'''
+    SELECT name, {DAYS_REMAINING_SQL} FROM customers
+    WHERE {WARNING_WHERE_SQL}
+    ORDER BY end_date ASC
+    LIMIT ?
+'''
+NOTIFICATION_COUNTS_SQL = f'''
+    SELECT
+        (SELECT COUNT(*) FROM customers WHERE {EXPIRED_WHERE_SQL}),
+        (SELECT COUNT(*) FROM customers WHERE {WARNING_WHERE_SQL})
+'''
+# تنبيهات أصبحت مستحقة أو اشتراكات انتهت منذ تاريخ معين (حتى اليوم)
+NEW_ALERTS_SQL = f'''
+    SELECT
+        (SELECT COUNT(*) FROM customers WHERE alert_date > ? AND alert_date <= {TODAY_SQL}),
+        (SELECT COUNT(*) FROM customers WHERE end_date >= ? AND end_date < {TODAY_SQL})
+'''
+
+# عدد العملاء الذين تظهر أسماؤهم في نافذة التنبيهات لكل نوع
+NOTIFICATION_LIMIT = 5
+
+# التنبيه يُرسل مرة واحدة لكل فترة اشتراك: alerted_for = تاريخ الانتهاء الذي أُرسل تنبيهه،
+# فالتجديد أو تعديل التاريخ (من الواجهة أو المزامنة) يجعل العميل مستحقاً للتنبيه من جديد
+PENDING_ALERT_SQL = 'alerted_for IS NOT end_date'
+# التنبيهات المستحقة التي لم تُرسل لاشتراكات لم تنته بعد، من الفهرس الجزئي للتنبيهات غير المرسلة.
+# الحد الأدنى لتاريخ التنبيه (كما في WARNING_WHERE_SQL) يستبعد المنتهين الذين لم يُنبهوا
+# (بيانات مستوردة أو جهاز مغلق وقت التنبيه) من البحث، فلا يتكرر المرور عليهم في كل تشغيل
+DUE_ALERTS_SQL = f'''
+    SELECT id, name, phone, end_date, alert_date FROM customers
+    WHERE {PENDING_ALERT_SQL} AND alert_date <= :today
+    AND alert_date >= date(:today, printf('%+d days', -(SELECT COALESCE(MAX(notification_days), 0) FROM customers)))
+    AND end_date >= :today
+    ORDER BY alert_date ASC, id ASC
+    LIMIT :limit
+'''
+# لا يُسجل التنبيه إذا تغير تاريخ الانتهاء بعد قراءته (تجديد أثناء الإرسال)
+MARK_ALERTED_SQL = 'UPDATE customers SET alerted_for = ? WHERE id = ? AND end_date = ?'
+NEXT_ALERT_SQL = 'SELECT MIN(alert_date) FROM customers WHERE alert_date > ?'
+GET_STATE_SQL = 'SELECT value FROM service_state WHERE name=?'
+SET_STATE_SQL = 'INSERT OR REPLACE INTO service_state (name, value) VALUES (?, ?)'
+
+PACKAGES_SQL = 'SELECT id, name, price, months FROM packages ORDER BY position, id'
+INSERT_PACKAGE_SQL = 'INSERT OR IGNORE INTO packages (name, price, months, position) VALUES (?, ?, ?, ?)'
+NEXT_POSITION_SQL = '(SELECT COALESCE(MAX(position), 0) + 1 FROM packages)'
+ADD_PACKAGE_SQL = f'INSERT INTO packages (name, price, months, position) VALUES (?, ?, ?, {NEXT_POSITION_SQL})'
+UPDATE_PACKAGE_SQL = 'UPDATE packages SET name=?, price=?, months=? WHERE id=?'
+DELETE_PACKAGE_SQL = 'DELETE FROM packages WHERE id=?'
+PACKAGE_NAME_SQL = 'SELECT name FROM packages WHERE id=?'
+# عدد العملاء لكل باقة من فهرس (package_id, end_date) دون قراءة الجدول
+PACKAGE_COUNTS_SQL = 'SELECT package_id, COUNT(*) FROM customers GROUP BY package_id'
+PACKAGE_COUNT_SQL = 'SELECT COUNT(*) FROM customers WHERE package_id=?'
+# اسم الباقة في صفوف العملاء وسجل الاشتراكات يتبع اسمها في جدول الباقات
+RENAME_CUSTOMERS_PACKAGE_SQL = 'UPDATE customers SET package=? WHERE package_id=?'
+RENAME_SUBSCRIPTIONS_PACKAGE_SQL = 'UPDATE subscriptions SET package=? WHERE package=?'
+# رقم الباقة يُحدد من اسمها عند كل إضافة أو تغيير للباقة (من النموذج أو الاستيراد أو المزامنة)،
+# وفي الترقية 9 كان الاسم غير الموجود في جدول الباقات (بيانات قديمة) يُضاف إليه بدون سعر ومدة
+PACKAGE_ID_SQL = 'SELECT id FROM packages WHERE name = new.package'
+PACKAGE_TRIGGER_BODY_SQL = f'''
+    BEGIN
+        INSERT OR IGNORE INTO packages (name, position) VALUES (new.package, {NEXT_POSITION_SQL});
+        UPDATE customers SET package_id = ({PACKAGE_ID_SQL}) WHERE id = new.id;
+    END
+'''
+# منذ الترقية 11: الاسم غير الموجود في جدول الباقات يُرفض بدلاً من إضافته بدون سعر
+UNKNOWN_PACKAGE_MESSAGE = 'الباقة غير موجودة'
+CHECKED_PACKAGE_TRIGGER_BODY_SQL = f'''
+    BEGIN
+        SELECT RAISE(ABORT, '{UNKNOWN_PACKAGE_MESSAGE}') WHERE ({PACKAGE_ID_SQL}) IS NULL;
+        UPDATE customers SET package_id = ({PACKAGE_ID_SQL}) WHERE id = new.id;
+    END
+'''
+PACKAGE_TRIGGER_NAMES = ('customers_package_insert', 'customers_package_update')
+# نص قائمة الباقات في النموذج قبل الاختيار، كان يُحفظ قديماً كاسم باقة
+PACKAGE_PLACEHOLDER = 'اختر الباقة'
+# تاريخ الانتهاء = البداية + مدة الباقة لكل عملائها في استعلام واحد (add_months دالة Python مسجلة)،
+# ولا يُكتب إلا الصف الذي يتغير تاريخه حتى لا تعمل triggers الملخص والمزامنة بدون داعٍ
+RECOMPUTE_END_DATES_SQL = '''
+    UPDATE customers SET end_date = add_months(start_date, ?)
+    WHERE package_id = ? AND add_months(start_date, ?) != end_date
+'''
+# الاشتراك الحالي في السجل يتبع تاريخ العميل الجديد
+RECOMPUTE_SUBSCRIPTIONS_SQL = '''
+    UPDATE subscriptions SET end_date = (
+        SELECT end_date FROM customers WHERE customers.id = subscriptions.customer_id
+    )
+    WHERE id IN (SELECT current_subscription_id FROM customers WHERE package_id = ?)
+    AND end_date != (SELECT end_date FROM customers WHERE customers.id = subscriptions.customer_id)
+'''
+
+
+def append_subscriptions(conn, after_id):
+    """اشتراكات العملاء الذين رقمهم أكبر من after_id وليس لهم اشتراك حالي (دفعة واحدة)"""
+    conn.execute(APPEND_SUBSCRIPTIONS_SQL, (after_id,))
+    conn.execute(SET_CURRENT_ALL_SQL, (after_id,))
+
+
+def create_customers(conn):
+    """جدول العملاء بأعمدته الأصلية وفهارس الحالة"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            phone TEXT,
+            package TEXT NOT NULL,
+            amount REAL NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            notification_days INTEGER DEFAULT 5,
+            notes TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # فهارس الاستعلامات حسب تاريخ الانتهاء وحساب الحالة
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_customers_end_date ON customers (end_date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_customers_notification_days ON customers (notification_days)')
+
+
+def add_alert_dates(conn):
+    """تاريخ التنبيه المحسوب مسبقاً وحالة خدمات الخلفية"""
+    if 'alert_date' not in column_names(conn, 'customers'):
+        conn.execute('ALTER TABLE customers ADD COLUMN alert_date TEXT')
+        conn.execute(f'UPDATE customers SET alert_date = {alert_date_sql()}')
+
+    # تحديث تاريخ التنبيه تلقائياً عند الإضافة والتعديل
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS customers_alert_insert AFTER INSERT ON customers
+        BEGIN
+            UPDATE customers SET alert_date = {alert_date_sql('new.')} WHERE id = new.id;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS customers_alert_update
+        AFTER UPDATE OF end_date, notification_days ON customers
+        BEGIN
+            UPDATE customers SET alert_date = {alert_date_sql('new.')} WHERE id = new.id;
+        END
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_customers_alert_date ON customers (alert_date)')
+
+    # حالة خدمات الخلفية (مثل آخر تنبيه تم إرساله)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS service_state (
+            name TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+
+
+def add_subscriptions(conn):
+    """سجل الاشتراكات ونقل الاشتراك الحالي لكل عميل إليه"""
+    # لا يُعدل إلا الاشتراك الحالي عند تصحيح بياناته
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS subscriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER NOT NULL REFERENCES customers (id) ON DELETE CASCADE,
+            package TEXT NOT NULL,
+            amount REAL NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            paid_at TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_subscriptions_customer_end ON subscriptions (customer_id, end_date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_subscriptions_paid_at ON subscriptions (paid_at)')
+
+    if 'current_subscription_id' not in column_names(conn, 'customers'):
+        conn.execute('ALTER TABLE customers ADD COLUMN current_subscription_id INTEGER REFERENCES subscriptions (id)')
+        append_subscriptions(conn, 0)
+
+
+def add_phone_index(conn):
+    """فهرس رقم الهاتف الموحّد للبحث برقم كامل"""
+    conn.execute(PHONE_INDEX_SQL)
+
+
+def create_packages(conn):
+    """جدول الباقات بالباقات الافتراضية (السعر NUMERIC يحفظ 100 كرقم صحيح)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS packages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            price NUMERIC NOT NULL DEFAULT 0,
+            months INTEGER NOT NULL DEFAULT 0,
+            position INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.executemany(INSERT_PACKAGE_SQL, [
+        (name, package['price'], package['months'], position)
+        for position, (name, package) in enumerate(DEFAULT_PACKAGES.items())
+    ])
+
+
+def add_package_ids(conn):
+    """رقم الباقة في جدول العملاء (مفتاح أجنبي لجدول الباقات) وفهرسه"""
+    conn.execute(f'''
+        INSERT OR IGNORE INTO packages (name, position)
+        SELECT DISTINCT package, {NEXT_POSITION_SQL} FROM customers
+    ''')
+    if 'package_id' not in column_names(conn, 'customers'):
+        conn.execute('ALTER TABLE customers ADD COLUMN package_id INTEGER REFERENCES packages (id)')
+        conn.execute('UPDATE customers SET package_id = (SELECT id FROM packages WHERE name = customers.package)')
+    # التصفية حسب الباقة مرتبة بتاريخ الانتهاء كما في القائمة
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_customers_package_end ON customers (package_id, end_date)')
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS customers_package_insert AFTER INSERT ON customers
+        {PACKAGE_TRIGGER_BODY_SQL}
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS customers_package_update AFTER UPDATE OF package ON customers
+        WHEN new.package_id IS NOT ({PACKAGE_ID_SQL})
+        {PACKAGE_TRIGGER_BODY_SQL}
+    ''')
+
+
+
+def add_alerted_for(conn):
+    """تسجيل التنبيه المرسل لكل عميل بدلاً من موضع واحد في طابور التنبيهات"""
+    if 'alerted_for' not in column_names(conn, 'customers'):
+        conn.execute('ALTER TABLE customers ADD COLUMN alerted_for TEXT')
+        # ما أرسلته الخدمة قبل الترقية: كل ما قبل موضعها المحفوظ (alert_date|id) في service_state
+        cursor = conn.execute("SELECT value FROM service_state WHERE name = 'alerts_cursor'").fetchone()
+        if cursor is not None:
+            alert_date, customer_id = cursor[0].split('|')
+            conn.execute(
+                'UPDATE customers SET alerted_for = end_date WHERE (alert_date, id) <= (?, ?)',
+                (alert_date, int(customer_id))
+            )
+            conn.execute("DELETE FROM service_state WHERE name = 'alerts_cursor'")
+    conn.execute(
+        f'CREATE INDEX IF NOT EXISTS idx_customers_pending_alert ON customers (alert_date) WHERE {PENDING_ALERT_SQL}'
+    )
+
+
+def reject_unknown_packages(conn):
+    """
+    triggers الباقة ترفض الأسماء غير الموجودة في جدول الباقات، وإضافة باقة "بدون باقة"
+    ونقل عملاء نص الاختيار المحفوظ قديماً إليها
+    """
+    for name in PACKAGE_TRIGGER_NAMES:
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+    conn.execute(f'''
+        CREATE TRIGGER customers_package_insert AFTER INSERT ON customers
+        {CHECKED_PACKAGE_TRIGGER_BODY_SQL}
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER customers_package_update AFTER UPDATE OF package ON customers
+        WHEN new.package_id IS NULL OR new.package_id IS NOT ({PACKAGE_ID_SQL})
+        {CHECKED_PACKAGE_TRIGGER_BODY_SQL}
+    ''')
+    position = conn.execute(f'SELECT {NEXT_POSITION_SQL}').fetchone()[0]
+    conn.execute(INSERT_PACKAGE_SQL, (UNASSIGNED_PACKAGE, 0, 0, position))
+
+    row = conn.execute('SELECT id FROM packages WHERE name = ?', (PACKAGE_PLACEHOLDER,)).fetchone()
+    if row is not None:
+        with renamed_package(conn, PACKAGE_PLACEHOLDER, UNASSIGNED_PACKAGE):
+            conn.execute(RENAME_CUSTOMERS_PACKAGE_SQL, (UNASSIGNED_PACKAGE, row[0]))
+        conn.execute(RENAME_SUBSCRIPTIONS_PACKAGE_SQL, (UNASSIGNED_PACKAGE, PACKAGE_PLACEHOLDER))
+        conn.execute(DELETE_PACKAGE_SQL, (row[0],))
+
+
+def restore_default_packages(conn):
+    """
+    الباقات الافتراضية الناقصة تُضاف، ومدة الافتراضية منها التي أُضيفت بدون مدة
+    (من أسماء العملاء في الترقية 9) تُعاد حتى يعمل التجديد وحساب تاريخ الانتهاء لعملائها
+    """
+    for name, package in DEFAULT_PACKAGES.items():
+        position = conn.execute(f'SELECT {NEXT_POSITION_SQL}').fetchone()[0]
+        conn.execute(INSERT_PACKAGE_SQL, (name, package['price'], package['months'], position))
+        conn.execute('UPDATE packages SET months = ? WHERE name = ? AND months = 0', (package['months'], name))
+
+
+# ترقيات المخطط بالترتيب: تُضاف الجديدة في آخر القائمة فقط ولا يُعدل ما طُبق منها
+# (اسم الترقية النصي يظهر في السجل فقط)
+MIGRATIONS = (
+    ('customers', create_customers),
+    ('alert_dates', add_alert_dates),
+    ('search_index', setup_search_index),
+    ('daily_summary', setup_summary),
+    ('subscriptions', add_subscriptions),
+    ('phone_index', add_phone_index),
+    ('sync', setup_sync),
+    ('packages', create_packages),
+    ('package_ids', add_package_ids),
+    ('alerted_for', add_alerted_for),
+    ('known_packages', reject_unknown_packages),
+    ('default_packages', restore_default_packages),
+    ('summary_renewed_delete', setup_renewed_delete)
+)
+
+
+class CustomerRepository:
+    """الوصول إلى جدول العملاء باتصال مستقل لكل thread"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+        self.fts = self.setup()
+
+    def connect(self):
+        """فتح اتصال جديد بالإعدادات المشتركة"""
+        # isolation_level=None: المعاملات تُدار صراحة عبر transaction()
+        # check_same_thread=False للسماح بإغلاق كل الاتصالات من close() فقط،
+        # أما الاستخدام فيبقى مقصوراً على الـ thread المالك للاتصال
+        # connection_factory: اتصال يقيس زمن الاستعلامات عند تفعيل profiler فقط
+        conn = sqlite3.connect(
+            self.path, timeout=10, isolation_level=None, check_same_thread=False, cached_statements=256,
+            factory=connection_factory()
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        register_functions(conn)
+        conn.create_function('add_months', 2, add_months_text, deterministic=True)
+        return conn
+
+    @property
+    def conn(self):
+        """اتصال الـ thread الحالي"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.connect()
+            self.local.conn = conn
+            self.local.depth = 0
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """نطاق معاملة صريح؛ المعاملات المتداخلة تنضم إلى المعاملة الخارجية"""
+        conn = self.conn
+        if self.local.depth:
+            self.local.depth += 1
+            try:
+                yield conn
+            finally:
+                self.local.depth -= 1
+            return
+
+        conn.execute('BEGIN IMMEDIATE')
+        self.local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+        finally:
+            self.local.depth = 0
+
+    def setup(self):
+        """ترقية مخطط قاعدة البيانات، ويعيد True إذا كان فهرس البحث FTS5"""
+        self.applied_migrations = migrate(self.conn, MIGRATIONS)
+        self.package_cache = None
+        return has_fts(self.conn)
+
+    def close(self):
+        """إغلاق جميع الاتصالات"""
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections = []
+        self.local = threading.local()
+
+    def list_customers(self, search_term='', after=None, limit=PAGE_SIZE):
+        """
+        صفحة من العملاء بترتيب (end_date, id)
+        after: مفتاح آخر صف في الصفحة السابقة (end_date, id)
+        """
+        cursor = self.query_page(LIST_COLUMNS_SQL, search_term, after, limit)
+        return [dict(zip(LIST_COLUMNS, row)) for row in cursor]
+
+    def list_records(self, search_term='', after=None, limit=PAGE_SIZE):
+        """نفس list_customers لكن كسجلات CustomerRecord (الحالة تُحسب عند العرض)"""
+        cursor = self.query_page(RECORD_COLUMNS_SQL, search_term, after, limit)
+        return [CustomerRecord(*row) for row in cursor]
+
+    def query_page(self, columns, search_term, after, limit):
+        """استعلام صفحة من العملاء بأعمدة محددة"""
+        conditions = []
+        params = []
+
+        condition = search_filter(search_term, self.fts) if search_term else None
+        if condition:
+            conditions.append(condition[0])
+            params.extend(condition[1])
+
+        # الاستكمال من آخر صف محمّل باستخدام فهرس end_date
+        if after is not None:
+            conditions.append('(end_date, id) > (?, ?)')
+            params.extend(after)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return self.conn.execute(
+            f'SELECT {columns} FROM customers {where} ORDER BY end_date ASC, id ASC LIMIT ?',
+            params + [limit]
+        )
+
+    def get_details(self, customer_id):
+        """بيانات العميل غير المعروضة في القائمة"""
+        row = self.conn.execute(DETAILS_SQL, (customer_id,)).fetchone()
+        if row is None:
+            return None
+        return {'start_date': row[0], 'notes': row[1]}
+
+    def status_counts(self):
+        """عدد العملاء في كل حالة دون تحميل الصفوف"""
+        expired, warning, total = self.conn.execute(STATUS_COUNTS_SQL).fetchone()
+        return {'expired': expired, 'warning': warning, 'active': total - expired - warning}
+
+    def notifications(self, limit=NOTIFICATION_LIMIT):
+        """
+        أول العملاء في كل نوع من التنبيهات مع العدد الكلي
+        القوائم: (الاسم, الأيام المتبقية)
+        """
+        conn = self.conn
+        expired_count, warning_count = conn.execute(NOTIFICATION_COUNTS_SQL).fetchone()
+        return {
+            'expired': conn.execute(EXPIRED_SQL, (limit,)).fetchall(),
+            'expired_count': expired_count,
+            'warning': conn.execute(WARNING_SQL, (limit,)).fetchall(),
+            'warning_count': warning_count
+        }
+
+    def new_alerts(self, since):
+        """عدد التنبيهات المستحقة والاشتراكات المنتهية منذ تاريخ (YYYY-MM-DD) حتى اليوم"""
+        due, expired = self.conn.execute(NEW_ALERTS_SQL, (since, since)).fetchone()
+        return due + expired
+
+    def due_alerts(self, today, limit):
+        """أول التنبيهات المستحقة حتى اليوم التي لم تُرسل لفترة الاشتراك الحالية"""
+        rows = self.conn.execute(DUE_ALERTS_SQL, {'today': today, 'limit': limit}).fetchall()
+        return [dict(zip(('id', 'name', 'phone', 'end_date', 'alert_date'), row)) for row in rows]
+
+    def mark_alerted(self, customers):
+        """تسجيل إرسال تنبيه فترة الاشتراك الحالية لمجموعة عملاء (صفوف due_alerts)"""
+        with self.transaction() as conn:
+            conn.executemany(MARK_ALERTED_SQL, [(c['end_date'], c['id'], c['end_date']) for c in customers])
+
+    def next_alert_date(self, today):
+        """أقرب تاريخ تنبيه بعد اليوم، أو None"""
+        return self.conn.execute(NEXT_ALERT_SQL, (today,)).fetchone()[0]
+
+    def get_state(self, name, default=None):
+        """قيمة محفوظة في جدول حالة الخدمات"""
+        row = self.conn.execute(GET_STATE_SQL, (name,)).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, name, value):
+        """حفظ قيمة في جدول حالة الخدمات"""
+        with self.transaction() as conn:
+            conn.execute(SET_STATE_SQL, (name, value))
+
+    def packages(self):
+        """
+        الباقات {الاسم: {'id', 'price', 'months'}} بترتيب العرض
+        تُقرأ من القاعدة مرة واحدة ثم من الذاكرة حتى تُعدل من هذا المستودع (لا تُعدل القاموس المُعاد)
+        """
+        packages = self.package_cache
+        if packages is None:
+            packages = self.package_cache = {
+                name: {'id': package_id, 'price': price, 'months': months}
+                for package_id, name, price, months in self.conn.execute(PACKAGES_SQL)
+            }
+        return packages
+
+    def package_counts(self):
+        """عدد العملاء لكل رقم باقة"""
+        return dict(self.conn.execute(PACKAGE_COUNTS_SQL).fetchall())
+
+    def save_package(self, package_id, package):
+        """
+        إضافة باقة (package_id=None) أو تعديلها، ويعيد رقمها
+        package: {'name', 'price', 'months'} من validate_package
+        تغيير الاسم ينتقل إلى العملاء وسجل اشتراكاتهم والإحصائيات في نفس المعاملة
+        """
+        name = package['name']
+        try:
+            with self.transaction() as conn:
+                if package_id is None:
+                    return conn.execute(ADD_PACKAGE_SQL, (name, package['price'], package['months'])).lastrowid
+
+                row = conn.execute(PACKAGE_NAME_SQL, (package_id,)).fetchone()
+                if row is None:
+                    raise ValidationError('الباقة غير موجودة')
+                if row[0] == UNASSIGNED_PACKAGE and name != row[0]:
+                    raise ValidationError(f'لا يمكن تغيير اسم الباقة: {row[0]}')
+                conn.execute(UPDATE_PACKAGE_SQL, (name, package['price'], package['months'], package_id))
+                if row[0] != name:
+                    with renamed_package(conn, row[0], name):
+                        conn.execute(RENAME_CUSTOMERS_PACKAGE_SQL, (name, package_id))
+                    conn.execute(RENAME_SUBSCRIPTIONS_PACKAGE_SQL, (name, row[0]))
+                return package_id
+        except sqlite3.IntegrityError:
+            raise ValidationError(f'توجد باقة بنفس الاسم: {name}')
+        finally:
+            self.invalidate_packages()
+
+    def delete_package(self, package_id):
+        """حذف باقة ليس عليها عملاء"""
+        with self.transaction() as conn:
+            row = conn.execute(PACKAGE_NAME_SQL, (package_id,)).fetchone()
+            if row is not None and row[0] == UNASSIGNED_PACKAGE:
+                raise ValidationError(f'لا يمكن حذف الباقة: {row[0]}')
+            count = conn.execute(PACKAGE_COUNT_SQL, (package_id,)).fetchone()[0]
+            if count:
+                raise ValidationError(f'لا يمكن حذف باقة مشترك فيها {count} عميل')
+            conn.execute(DELETE_PACKAGE_SQL, (package_id,))
+        self.invalidate_packages()
+
+    def invalidate_packages(self):
+        """إعادة قراءة الباقات من القاعدة عند الطلب التالي (بعد تغييرها من خارج المستودع)"""
+        self.package_cache = None
+
+    def recompute_end_dates(self, package):
+        """
+        إعادة حساب تاريخ انتهاء جميع عملاء باقة من تاريخ بدايتهم ومدة الباقة الحالية
+        (بعد تغيير شروط الباقة)، ويعيد عدد العملاء الذين تغير تاريخهم
+        """
+        details = self.packages().get(package)
+        if details is None or details['months'] <= 0:
+            return 0
+        months = details['months']
+        with self.transaction() as conn:
+            count = conn.execute(RECOMPUTE_END_DATES_SQL, (months, details['id'], months)).rowcount
+            conn.execute(RECOMPUTE_SUBSCRIPTIONS_SQL, (details['id'],))
+        return count
+
+    def dashboard(self, today=None):
+        """أرقام لوحة الإحصائيات من الملخص اليومي"""
+        return analytics.dashboard(self.conn, today)
+
+    def iter_customers(self, status=None, package=None, end_from=None, end_to=None):
+        """
+        جميع بيانات العملاء صفاً بصف دون تحميل الجدول في الذاكرة
+        status: expired / warning / active
+        end_from, end_to: نطاق تاريخ الانتهاء (YYYY-MM-DD)
+        """
+        conditions = []
+        params = []
+
+        if status:
+            conditions.append(STATUS_WHERE_SQL[status])
+        if package:
+            conditions.append('package_id = (SELECT id FROM packages WHERE name = ?)')
+            params.append(package)
+        if end_from:
+            conditions.append('end_date >= ?')
+            params.append(end_from)
+        if end_to:
+            conditions.append('end_date <= ?')
+            params.append(end_to)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        cursor = self.conn.execute(
+            f'SELECT {EXPORT_COLUMNS_SQL} FROM customers {where} ORDER BY end_date ASC, id ASC', params
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(EXPORT_COLUMNS, row))
+        finally:
+            cursor.close()
+
+    def get_customer(self, customer_id):
+        """صف عميل واحد بنفس أعمدة القائمة"""
+        row = self.conn.execute(CUSTOMER_SQL, (customer_id,)).fetchone()
+        return dict(zip(LIST_COLUMNS, row)) if row else None
+
+    def get_customers(self, customer_ids):
+        """صفوف مجموعة عملاء بنفس أعمدة القائمة"""
+        customers = []
+        customer_ids = list(customer_ids)
+        for i in range(0, len(customer_ids), IN_CHUNK_SIZE):
+            chunk = customer_ids[i:i + IN_CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            cursor = self.conn.execute(
+                f'SELECT {LIST_COLUMNS_SQL} FROM customers WHERE id IN ({placeholders})', chunk
+            )
+            customers.extend(dict(zip(LIST_COLUMNS, row)) for row in cursor)
+        return customers
+
+    def add_customer(self, customer, paid_at=None):
+        """إضافة عميل مع اشتراكه الأول وإرجاع رقمه (paid_at الافتراضي اليوم)"""
+        with self.transaction() as conn:
+            cursor = conn.execute(INSERT_SQL, tuple(customer[field] for field in CUSTOMER_FIELDS))
+            customer_id = cursor.lastrowid
+            self.add_subscription(conn, customer_id, customer, paid_at)
+            return customer_id
+
+    def add_customers(self, customers):
+        """إضافة مجموعة عملاء في معاملة واحدة وإرجاع عددهم"""
+        rows = [tuple(customer[field] for field in CUSTOMER_FIELDS) for customer in customers]
+        with self.transaction() as conn:
+            last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM customers').fetchone()[0]
+            with deferred_indexing(conn), deferred_summary(conn), deferred_changes(conn):
+                conn.executemany(INSERT_SQL, rows)
+            append_subscriptions(conn, last_id)
+        return len(rows)
+
+    def add_subscription(self, conn, customer_id, subscription, paid_at=None):
+        """إضافة اشتراك إلى السجل وجعله الاشتراك الحالي للعميل"""
+        cursor = conn.execute(
+            INSERT_SUBSCRIPTION_SQL,
+            (customer_id,) + tuple(subscription[field] for field in SUBSCRIPTION_FIELDS) + (paid_at,)
+        )
+        conn.execute(SET_CURRENT_SQL, (cursor.lastrowid, customer_id))
+
+    def update_customer(self, customer_id, customer, paid_at=None):
+        """
+        تحديث بيانات عميل وإرجاع صفه (قبل, بعد) التحديث
+        التجديد يضيف اشتراكاً جديداً إلى السجل، وغيره يصحح الاشتراك الحالي
+        """
+        with self.transaction() as conn:
+            old = self.get_customer(customer_id)
+            period = conn.execute(PERIOD_SQL, (customer_id,)).fetchone()
+            conn.execute(UPDATE_SQL, tuple(customer[field] for field in CUSTOMER_FIELDS) + (customer_id,))
+            self.record_period(conn, customer_id, period, customer, paid_at)
+            return old, self.get_customer(customer_id)
+
+    def record_period(self, conn, customer_id, period, customer, paid_at=None):
+        """
+        تسجيل فترة العميل الجديدة في سجل الاشتراكات بعد تعديله
+        period: (start_date, end_date, current_subscription_id) قبل التعديل
+        """
+        if period is None:
+            return
+        start_date, end_date, subscription_id = period
+        if subscription_id is None or is_renewal({'start_date': start_date, 'end_date': end_date}, customer):
+            self.add_subscription(conn, customer_id, customer, paid_at)
+        else:
+            conn.execute(
+                CORRECT_SUBSCRIPTION_SQL,
+                tuple(customer[field] for field in SUBSCRIPTION_FIELDS) + (subscription_id,)
+            )
+
+    def renew_customers(self, customer_ids, packages, package=None, paid_at=None, today=None):
+        """
+        تجديد مجموعة عملاء بمدة الباقة في معاملة واحدة
+        package: باقة التجديد للجميع، أو None لتجديد كل عميل بباقته الحالية
+        يعيد (قائمة (قبل, بعد), أسماء من لم يُجدد لعدم وجود مدة لباقته)
+        """
+        today = today or date.today()
+        with self.transaction() as conn:
+            updates = []
+            skipped = []
+            olds = {}
+            for old in self.get_customers(customer_ids):
+                package_name = package or old['package']
+                details = packages.get(package_name)
+                if details is None or details['months'] <= 0:
+                    skipped.append(old['name'])
+                    continue
+
+                start, end = renewal_dates(old['end_date'], details, today)
+                amount = details['price'] or old['amount']
+                updates.append((package_name, amount, start, end, old['id']))
+                olds[old['id']] = old
+
+            conn.executemany(RENEW_SQL, updates)
+            conn.executemany(
+                INSERT_SUBSCRIPTION_SQL,
+                [(customer_id, name, amount, start, end, paid_at) for name, amount, start, end, customer_id in updates]
+            )
+            conn.executemany(SET_CURRENT_LATEST_SQL, [(update[-1], update[-1]) for update in updates])
+
+            pairs = [(olds[new['id']], new) for new in self.get_customers(olds)]
+        return pairs, skipped
+
+    def subscriptions(self, customer_id):
+        """سجل اشتراكات عميل من الأحدث إلى الأقدم"""
+        rows = self.conn.execute(SUBSCRIPTIONS_SQL, (customer_id,)).fetchall()
+        return [dict(zip(('id',) + SUBSCRIPTION_FIELDS + ('paid_at',), row)) for row in rows]
+
+    def delete_customer(self, customer_id):
+        """حذف عميل وإرجاع صفه قبل الحذف"""
+        with self.transaction() as conn:
+            old = self.get_customer(customer_id)
+            conn.execute(DELETE_SQL, (customer_id,))
+            return old
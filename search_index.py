@@ -0,0 +1,203 @@
+"""
+فهرس البحث عن العملاء بالاسم ورقم الهاتف
+يستخدم جدول FTS5 بمقسّم trigram يُحدَّث تلقائياً عبر triggers،
+مع توحيد أشكال الحروف العربية والأرقام قبل الفهرسة والبحث.
+
+ملاحظة: الـ triggers تستدعي دوال Python، لذلك يجب استدعاء
+register_functions على كل اتصال يكتب في جدول العملاء.
+"""
+
+import re
+import sqlite3
+from contextlib import contextmanager
+
+# توحيد أشكال الحروف العربية (الألف والهمزات والتاء المربوطة والألف المقصورة)
+ARABIC_LETTERS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه'
+})
+
+# تحويل الأرقام العربية الهندية والفارسية إلى أرقام لاتينية
+DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹', '01234567890123456789')
+
+# التشكيل والتطويل
+DIACRITICS_RE = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+SPACES_RE = re.compile(r'\s+')
+NON_DIGITS_RE = re.compile(r'[^0-9]')
+
+# أقل طول يستطيع مقسّم trigram البحث عنه باستخدام الفهرس
+TRIGRAM_MIN_LENGTH = 3
+
+# طول رقم الموبايل الكامل بعد التوحيد: يُبحث عنه بالمساواة في فهرس الهاتف
+FULL_PHONE_LENGTH = 11
+
+
+def normalize_text(text):
+    """توحيد النص العربي للبحث"""
+    if not text:
+        return ''
+    text = DIACRITICS_RE.sub('', text.lower())
+    text = text.translate(ARABIC_LETTERS).translate(DIGITS)
+    return SPACES_RE.sub(' ', text).strip()
+
+
+def normalize_phone(text):
+    """توحيد رقم الهاتف: أرقام لاتينية فقط وبدون مفتاح مصر الدولي"""
+    if not text:
+        return ''
+    text = text.translate(DIGITS).strip()
+    digits = NON_DIGITS_RE.sub('', text)
+
+    if digits.startswith('0020'):
+        digits = '0' + digits[4:]
+    elif digits.startswith('20') and (text.startswith('+') or len(digits) == 12):
+        digits = '0' + digits[2:]
+    return digits
+
+
+PHONE_INDEX_SQL = 'CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers (normalize_phone(phone))'
+
+INSERT_TRIGGER_SQL = '''
+    CREATE TRIGGER IF NOT EXISTS customers_search_insert AFTER INSERT ON customers
+    BEGIN
+        INSERT INTO customers_search (rowid, name, phone)
+        VALUES (new.id, normalize_text(new.name), normalize_phone(new.phone));
+    END
+'''
+
+# فهرسة العملاء الذين رقمهم أكبر من رقم معين
+INDEX_CUSTOMERS_SQL = '''
+    INSERT INTO customers_search (rowid, name, phone)
+    SELECT id, normalize_text(name), normalize_phone(phone) FROM customers WHERE id > ?
+'''
+
+
+def register_functions(conn):
+    """تسجيل دوال التوحيد على الاتصال (تستخدمها الـ triggers)"""
+    conn.create_function('normalize_text', 1, normalize_text, deterministic=True)
+    conn.create_function('normalize_phone', 1, normalize_phone, deterministic=True)
+
+
+def setup_search_index(conn):
+    """إنشاء فهرس البحث وربطه بجدول العملاء (يُستدعى داخل معاملة)"""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'customers_search'").fetchone() is not None
+
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS customers_search
+            USING fts5(name, phone, tokenize='trigram')
+        ''')
+    except sqlite3.OperationalError:
+        # نسخة SQLite لا تدعم FTS5 أو trigram: جدول عادي مع LIKE
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS customers_search (
+                rowid INTEGER PRIMARY KEY,
+                name TEXT,
+                phone TEXT
+            )
+        ''')
+
+    conn.execute(INSERT_TRIGGER_SQL)
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS customers_search_update AFTER UPDATE OF name, phone ON customers
+        BEGIN
+            DELETE FROM customers_search WHERE rowid = old.id;
+            INSERT INTO customers_search (rowid, name, phone)
+            VALUES (new.id, normalize_text(new.name), normalize_phone(new.phone));
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS customers_search_delete AFTER DELETE ON customers
+        BEGIN
+            DELETE FROM customers_search WHERE rowid = old.id;
+        END
+    ''')
+
+    # فهرسة العملاء الموجودين مسبقاً عند إنشاء الفهرس لأول مرة
+    if not exists:
+        conn.execute(INDEX_CUSTOMERS_SQL, (0,))
+
+
+def has_fts(conn):
+    """هل فهرس البحث جدول FTS5 (أم الجدول العادي البديل)"""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'customers_search'").fetchone()
+    return row is not None and 'fts5' in row[0].lower()
+
+
+@contextmanager
+def deferred_indexing(conn):
+    """
+    إيقاف الفهرسة صفاً بصف أثناء إدراج كمية كبيرة من العملاء ثم فهرستهم دفعة واحدة
+    يجب استخدامه داخل معاملة حتى يُستعاد الـ trigger عند التراجع
+    """
+    last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM customers').fetchone()[0]
+    conn.execute('DROP TRIGGER IF EXISTS customers_search_insert')
+    yield
+    conn.execute(INDEX_CUSTOMERS_SQL, (last_id,))
+    conn.execute(INSERT_TRIGGER_SQL)
+
+
+def quote_match(text):
+    """تجهيز نص كعبارة في استعلام MATCH"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def escape_like(text):
+    """تجهيز نص للاستخدام داخل LIKE"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def is_full_phone(search_term):
+    """هل النص رقم موبايل كامل (أرقام ورموز فقط بدون حروف)"""
+    return (len(normalize_phone(search_term)) >= FULL_PHONE_LENGTH
+            and not any(c.isalpha() for c in search_term))
+
+
+def search_filter(search_term, fts=True):
+    """
+    شرط SQL لتصفية العملاء حسب نص البحث
+    يعيد (شرط, معاملات) أو None إذا كان النص فارغاً بعد التوحيد
+    """
+    name_term = normalize_text(search_term)
+    phone_term = normalize_phone(search_term)
+    terms = [('name', name_term)]
+    if phone_term:
+        terms.append(('phone', phone_term))
+    terms = [(column, term) for column, term in terms if term]
+
+    if not terms:
+        return None
+
+    # رقم موبايل كامل: مساواة في فهرس الهاتف الموحّد بدلاً من البحث داخل النصوص
+    if is_full_phone(search_term):
+        return 'normalize_phone(phone) = ?', (phone_term,)
+
+    if fts and all(len(term) >= TRIGRAM_MIN_LENGTH for column, term in terms):
+        query = ' OR '.join(f'{column} : {quote_match(term)}' for column, term in terms)
+        return 'id IN (SELECT rowid FROM customers_search WHERE customers_search MATCH ?)', (query,)
+
+    # النصوص القصيرة: مقارنة LIKE على الحقول الموحّدة
+    conditions = ' OR '.join(f"{column} LIKE ? ESCAPE '\\'" for column, term in terms)
+    params = tuple(f'%{escape_like(term)}%' for column, term in terms)
+    return f'id IN (SELECT rowid FROM customers_search WHERE {conditions})', params
+
+
+def is_refinement(previous_term, search_term):
+    """هل نتائج النص الجديد جزء من نتائج النص السابق (لتضييقها في الذاكرة)"""
+    previous_name, name_term = normalize_text(previous_term), normalize_text(search_term)
+    previous_phone, phone_term = normalize_phone(previous_term), normalize_phone(search_term)
+    # نتائج الرقم الكامل مساواة وليست بحثاً داخل النص فلا تُضيَّق
+    if not previous_name or previous_name not in name_term or is_full_phone(previous_term):
+        return False
+    return not phone_term or (bool(previous_phone) and previous_phone in phone_term)
+
+
+def matches(name, phone, search_term):
+    """نفس شرط search_filter لكن على بيانات موجودة في الذاكرة"""
+    name_term = normalize_text(search_term)
+    phone_term = normalize_phone(search_term)
+    if is_full_phone(search_term):
+        return phone_term == normalize_phone(phone)
+    if name_term and name_term in normalize_text(name):
+        return True
+    return bool(phone_term) and phone_term in normalize_phone(phone)
@@ -0,0 +1,55 @@
+"""
+قياس زمن بدء التطبيق حتى يصبح قابلاً للاستخدام
+يُستورد أولاً في main.py حتى يشمل القياس زمن استيراد Kivy، وتُضاف نتيجة
+كل تشغيل كسطر JSON إلى startup_times.jsonl للمقارنة بين الإصدارات.
+"""
+
+import json
+import time
+from datetime import datetime
+
+STARTED = time.perf_counter()
+
+TIMINGS_PATH = 'startup_times.jsonl'
+
+
+class StartupTimer:
+    """أزمنة مراحل البدء بالمللي ثانية منذ استيراد هذا الملف"""
+
+    def __init__(self, started=STARTED):
+        self.started = started
+        self.marks = {}
+        self.waiting = set()
+
+    def mark(self, name):
+        """تسجيل زمن مرحلة (أول مرة فقط)"""
+        if name not in self.marks:
+            self.marks[name] = round((time.perf_counter() - self.started) * 1000, 1)
+        return self.marks[name]
+
+    def wait_for(self, *names):
+        """المراحل المطلوبة قبل أن يصبح التطبيق قابلاً للاستخدام"""
+        self.waiting.update(names)
+
+    def done(self, name):
+        """انتهاء مرحلة منتظرة، ويعيد True عند انتهاء آخرها فقط"""
+        if name not in self.waiting:
+            return False
+        self.mark(name)
+        self.waiting.discard(name)
+        return not self.waiting
+
+    def summary(self):
+        """نص مختصر للسجل"""
+        return ', '.join(f'{name}={ms}ms' for name, ms in self.marks.items())
+
+    def save(self, version, platform, path=TIMINGS_PATH):
+        """إضافة أزمنة هذا التشغيل إلى ملف السجل"""
+        record = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'version': version,
+            'platform': platform,
+            'marks': self.marks
+        }
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
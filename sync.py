@@ -0,0 +1,343 @@
+"""
+مزامنة العملاء بين أجهزة المحل عبر خادم مزامنة (sync_server.py)
+كل جهاز يعمل بدون اتصال بقاعدته المحلية، ويُرسل عند المزامنة التغييرات فقط:
+
+- لكل عميل معرّف عام uuid وإصدار (updated_at, device) يُحدَّث عند كل تعديل محلي
+- سجل التغييرات sync_changes: رقم متزايد لكل تعديل محلي منذ آخر إرسال
+- سجل المحذوفين sync_tombstones حتى يصل الحذف إلى الأجهزة الأخرى
+
+الـ triggers تسجل التعديلات المحلية فقط: التغيير القادم من الخادم يُكتب بإصداره
+مباشرة فلا يُعاد إرساله. التعارض يُحل بنفس القاعدة في كل جهاز وفي الخادم:
+الإصدار الأكبر (updated_at ثم device) هو الباقي، سواء كان تعديلاً أو حذفاً.
+الباقات نفسها لا تتزامن: العميل القادم بباقة غير موجودة هنا يُحفظ "بدون باقة" ويُكتب
+اسم باقته في ملاحظاته. لذلك تغيير اسم باقة في جهاز يتطلب نفس التغيير في كل جهاز قبل
+المزامنة، وإلا يعاد اختيار الباقة يدوياً لعملائها في الأجهزة الأخرى.
+"""
+
+import gzip
+import json
+from contextlib import contextmanager
+from urllib.parse import urlencode
+
+from business import UNASSIGNED_PACKAGE
+from migrations import column_names
+
+# الحقول المتزامنة (نفس حقول نموذج العميل)
+SYNC_FIELDS = ('name', 'phone', 'package', 'amount', 'start_date', 'end_date', 'notification_days', 'notes')
+
+# سطر الملاحظات الذي يحفظ اسم الباقة القادمة من جهاز آخر عند حفظ العميل "بدون باقة"
+UNASSIGNED_NOTE = 'الباقة في الجهاز الآخر: '
+
+# عدد التغييرات في كل طلب إرسال أو استقبال
+SYNC_PAGE_SIZE = 500
+
+# الطلبات الأكبر من هذا الحجم تُضغط بـ gzip
+GZIP_MIN_BYTES = 1024
+
+SYNC_TIMEOUT = 30
+
+NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+DEVICE_SQL = "(SELECT value FROM service_state WHERE name = 'device_id')"
+
+
+def next_version_sql(previous):
+    """إصدار تعديل محلي: الوقت الحالي، أو بعد الإصدار السابق إن كانت ساعة الجهاز متأخرة"""
+    return f"MAX({NOW_SQL}, strftime('%Y-%m-%dT%H:%M:%fZ', {previous}, '+0.001 seconds'))"
+
+
+INSERT_TRIGGER_NAME = 'customers_sync_insert'
+
+# العملاء القادمون من الخادم يُضافون بإصدارهم فلا يسجلهم الـ trigger
+INSERT_TRIGGER_SQL = f'''
+    CREATE TRIGGER IF NOT EXISTS {INSERT_TRIGGER_NAME} AFTER INSERT ON customers
+    WHEN new.updated_at IS NULL
+    BEGIN
+        UPDATE customers
+        SET uuid = COALESCE(new.uuid, lower(hex(randomblob(16)))), updated_at = {NOW_SQL}, device = {DEVICE_SQL}
+        WHERE id = new.id;
+        INSERT INTO sync_changes (uuid) SELECT uuid FROM customers WHERE id = new.id;
+    END
+'''
+
+TRIGGERS_SQL = (
+    f'''
+    CREATE TRIGGER IF NOT EXISTS customers_sync_update
+    AFTER UPDATE OF {', '.join(SYNC_FIELDS)} ON customers
+    WHEN new.updated_at IS old.updated_at
+    BEGIN
+        UPDATE customers SET updated_at = {next_version_sql('old.updated_at')}, device = {DEVICE_SQL}
+        WHERE id = new.id;
+        INSERT INTO sync_changes (uuid) VALUES (new.uuid);
+    END
+    ''',
+    # الحذف القادم من الخادم يسجل سجل الحذف بإصداره قبل حذف الصف
+    f'''
+    CREATE TRIGGER IF NOT EXISTS customers_sync_delete AFTER DELETE ON customers
+    WHEN NOT EXISTS (SELECT 1 FROM sync_tombstones WHERE uuid = old.uuid)
+    BEGIN
+        INSERT INTO sync_tombstones (uuid, updated_at, device)
+        VALUES (old.uuid, {next_version_sql('old.updated_at')}, {DEVICE_SQL});
+        INSERT INTO sync_changes (uuid) VALUES (old.uuid);
+    END
+    '''
+)
+
+# تسجيل العملاء المضافين دفعة واحدة (نفس عمل INSERT_TRIGGER_SQL)
+STAMP_NEW_SQL = f'''
+    UPDATE customers
+    SET uuid = COALESCE(uuid, lower(hex(randomblob(16)))), updated_at = {NOW_SQL}, device = {DEVICE_SQL}
+    WHERE id > :last_id AND updated_at IS NULL
+'''
+LOG_NEW_SQL = 'INSERT INTO sync_changes (uuid) SELECT uuid FROM customers WHERE id > :last_id ORDER BY id'
+
+PENDING_SQL = '''
+    SELECT uuid, MAX(seq) AS last_seq FROM sync_changes WHERE seq > ?
+    GROUP BY uuid ORDER BY last_seq LIMIT ?
+'''
+ROW_SQL = f"SELECT id, updated_at, device, {', '.join(SYNC_FIELDS)} FROM customers WHERE uuid=?"
+TOMBSTONE_SQL = 'SELECT updated_at, device FROM sync_tombstones WHERE uuid=?'
+SAVE_TOMBSTONE_SQL = 'INSERT OR REPLACE INTO sync_tombstones (uuid, updated_at, device) VALUES (?, ?, ?)'
+REMOVE_TOMBSTONE_SQL = 'DELETE FROM sync_tombstones WHERE uuid=?'
+INSERT_REMOTE_SQL = f'''
+    INSERT INTO customers ({', '.join(SYNC_FIELDS)}, uuid, updated_at, device)
+    VALUES ({', '.join('?' * len(SYNC_FIELDS))}, ?, ?, ?)
+'''
+UPDATE_REMOTE_SQL = f'''
+    UPDATE customers SET {', '.join(f'{field}=?' for field in SYNC_FIELDS)}, updated_at=?, device=?
+    WHERE id=?
+'''
+DELETE_REMOTE_SQL = 'DELETE FROM customers WHERE id=?'
+PERIOD_SQL = 'SELECT start_date, end_date, current_subscription_id FROM customers WHERE id=?'
+
+
+def setup_sync(conn):
+    """أعمدة المزامنة وسجلات التغييرات والحذف (يُستدعى داخل معاملة)"""
+    columns = column_names(conn, 'customers')
+    for column in ('uuid', 'updated_at', 'device'):
+        if column not in columns:
+            conn.execute(f'ALTER TABLE customers ADD COLUMN {column} TEXT')
+
+    conn.execute("INSERT OR IGNORE INTO service_state (name, value) VALUES ('device_id', lower(hex(randomblob(8))))")
+    conn.execute('CREATE TABLE IF NOT EXISTS sync_changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, uuid TEXT NOT NULL)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sync_tombstones (
+            uuid TEXT PRIMARY KEY,
+            updated_at TEXT NOT NULL,
+            device TEXT NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+    # العملاء الموجودون مسبقاً: معرّفات وإصدارات، وكلهم في أول إرسال
+    conn.execute(STAMP_NEW_SQL, {'last_id': 0})
+    conn.execute(LOG_NEW_SQL, {'last_id': 0})
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_customers_uuid ON customers (uuid)')
+
+    conn.execute(INSERT_TRIGGER_SQL)
+    for trigger in TRIGGERS_SQL:
+        conn.execute(trigger)
+
+
+@contextmanager
+def deferred_changes(conn):
+    """
+    إيقاف تسجيل الإضافات صفاً بصف أثناء إدراج كمية كبيرة من العملاء ثم تسجيلهم دفعة واحدة
+    يجب استخدامه داخل معاملة حتى يُستعاد الـ trigger عند التراجع
+    """
+    last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM customers').fetchone()[0]
+    conn.execute(f'DROP TRIGGER IF EXISTS {INSERT_TRIGGER_NAME}')
+    yield
+    conn.execute(STAMP_NEW_SQL, {'last_id': last_id})
+    conn.execute(LOG_NEW_SQL, {'last_id': last_id})
+    conn.execute(INSERT_TRIGGER_SQL)
+
+
+def is_newer(change, version):
+    """هل إصدار التغيير القادم أحدث من الإصدار المحلي (None إن لم يوجد)"""
+    return version is None or (change['updated_at'], change['device']) > tuple(version)
+
+
+def unassigned_notes(notes, package):
+    """ملاحظات العميل مع اسم باقته في الجهاز الآخر (مرة واحدة مهما تكرر وصوله)"""
+    line = UNASSIGNED_NOTE + package
+    notes = notes or ''
+    if line in notes.split('\n'):
+        return notes
+    return f'{notes}\n{line}' if notes else line
+
+
+class SyncError(Exception):
+    """فشل المزامنة مع الخادم"""
+    pass
+
+
+def run_here(func, *args):
+    """تنفيذ عمل قاعدة البيانات في نفس الـ thread"""
+    return func(*args)
+
+
+class SyncClient:
+    """مزامنة قاعدة بيانات الجهاز مع خادم المزامنة (إرسال ثم استقبال)"""
+
+    def __init__(self, repo, url, token=None, page_size=SYNC_PAGE_SIZE, timeout=SYNC_TIMEOUT, run_db=run_here):
+        """
+        run_db: دالة (func, *args) تنفذ عمل قاعدة البيانات وتعيد نتيجته، مثل DatabaseWorker.call
+        حتى تبقى طلبات الشبكة في thread المزامنة ولا تنتظرها عمليات القاعدة الأخرى
+        """
+        self.repo = repo
+        self.run_db = run_db
+        self.url = url.rstrip('/')
+        self.token = token
+        self.page_size = page_size
+        self.timeout = timeout
+        self.sent_bytes = 0
+        self.received_bytes = 0
+        self.unassigned = 0
+
+    @property
+    def device_id(self):
+        """معرّف هذا الجهاز (يُنشأ مع أعمدة المزامنة)"""
+        return self.run_db(self.repo.get_state, 'device_id')
+
+    def request(self, path, payload=None):
+        """طلب JSON إلى الخادم (POST إذا وُجد payload)"""
+        # urllib.request بطيء الاستيراد ولا يلزم إلا عند المزامنة (المستودع يستورد هذه الوحدة دائماً)
+        import urllib.request
+
+        headers = {'Accept-Encoding': 'gzip'}
+        if self.token:
+            headers['X-Sync-Token'] = self.token
+
+        data = None
+        if payload is not None:
+            data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+            if len(data) >= GZIP_MIN_BYTES:
+                data = gzip.compress(data)
+                headers['Content-Encoding'] = 'gzip'
+            self.sent_bytes += len(data)
+
+        request = urllib.request.Request(self.url + path, data=data, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+                self.received_bytes += len(body)
+                if response.headers.get('Content-Encoding') == 'gzip':
+                    body = gzip.decompress(body)
+        except OSError as e:
+            raise SyncError(f'تعذر الاتصال بخادم المزامنة: {e}') from e
+        return json.loads(body.decode('utf-8'))
+
+    def pending_changes(self, after_seq):
+        """التغييرات المحلية بعد رقم معين (آخر حالة لكل عميل) وآخر رقم فيها"""
+        conn = self.repo.conn
+        rows = conn.execute(PENDING_SQL, (after_seq, self.page_size)).fetchall()
+        changes = []
+        for uuid, seq in rows:
+            row = conn.execute(ROW_SQL, (uuid,)).fetchone()
+            if row is not None:
+                changes.append({
+                    'uuid': uuid, 'updated_at': row[1], 'device': row[2], 'deleted': False,
+                    'data': dict(zip(SYNC_FIELDS, row[3:]))
+                })
+                continue
+            tombstone = conn.execute(TOMBSTONE_SQL, (uuid,)).fetchone()
+            if tombstone is not None:
+                changes.append({
+                    'uuid': uuid, 'updated_at': tombstone[0], 'device': tombstone[1], 'deleted': True, 'data': None
+                })
+        return changes, (rows[-1][1] if rows else after_seq)
+
+    def push(self):
+        """إرسال التغييرات المحلية منذ آخر إرسال، ويعيد عددها"""
+        pushed = 0
+        device = self.device_id
+        after_seq = int(self.run_db(self.repo.get_state, 'sync_push_seq', 0))
+        while True:
+            changes, last_seq = self.run_db(self.pending_changes, after_seq)
+            if last_seq == after_seq:
+                return pushed
+
+            if changes:
+                self.request('/push', {'device': device, 'changes': changes})
+            pushed += len(changes)
+            self.run_db(self.confirm_pushed, last_seq)
+            after_seq = last_seq
+
+    def confirm_pushed(self, last_seq):
+        """حفظ آخر رقم تم إرساله، وما تم إرساله لا حاجة لبقائه في السجل"""
+        with self.repo.transaction() as conn:
+            self.repo.set_state('sync_push_seq', str(last_seq))
+            conn.execute('DELETE FROM sync_changes WHERE seq <= ?', (last_seq,))
+
+    def pull(self):
+        """استقبال تغييرات الأجهزة الأخرى منذ آخر استقبال، ويعيد (المستلم, المطبق)"""
+        received = applied = 0
+        device = self.device_id
+        since = int(self.run_db(self.repo.get_state, 'sync_pull_seq', 0))
+        while True:
+            query = urlencode({'since': since, 'device': device, 'limit': self.page_size})
+            result = self.request(f'/pull?{query}')
+            changes = result['changes']
+
+            applied += self.run_db(self.apply_page, changes, result['seq'])
+            received += len(changes)
+            since = result['seq']
+            if not result['more']:
+                return received, applied
+
+    def apply_page(self, changes, seq):
+        """تطبيق صفحة تغييرات وحفظ رقمها في معاملة واحدة، ويعيد عدد المطبق"""
+        applied = 0
+        with self.repo.transaction() as conn:
+            for change in changes:
+                applied += self.apply(conn, change)
+            self.repo.set_state('sync_pull_seq', str(seq))
+        return applied
+
+    def apply(self, conn, change):
+        """تطبيق تغيير قادم إن كان أحدث من النسخة المحلية، ويعيد 1 إذا طُبق"""
+        uuid = change['uuid']
+        row = conn.execute(ROW_SQL, (uuid,)).fetchone()
+        version = row[1:3] if row is not None else conn.execute(TOMBSTONE_SQL, (uuid,)).fetchone()
+        if not is_newer(change, version):
+            return 0
+
+        remote_version = (change['updated_at'], change['device'])
+        if change['deleted']:
+            conn.execute(SAVE_TOMBSTONE_SQL, (uuid,) + remote_version)
+            if row is not None:
+                conn.execute(DELETE_REMOTE_SQL, (row[0],))
+            return 1
+
+        customer = change['data']
+        if customer['package'] not in self.repo.packages():
+            # باقة غير موجودة هنا (أو تغير اسمها في الجهاز الآخر): تظهر "بدون باقة" حتى يختار المستخدم غيرها
+            customer = dict(
+                customer, package=UNASSIGNED_PACKAGE, notes=unassigned_notes(customer['notes'], customer['package'])
+            )
+            self.unassigned += 1
+        values = tuple(customer[field] for field in SYNC_FIELDS)
+        conn.execute(REMOVE_TOMBSTONE_SQL, (uuid,))
+        if row is None:
+            cursor = conn.execute(INSERT_REMOTE_SQL, values + (uuid,) + remote_version)
+            self.repo.add_subscription(conn, cursor.lastrowid, customer)
+        else:
+            period = conn.execute(PERIOD_SQL, (row[0],)).fetchone()
+            conn.execute(UPDATE_REMOTE_SQL, values + remote_version + (row[0],))
+            self.repo.record_period(conn, row[0], period, customer)
+        return 1
+
+    def sync(self):
+        """مزامنة كاملة ويعيد ملخصها"""
+        self.sent_bytes = self.received_bytes = 0
+        self.unassigned = 0
+        pushed = self.push()
+        received, applied = self.pull()
+        return {
+            'pushed': pushed,
+            'received': received,
+            'applied': applied,
+            'unassigned': self.unassigned,
+            'sent_bytes': self.sent_bytes,
+            'received_bytes': self.received_bytes
+        }
@@ -0,0 +1,215 @@
+"""
+خادم مزامنة صغير لأجهزة المحل (مكتبة Python القياسية فقط)
+يحفظ آخر إصدار لكل عميل مع رقم تسلسلي متزايد، ويعطي كل جهاز التغييرات
+بعد آخر رقم استلمه فقط. يمكن تشغيله على أي جهاز في الشبكة المحلية:
+
+    python sync_server.py --port 8765 --db sync_server.db --token SECRET
+"""
+
+import argparse
+import gzip
+import json
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from sync import GZIP_MIN_BYTES, SYNC_FIELDS, SYNC_PAGE_SIZE, is_newer
+
+DEFAULT_PORT = 8765
+
+# أقصى عدد تغييرات يمكن طلبها في صفحة واحدة
+MAX_PAGE_SIZE = 5000
+
+CHANGE_COLUMNS = ('uuid', 'updated_at', 'device', 'deleted', 'data')
+
+# الحقول المطلوبة في كل تغيير مُرسل
+REQUIRED_KEYS = ('uuid', 'updated_at', 'device', 'deleted')
+
+PULL_SQL = f'''
+    SELECT seq, {', '.join(CHANGE_COLUMNS)} FROM changes
+    WHERE seq > ? AND device != ?
+    ORDER BY seq LIMIT ?
+'''
+SAVE_CHANGE_SQL = f'''
+    INSERT OR REPLACE INTO changes (seq, {', '.join(CHANGE_COLUMNS)})
+    VALUES ((SELECT COALESCE(MAX(seq), 0) + 1 FROM changes), ?, ?, ?, ?, ?)
+'''
+
+
+def valid_change(change):
+    """
+    هل التغيير المُرسل مكتمل (بيانات العميل بكل حقولها مطلوبة إلا عند الحذف)
+    التغيير الناقص يُرفض هنا، وإلا يفشل تطبيقه في كل جهاز يستقبله
+    """
+    if not (
+        isinstance(change, dict)
+        and all(key in change for key in REQUIRED_KEYS)
+        and all(isinstance(change[key], str) for key in ('uuid', 'updated_at', 'device'))
+        and isinstance(change['deleted'], bool)
+    ):
+        return False
+    data = change.get('data')
+    return change['deleted'] or (isinstance(data, dict) and set(SYNC_FIELDS) <= data.keys())
+
+
+class SyncStore:
+    """آخر إصدار لكل عميل في قاعدة بيانات الخادم"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS changes (
+                uuid TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL UNIQUE,
+                updated_at TEXT NOT NULL,
+                device TEXT NOT NULL,
+                deleted INTEGER NOT NULL,
+                data TEXT
+            )
+        ''')
+
+    def push(self, changes):
+        """حفظ التغييرات الأحدث من المحفوظة، ويعيد عدد المقبول منها"""
+        accepted = 0
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                for change in changes:
+                    version = self.conn.execute(
+                        'SELECT updated_at, device FROM changes WHERE uuid=?', (change['uuid'],)
+                    ).fetchone()
+                    if not is_newer(change, version):
+                        continue
+                    data = None if change['deleted'] else json.dumps(change['data'], ensure_ascii=False)
+                    self.conn.execute(SAVE_CHANGE_SQL, (
+                        change['uuid'], change['updated_at'], change['device'], int(bool(change['deleted'])), data
+                    ))
+                    accepted += 1
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+        return accepted
+
+    def pull(self, since, device, limit):
+        """تغييرات الأجهزة الأخرى بعد رقم تسلسلي"""
+        with self.lock:
+            rows = self.conn.execute(PULL_SQL, (since, device, limit + 1)).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'changes': [
+                {
+                    'uuid': uuid, 'updated_at': updated_at, 'device': device, 'deleted': bool(deleted),
+                    'data': json.loads(data) if data is not None else None
+                }
+                for seq, uuid, updated_at, device, deleted, data in rows
+            ],
+            'seq': rows[-1][0] if rows else since,
+            'more': more
+        }
+
+    def close(self):
+        """إغلاق قاعدة بيانات الخادم"""
+        self.conn.close()
+
+
+class SyncHandler(BaseHTTPRequestHandler):
+    """طلبات /push و /pull"""
+
+    store = None
+    token = None
+
+    def send_json(self, payload, status=200):
+        """إرسال رد JSON (مضغوط إذا كان كبيراً ويقبل العميل الضغط)"""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if len(body) >= GZIP_MIN_BYTES and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def authorized(self):
+        """التحقق من رمز الخادم إن كان محدداً"""
+        if self.token and self.headers.get('X-Sync-Token') != self.token:
+            self.send_json({'error': 'unauthorized'}, 401)
+            return False
+        return True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/pull':
+            self.send_json({'error': 'not found'}, 404)
+            return
+        if not self.authorized():
+            return
+
+        params = parse_qs(url.query)
+        try:
+            since = int(params.get('since', ['0'])[0])
+            limit = min(int(params.get('limit', [str(SYNC_PAGE_SIZE)])[0]), MAX_PAGE_SIZE)
+        except ValueError:
+            self.send_json({'error': 'bad request'}, 400)
+            return
+        device = params.get('device', [''])[0]
+        self.send_json(self.store.pull(since, device, limit))
+
+    def do_POST(self):
+        if self.path != '/push':
+            self.send_json({'error': 'not found'}, 404)
+            return
+        if not self.authorized():
+            return
+
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if self.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            changes = json.loads(body.decode('utf-8'))['changes']
+        except (OSError, EOFError, ValueError, KeyError, TypeError):
+            self.send_json({'error': 'bad request'}, 400)
+            return
+        if not isinstance(changes, list) or not all(valid_change(change) for change in changes):
+            self.send_json({'error': 'bad request'}, 400)
+            return
+        self.send_json({'accepted': self.store.push(changes)})
+
+    def log_message(self, format, *args):
+        # سجل الطلبات الافتراضي لكل طلب مزعج في الاختبارات
+        pass
+
+
+def create_server(path, host='0.0.0.0', port=DEFAULT_PORT, token=None):
+    """خادم مزامنة جاهز للتشغيل (port=0 لاختيار منفذ متاح)"""
+    handler = type('Handler', (SyncHandler,), {'store': SyncStore(path), 'token': token})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    """نقطة التشغيل"""
+    parser = argparse.ArgumentParser(description='خادم مزامنة اشتراكات العملاء')
+    parser.add_argument('--db', default='sync_server.db', help='قاعدة بيانات الخادم')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--token', help='رمز مشترك تُرسله الأجهزة في كل طلب')
+    args = parser.parse_args()
+
+    server = create_server(args.db, args.host, args.port, args.token)
+    print(f'Sync server on {args.host}:{server.server_address[1]}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.RequestHandlerClass.store.close()
+
+
+if __name__ == '__main__':
+    main()
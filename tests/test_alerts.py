@@ -0,0 +1,92 @@
+"""
+اختبارات التنبيهات المستحقة لخدمة التنبيهات: تُرسل مرة لكل فترة، والمنتهون الذين
+لم يُنبهوا لا يُعادون ولا يُمر عليهم في كل تشغيل
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from business import validate_customer
+from repository import DUE_ALERTS_SQL, CustomerRepository
+
+PACKAGE = 'باقة 100 جنيه شهرياً'
+TODAY = date(2026, 10, 20)
+
+
+@pytest.fixture
+def repo():
+    with tempfile.TemporaryDirectory() as directory:
+        repo = CustomerRepository(os.path.join(directory, 'test.db'))
+        try:
+            yield repo
+        finally:
+            repo.close()
+
+
+def customer(repo, name, end_date, notification_days=3):
+    return validate_customer({
+        'name': name,
+        'package': PACKAGE,
+        'amount': '100',
+        'start_date': (end_date - timedelta(days=30)).isoformat(),
+        'end_date': end_date.isoformat(),
+        'notification_days': str(notification_days)
+    }, repo.packages())
+
+
+def add_stale(repo, count):
+    """منتهون منذ وقت طويل بدون أي تنبيه مرسل (مثل بيانات مستوردة)"""
+    repo.add_customers([
+        customer(repo, f'منتهٍ {number}', TODAY - timedelta(days=30 + number % 300)) for number in range(count)
+    ])
+
+
+def steps(repo):
+    """عدد خطوات SQLite لاستعلام التنبيهات المستحقة"""
+    counter = [0]
+
+    def count():
+        counter[0] += 1
+
+    repo.conn.set_progress_handler(count, 1)
+    try:
+        repo.due_alerts(TODAY.isoformat(), 50)
+    finally:
+        repo.conn.set_progress_handler(None, 1)
+    return counter[0]
+
+
+def test_due_alert_sent_once(repo):
+    repo.add_customer(customer(repo, 'مستحق', TODAY + timedelta(days=2)))
+    repo.add_customer(customer(repo, 'لاحق', TODAY + timedelta(days=10)))
+
+    due = repo.due_alerts(TODAY.isoformat(), 50)
+    assert [row['name'] for row in due] == ['مستحق']
+    repo.mark_alerted(due)
+    assert repo.due_alerts(TODAY.isoformat(), 50) == []
+
+
+def test_stale_rows_not_returned(repo):
+    add_stale(repo, 200)
+    repo.add_customer(customer(repo, 'مستحق', TODAY + timedelta(days=1)))
+    assert [row['name'] for row in repo.due_alerts(TODAY.isoformat(), 50)] == ['مستحق']
+
+
+def test_stale_rows_not_scanned(repo):
+    repo.add_customer(customer(repo, 'مستحق', TODAY + timedelta(days=1)))
+    add_stale(repo, 10)
+    few = steps(repo)
+    add_stale(repo, 5000)
+    many = steps(repo)
+    assert many < few * 2
+
+    plan = ' '.join(row[3] for row in repo.conn.execute(
+        f'EXPLAIN QUERY PLAN {DUE_ALERTS_SQL}', {'today': TODAY.isoformat(), 'limit': 50}
+    ))
+    assert 'idx_customers_pending_alert (alert_date>? AND alert_date<?)' in plan
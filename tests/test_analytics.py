@@ -0,0 +1,87 @@
+"""
+اختبارات الملخص اليومي: المستحق بعد التجديد المبكر، وحذف عميل مجدد من الملخص بكل فتراته
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from business import validate_customer
+from repository import CustomerRepository
+
+PACKAGE = 'باقة 100 جنيه شهرياً'
+TODAY = date(2026, 10, 20)
+
+
+@pytest.fixture
+def repo():
+    with tempfile.TemporaryDirectory() as directory:
+        repo = CustomerRepository(os.path.join(directory, 'test.db'))
+        try:
+            yield repo
+        finally:
+            repo.close()
+
+
+def add_customer(repo, start_date, name='عميل'):
+    return repo.add_customer(validate_customer({
+        'name': name,
+        'package': PACKAGE,
+        'amount': '100',
+        'start_date': start_date,
+        'notification_days': '3'
+    }, repo.packages()))
+
+
+def summary_rows(repo):
+    """صفوف الملخص التي فيها أي قيمة غير صفرية"""
+    return repo.conn.execute(
+        'SELECT * FROM daily_summary WHERE revenue OR starts OR ends OR ends_amount OR renewals'
+    ).fetchall()
+
+
+def test_due_before_renewal(repo):
+    add_customer(repo, '2026-10-01')
+    stats = repo.dashboard(TODAY)
+    assert (stats['due_count'], stats['due_amount']) == (1, 100)
+
+
+def test_early_renewal_is_not_due(repo):
+    customer_id = add_customer(repo, '2026-10-01')
+    repo.renew_customers([customer_id], repo.packages(), today=TODAY)
+    stats = repo.dashboard(TODAY)
+    assert (stats['due_count'], stats['due_amount']) == (0, 0)
+    assert stats['active_total'] == 1
+    assert stats['renewals'] == 0
+
+
+def test_delete_after_early_renewal(repo):
+    customer_id = add_customer(repo, '2026-10-01')
+    repo.renew_customers([customer_id], repo.packages(), today=TODAY)
+    repo.renew_customers([customer_id], repo.packages(), today=TODAY)
+    repo.delete_customer(customer_id)
+
+    stats = repo.dashboard(TODAY)
+    assert stats['active_total'] == 0
+    assert stats['active_by_package'] == []
+    assert summary_rows(repo) == []
+
+
+def test_delete_keeps_other_customers(repo):
+    kept = add_customer(repo, '2026-10-05', 'باقٍ')
+    deleted = add_customer(repo, '2026-10-01', 'محذوف')
+    repo.renew_customers([kept, deleted], repo.packages(), today=TODAY)
+    before = summary_rows(repo)
+    repo.delete_customer(deleted)
+
+    stats = repo.dashboard(TODAY)
+    assert stats['active_total'] == 1
+    assert summary_rows(repo) != before
+
+    repo.delete_customer(kept)
+    assert summary_rows(repo) == []
@@ -0,0 +1,139 @@
+"""
+اختبارات النسخ الاحتياطي: نسخ الصفحات المتغيرة فقط، عدم تكرار الصفحات المتطابقة،
+حذف اللقطات القديمة مع بقاء الحديثة قابلة للاستعادة، والاستعادة ومقارنة البيانات
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backup
+from backup import BackupError, BackupStore
+from business import validate_customer
+from repository import CustomerRepository
+
+PACKAGE = 'باقة 100 جنيه شهرياً'
+
+
+@pytest.fixture
+def env():
+    """قاعدة فيها عملاء ومجلد نسخ فارغ"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'test.db')
+        repo = CustomerRepository(path)
+        repo.add_customers([customer(repo, number) for number in range(2000)])
+        try:
+            yield repo, BackupStore(os.path.join(directory, 'backups'))
+        finally:
+            repo.close()
+
+
+def customer(repo, number, notes=''):
+    return validate_customer({
+        'name': f'عميل {number}',
+        'phone': f'010{number:08d}',
+        'package': PACKAGE,
+        'amount': '100',
+        'start_date': '2026-10-01',
+        'notification_days': '3',
+        'notes': notes
+    }, repo.packages())
+
+
+def rows(path):
+    """كل صفوف العملاء من ملف قاعدة"""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT * FROM customers ORDER BY id').fetchall()
+    finally:
+        conn.close()
+
+
+def test_incremental_and_dedupe(env):
+    repo, store = env
+    first = store.backup(repo.path)
+    # الصفحات المتطابقة (مثل الصفحات الفارغة) تُحفظ مرة واحدة
+    pages = store.manifest(first['snapshot'])['pages']
+    assert len(pages) == first['pages']
+    assert first['written'] == len(set(pages))
+
+    unchanged = store.backup(repo.path)
+    assert unchanged['written'] == 0
+
+    repo.update_customer(1, customer(repo, 1, notes='تعديل'))
+    changed = store.backup(repo.path)
+    assert 0 < changed['written'] < changed['pages'] // 4
+    assert store.snapshots() == [first['snapshot'], unchanged['snapshot'], changed['snapshot']]
+
+
+def test_restore_returns_rows(env):
+    repo, store = env
+    before = rows(repo.path)
+    snapshot = store.backup(repo.path)['snapshot']
+
+    repo.update_customer(5, customer(repo, 5, notes='بعد النسخ'))
+    repo.delete_customer(6)
+    repo.add_customer(customer(repo, 9999))
+    assert rows(repo.path) != before
+
+    repo.close()
+    assert store.restore(snapshot, repo.path) > 0
+    assert rows(repo.path) == before
+    assert not os.path.exists(repo.path + '-wal')
+
+
+def test_prune_keeps_newest_restorable(env):
+    repo, store = env
+    expected = {}
+    for number in range(6):
+        repo.update_customer(1, customer(repo, 1, notes=f'نسخة {number}'))
+        snapshot = store.backup(repo.path, keep=3)['snapshot']
+        expected[snapshot] = rows(repo.path)
+
+    kept = store.snapshots()
+    assert kept == list(expected)[-3:]
+    packs = {store.manifest(snapshot)['pack'] for snapshot in kept}
+    stored = {name for name in os.listdir(store.directory) if name.endswith('.pack')}
+    # packs اللقطات المحذوفة: إما حُذفت أو بقيت صفحاتها المستخدمة في pack منقول
+    assert packs <= stored
+    assert all(name in packs or name.startswith('carry_') for name in stored)
+
+    repo.close()
+    for snapshot in kept:
+        store.restore(snapshot, repo.path)
+        assert rows(repo.path) == expected[snapshot]
+
+
+def test_corrupt_pack_refused(env):
+    repo, store = env
+    before = rows(repo.path)
+    snapshot = store.backup(repo.path)['snapshot']
+    pack = store.path(store.manifest(snapshot)['pack'])
+    with open(pack, 'r+b') as f:
+        f.seek(100)
+        f.write(b'\xff' * 16)
+
+    repo.close()
+    with pytest.raises(BackupError):
+        store.restore(snapshot, repo.path)
+    assert rows(repo.path) == before
+    assert not os.path.exists(repo.path + '.restore')
+
+
+def test_restore_refused_while_connection_open(env, monkeypatch):
+    monkeypatch.setattr(backup, 'RESTORE_WAIT_SECONDS', 0.1)
+    repo, store = env
+    snapshot = store.backup(repo.path)['snapshot']
+    repo.update_customer(1, customer(repo, 1, notes='بعد النسخ'))
+    after = rows(repo.path)
+
+    # اتصال المستودع ما زال مفتوحاً (مثل خدمة التنبيهات)
+    with pytest.raises(BackupError):
+        store.restore(snapshot, repo.path)
+    assert rows(repo.path) == after
+    assert not os.path.exists(repo.path + '.restore')
@@ -0,0 +1,121 @@
+"""
+اختبارات add_months: آخر الشهر، الترتيب، الرجوع بنفس عدد الشهور،
+وتطابق دالة Python مع دالة SQLite المسجلة
+التواريخ عشوائية بـ seed ثابت حتى تتكرر نفس الحالات في كل تشغيل
+"""
+
+import os
+import random
+import sys
+import tempfile
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from business import add_months, add_months_text, validate_customer
+from repository import CustomerRepository
+
+SEED = 2024
+CASES = 2000
+
+
+def random_dates(count=CASES, seed=SEED):
+    """تواريخ عشوائية مع نسبة كبيرة من أواخر الشهور (أصعب الحالات)"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        year = rng.randint(1990, 2100)
+        month = rng.randint(1, 12)
+        last = monthrange(year, month)[1]
+        day = rng.choice([1, 28, 29, 30, 31, rng.randint(1, last)])
+        yield date(year, month, min(day, last)), rng.randint(-60, 60)
+
+
+def test_known_month_ends():
+    assert add_months(date(2024, 1, 31), 1) == date(2024, 2, 29)
+    assert add_months(date(2023, 1, 31), 1) == date(2023, 2, 28)
+    assert add_months(date(2024, 3, 31), -1) == date(2024, 2, 29)
+    assert add_months(date(2024, 8, 31), 1) == date(2024, 9, 30)
+    assert add_months(date(2024, 2, 29), 12) == date(2025, 2, 28)
+    assert add_months(date(2024, 11, 30), 3) == date(2025, 2, 28)
+    assert add_months(date(2024, 5, 15), 0) == date(2024, 5, 15)
+
+
+def test_month_end_clamping():
+    for start, months in random_dates():
+        result = add_months(start, months)
+        assert (result.year * 12 + result.month) - (start.year * 12 + start.month) == months
+        assert result.day == min(start.day, monthrange(result.year, result.month)[1])
+
+
+def test_monotonic_in_months():
+    for start, months in random_dates():
+        assert add_months(start, months) < add_months(start, months + 1)
+        if months > 0:
+            assert add_months(start, months) > start + timedelta(days=27 * months)
+
+
+def test_round_trip():
+    for start, months in random_dates():
+        forward = add_months(start, months)
+        if forward.day == start.day:
+            # لم يحدث قص لآخر الشهر: الرجوع يعيد نفس التاريخ
+            assert add_months(forward, -months) == start
+        else:
+            assert add_months(forward, -months) <= start
+        if start.day <= 28:
+            assert forward.day == start.day
+
+
+def test_datetime_keeps_time():
+    start = datetime(2024, 1, 31, 10, 30)
+    assert add_months(start, 1) == datetime(2024, 2, 29, 10, 30)
+
+
+def test_text_version():
+    assert add_months_text('2024-01-31', 1) == '2024-02-29'
+    assert add_months_text('2024-01-31 10:30:00', 1) == '2024-02-29'
+    assert add_months_text('', 1) is None
+    assert add_months_text(None, 1) is None
+    assert add_months_text('31/01/2024', 1) is None
+
+
+def test_sql_function_matches_python():
+    with tempfile.TemporaryDirectory() as directory:
+        repo = CustomerRepository(os.path.join(directory, 'test.db'))
+        try:
+            conn = repo.connect()
+            for start, months in random_dates():
+                row = conn.execute('SELECT add_months(?, ?)', (start.isoformat(), months)).fetchone()
+                assert row[0] == add_months(start, months).isoformat()
+            conn.close()
+        finally:
+            repo.close()
+
+
+def test_recompute_end_dates_matches_python():
+    with tempfile.TemporaryDirectory() as directory:
+        repo = CustomerRepository(os.path.join(directory, 'test.db'))
+        try:
+            packages = repo.packages()
+            name = next(name for name, details in packages.items() if details['months'] > 0)
+            months = packages[name]['months']
+            starts = [start for start, _ in random_dates(count=300)]
+            customers = [
+                validate_customer({
+                    'name': f'عميل {number}',
+                    'package': name,
+                    'amount': '100',
+                    'start_date': start.isoformat(),
+                    'end_date': start.isoformat(),
+                    'notification_days': '3'
+                }, packages)
+                for number, start in enumerate(starts)
+            ]
+            repo.add_customers(customers)
+
+            assert repo.recompute_end_dates(name) == len(starts)
+            rows = repo.conn.execute('SELECT start_date, end_date FROM customers ORDER BY id').fetchall()
+            assert [end for _, end in rows] == [add_months(start, months).isoformat() for start in starts]
+        finally:
+            repo.close()
@@ -0,0 +1,65 @@
+"""
+اختبارات أخطاء سطر الأوامر: أرقام عملاء غير صالحة وباقة غير موجودة تنتهي برسالة ورمز خروج
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from business import validate_customer
+from cli import main
+from repository import CustomerRepository
+
+PACKAGE = 'باقة 100 جنيه شهرياً'
+
+
+@pytest.fixture
+def db():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'test.db')
+        repo = CustomerRepository(path)
+        repo.add_customer(validate_customer({
+            'name': 'أحمد', 'package': PACKAGE, 'amount': '100', 'start_date': '2026-10-01', 'notification_days': '3'
+        }, repo.packages()))
+        repo.close()
+        yield path
+
+
+@pytest.mark.parametrize('ids', ['1,x', ',', 'x'])
+def test_renew_bad_ids(db, ids, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(['--db', db, 'renew', '--ids', ids])
+    assert exit_info.value.code == 2
+    err = capsys.readouterr().err
+    assert 'أرقام العملاء' in err or 'رقم عميل' in err
+    assert 'invalid literal' not in err
+
+
+def test_renew_ids(db, capsys):
+    assert main(['--db', db, 'renew', '--ids', '1', '--dry-run']) == 0
+    assert 'سيتم تجديد 1 عميل' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('argv', [
+    ['list', '--package', 'غير موجودة'],
+    ['due', '--package', 'غير موجودة'],
+    ['renew', '--expired', '--only-package', 'غير موجودة'],
+    ['renew', '--ids', '1', '--package', 'غير موجودة'],
+    ['export', 'out.csv', '--package', 'غير موجودة'],
+])
+def test_unknown_package(db, argv, capsys, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert main(['--db', db] + argv) == 2
+    captured = capsys.readouterr()
+    assert 'الباقة غير موجودة: غير موجودة' in captured.err
+    assert captured.out == ''
+    assert not (tmp_path / 'out.csv').exists()
+
+
+def test_known_package(db, capsys):
+    assert main(['--db', db, 'list', '--package', PACKAGE]) == 0
+    assert 'أحمد' in capsys.readouterr().out
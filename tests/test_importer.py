@@ -0,0 +1,140 @@
+"""
+اختبارات استيراد العملاء من CSV: الصفوف الصحيحة، تقرير الأخطاء بأرقام الأسطر،
+الباقة غير الموجودة، وأيام التنبيه الافتراضية
+"""
+
+import csv
+import os
+import sys
+import tempfile
+from datetime import date, datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from business import DEFAULT_NOTIFICATION_DAYS, ValidationError
+from importer import cell_text, import_customers, write_error_report
+from repository import CustomerRepository
+
+PACKAGE = 'باقة 100 جنيه شهرياً'
+HEADER = ['الاسم', 'الهاتف', 'الباقة', 'المبلغ', 'تاريخ البداية', 'تاريخ الانتهاء', 'أيام التنبيه', 'ملاحظات']
+
+
+@pytest.fixture
+def env():
+    with tempfile.TemporaryDirectory() as directory:
+        repo = CustomerRepository(os.path.join(directory, 'test.db'))
+        try:
+            yield repo, directory
+        finally:
+            repo.close()
+
+
+def write_csv(directory, rows, header=HEADER, name='customers.csv'):
+    path = os.path.join(directory, name)
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return path
+
+
+def customers(repo):
+    return repo.conn.execute(
+        'SELECT name, package, amount, start_date, end_date, notification_days FROM customers ORDER BY id'
+    ).fetchall()
+
+
+def test_valid_rows(env):
+    repo, directory = env
+    path = write_csv(directory, [
+        ['أحمد', '01012345678', PACKAGE, '100', '2026-10-01', '', '3', ''],
+        ['سارة', '', 'أخرى', '250.5', '2026-10-01', '2026-12-31', '7', 'ملاحظة'],
+    ])
+    result = import_customers(repo, path, repo.packages())
+
+    assert (result.processed, result.imported, result.errors) == (2, 2, [])
+    assert customers(repo) == [
+        ('أحمد', PACKAGE, 100.0, '2026-10-01', '2026-11-01', 3),
+        ('سارة', 'أخرى', 250.5, '2026-10-01', '2026-12-31', 7),
+    ]
+    assert repo.conn.execute('SELECT COUNT(*) FROM subscriptions').fetchone()[0] == 2
+
+
+def test_errors_reported_with_line_numbers(env):
+    repo, directory = env
+    path = write_csv(directory, [
+        ['صحيح', '', PACKAGE, '100', '2026-10-01', '', '3', ''],
+        ['تاريخ خاطئ', '', PACKAGE, '100', '01/10/2026', '', '3', ''],
+        ['', '', '', '', '', '', '', ''],
+        ['مبلغ خاطئ', '', PACKAGE, 'مائة', '2026-10-01', '', '3', ''],
+        ['باقة مجهولة', '', 'باقة غير موجودة', '100', '2026-10-01', '', '3', ''],
+        ['بدون انتهاء', '', 'أخرى', '100', '2026-10-01', '', '3', ''],
+    ])
+    result = import_customers(repo, path, repo.packages())
+
+    # السطر 1 رأس الملف، والسطر الفارغ لا يُحسب ولا يُعتبر خطأ
+    assert (result.processed, result.imported) == (5, 1)
+    assert [line for line, message in result.errors] == [3, 5, 6, 7]
+    messages = dict(result.errors)
+    assert '01/10/2026' in messages[3]
+    assert messages[5] == 'المبلغ يجب أن يكون رقماً'
+    assert messages[6] == 'الباقة غير موجودة: باقة غير موجودة'
+    assert [row[0] for row in customers(repo)] == ['صحيح']
+
+    report = os.path.join(directory, 'errors.csv')
+    write_error_report(result, report)
+    with open(report, newline='', encoding='utf-8-sig') as f:
+        lines = list(csv.reader(f))
+    assert lines[0] == ['السطر', 'الخطأ']
+    assert [int(row[0]) for row in lines[1:]] == [3, 5, 6, 7]
+
+
+def test_default_notification_days(env):
+    repo, directory = env
+    path = write_csv(
+        directory, [['أحمد', PACKAGE, '100', '2026-10-01']], header=['name', 'package', 'amount', 'start_date']
+    )
+    result = import_customers(repo, path, repo.packages())
+
+    assert result.imported == 1
+    assert customers(repo)[0][-1] == DEFAULT_NOTIFICATION_DAYS
+
+
+def test_batches_and_progress(env):
+    repo, directory = env
+    rows = [[f'عميل {number}', '', PACKAGE, '100', '2026-10-01', '', '3', ''] for number in range(25)]
+    rows[12][3] = 'x'
+    path = write_csv(directory, rows)
+    calls = []
+    result = import_customers(repo, path, repo.packages(), chunk_size=10, progress=lambda *args: calls.append(args))
+
+    assert (result.processed, result.imported) == (25, 24)
+    # الصف 13 من البيانات هو السطر 14 بعد رأس الملف
+    assert result.errors[0][0] == 14
+    assert calls == [(10, 10), (21, 20), (25, 24)]
+    assert repo.conn.execute('SELECT COUNT(*) FROM customers').fetchone()[0] == 24
+
+
+def test_missing_name_column(env):
+    repo, directory = env
+    path = write_csv(directory, [['010', PACKAGE]], header=['phone', 'package'])
+    with pytest.raises(ValidationError):
+        import_customers(repo, path, repo.packages())
+
+
+def test_unsupported_file(env):
+    repo, directory = env
+    path = os.path.join(directory, 'customers.txt')
+    open(path, 'w').close()
+    with pytest.raises(ValidationError):
+        import_customers(repo, path, repo.packages())
+
+
+def test_cell_text():
+    assert cell_text(None) == ''
+    assert cell_text(100.0) == '100'
+    assert cell_text(99.5) == '99.5'
+    assert cell_text(date(2026, 10, 1)) == '2026-10-01'
+    assert cell_text(datetime(2026, 10, 1, 12, 30)) == '2026-10-01'
@@ -0,0 +1,115 @@
+"""
+اختبار ترقية قاعدة بيانات بمخطط الإصدار الأول (جدول customers فقط، user_version = 0)
+عبر كل الترقيات حتى الإصدار الحالي
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from business import DEFAULT_PACKAGES, UNASSIGNED_PACKAGE
+from repository import MIGRATIONS, CustomerRepository
+
+# مخطط جدول العملاء في الإصدار الأول من التطبيق
+BASELINE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS customers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        phone TEXT,
+        package TEXT NOT NULL,
+        amount REAL NOT NULL,
+        start_date TEXT NOT NULL,
+        end_date TEXT NOT NULL,
+        notification_days INTEGER DEFAULT 5,
+        notes TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+BASELINE_ROWS = [
+    ('أحمد', '01012345678', 'باقة 100 جنيه شهرياً', 100, '2026-09-01', '2026-10-01', 5, ''),
+    ('محمد', '', 'باقة  جنيه - 6 شهور', 450, '2026-06-15', '2026-12-15', 3, 'ملاحظة'),
+    ('سارة', None, 'باقة  جنيه - سنة', 900, '2026-01-10', '2027-01-10', 7, None),
+    ('منى', '01198765432', 'باقة قديمة', 60, '2026-10-01', '2026-11-01', 5, ''),
+    # نص قائمة الباقات قبل الاختيار كان يُحفظ كباقة في الإصدار الأول
+    ('علي', '', 'اختر الباقة', 75, '2026-10-05', '2026-11-05', 5, ''),
+]
+
+
+@pytest.fixture
+def baseline():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'baseline.db')
+        conn = sqlite3.connect(path)
+        conn.execute(BASELINE_SCHEMA)
+        conn.executemany('''
+            INSERT INTO customers (name, phone, package, amount, start_date, end_date, notification_days, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', BASELINE_ROWS)
+        conn.commit()
+        conn.close()
+        yield path
+
+
+def test_baseline_upgrade(baseline):
+    repo = CustomerRepository(baseline)
+    try:
+        conn = repo.conn
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == len(MIGRATIONS)
+        assert [version for version, name, ms in repo.applied_migrations] == list(range(1, len(MIGRATIONS) + 1))
+
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(customers)')}
+        assert {
+            'alert_date', 'current_subscription_id', 'uuid', 'updated_at', 'device', 'package_id', 'alerted_for'
+        } <= columns
+
+        # كل عميل مرتبط بباقة موجودة بنفس الاسم
+        assert conn.execute('''
+            SELECT COUNT(*) FROM customers JOIN packages ON packages.id = customers.package_id
+            WHERE packages.name = customers.package
+        ''').fetchone()[0] == len(BASELINE_ROWS)
+        packages = repo.packages()
+        assert set(DEFAULT_PACKAGES) <= set(packages)
+        assert packages['باقة  جنيه - 6 شهور']['months'] == 6
+        assert packages['باقة  جنيه - سنة']['months'] == 12
+        assert packages['باقة قديمة']['months'] == 0
+        assert 'اختر الباقة' not in packages
+        assert conn.execute("SELECT package FROM customers WHERE name = 'علي'").fetchone()[0] == UNASSIGNED_PACKAGE
+
+        # تاريخ التنبيه وسجل الاشتراكات ومعرّفات المزامنة
+        assert conn.execute(
+            "SELECT alert_date FROM customers WHERE name = 'أحمد'"
+        ).fetchone()[0] == '2026-09-26'
+        assert conn.execute('SELECT COUNT(*) FROM subscriptions').fetchone()[0] == len(BASELINE_ROWS)
+        assert conn.execute(
+            'SELECT COUNT(*) FROM customers WHERE current_subscription_id IS NULL OR uuid IS NULL'
+        ).fetchone()[0] == 0
+
+        # الملخص اليومي يطابق العملاء
+        revenue, starts, ends, ends_amount, renewals = conn.execute(
+            'SELECT SUM(revenue), SUM(starts), SUM(ends), SUM(ends_amount), SUM(renewals) FROM daily_summary'
+        ).fetchone()
+        assert (starts, ends, renewals) == (len(BASELINE_ROWS), len(BASELINE_ROWS), 0)
+        assert revenue == ends_amount == sum(row[3] for row in BASELINE_ROWS)
+        assert conn.execute(
+            "SELECT SUM(starts) FROM daily_summary WHERE package = 'اختر الباقة'"
+        ).fetchone()[0] in (None, 0)
+
+        assert conn.execute('PRAGMA foreign_key_check').fetchall() == []
+        assert conn.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+    finally:
+        repo.close()
+
+    # فتح القاعدة مرة أخرى لا يطبق أي ترقية
+    repo = CustomerRepository(baseline)
+    try:
+        assert repo.applied_migrations == []
+        assert len(repo.list_customers()) == len(BASELINE_ROWS)
+        assert [row['name'] for row in repo.list_customers('منى')] == ['منى']
+    finally:
+        repo.close()
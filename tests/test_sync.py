@@ -0,0 +1,144 @@
+"""
+اختبارات المزامنة بين جهازين عبر خادم المزامنة: تطابق البيانات بعد الإرسال والاستقبال،
+وصول الحذف، ورفض الطلبات غير الصالحة برمز 400
+"""
+
+import gzip
+import json
+import os
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from business import validate_customer
+from repository import CustomerRepository
+from sync import SYNC_FIELDS, SyncClient
+from sync_server import create_server, valid_change
+
+PACKAGE = 'باقة 100 جنيه شهرياً'
+
+
+@pytest.fixture
+def env():
+    """خادم على منفذ متاح وجهازان بقاعدتين منفصلتين"""
+    with tempfile.TemporaryDirectory() as directory:
+        server = create_server(os.path.join(directory, 'server.db'), '127.0.0.1', 0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        devices = [CustomerRepository(os.path.join(directory, f'{name}.db')) for name in ('a', 'b')]
+        try:
+            yield f'http://127.0.0.1:{server.server_address[1]}', devices
+        finally:
+            for repo in devices:
+                repo.close()
+            server.shutdown()
+            server.server_close()
+            server.RequestHandlerClass.store.close()
+
+
+def customer(repo, name, notes=''):
+    return validate_customer({
+        'name': name,
+        'package': PACKAGE,
+        'amount': '100',
+        'start_date': '2026-10-01',
+        'notification_days': '3',
+        'notes': notes
+    }, repo.packages())
+
+
+def rows(repo):
+    """بيانات العملاء المتزامنة مرتبة بالمعرّف العام"""
+    return repo.conn.execute(f"SELECT uuid, {', '.join(SYNC_FIELDS)} FROM customers ORDER BY uuid").fetchall()
+
+
+def sync(url, repo):
+    return SyncClient(repo, url).sync()
+
+
+def post(url, body, headers=None):
+    """طلب /push مباشرة ويعيد رمز الرد"""
+    request = urllib.request.Request(url + '/push', data=body, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_push_pull_converge(env):
+    url, (a, b) = env
+    a.add_customer(customer(a, 'من الجهاز أ'))
+    b.add_customer(customer(b, 'من الجهاز ب'))
+
+    sync(url, a)
+    sync(url, b)
+    sync(url, a)
+    assert len(rows(a)) == 2
+    assert rows(a) == rows(b)
+
+    customer_id = b.conn.execute("SELECT id FROM customers WHERE name = 'من الجهاز أ'").fetchone()[0]
+    b.update_customer(customer_id, customer(b, 'من الجهاز أ', notes='تعديل من ب'))
+    sync(url, b)
+    result = sync(url, a)
+    assert result['applied'] == 1
+    assert rows(a) == rows(b)
+
+    # لا تغييرات جديدة: المزامنة لا ترسل ولا تطبق شيئاً
+    result = sync(url, a)
+    assert (result['pushed'], result['applied']) == (0, 0)
+
+
+def test_delete_reaches_other_device(env):
+    url, (a, b) = env
+    customer_id = a.add_customer(customer(a, 'سيُحذف'))
+    a.add_customer(customer(a, 'باقٍ'))
+    sync(url, a)
+    sync(url, b)
+    assert len(rows(b)) == 2
+
+    a.delete_customer(customer_id)
+    sync(url, a)
+    result = sync(url, b)
+    assert result['applied'] == 1
+    assert [row[1] for row in rows(b)] == ['باقٍ']
+    assert rows(a) == rows(b)
+
+
+def test_bad_push_rejected(env):
+    url, (a, b) = env
+    change = {
+        'uuid': 'u-1', 'updated_at': '2026-10-01T00:00:00', 'device': 'x', 'deleted': False,
+        'data': {field: '' for field in SYNC_FIELDS}
+    }
+    missing = dict(change, data={'name': 'ناقص'})
+    not_bool = dict(change, deleted='no')
+
+    headers = {'Content-Type': 'application/json'}
+    assert post(url, b'not json', headers) == 400
+    assert post(url, b'{"changes": {}}', headers) == 400
+    assert post(url, gzip.compress(b'{}'), dict(headers, **{'Content-Encoding': 'gzip'})) == 400
+    assert post(url, b'\x00\x01', dict(headers, **{'Content-Encoding': 'gzip'})) == 400
+    for bad in (missing, not_bool):
+        assert post(url, json.dumps({'changes': [change, bad]}).encode(), headers) == 400
+
+    # لم يُحفظ أي تغيير من الطلبات المرفوضة
+    assert sync(url, b)['received'] == 0
+    assert post(url, json.dumps({'changes': [change]}).encode(), headers) == 200
+
+
+def test_valid_change():
+    data = {field: '' for field in SYNC_FIELDS}
+    base = {'uuid': 'u', 'updated_at': 't', 'device': 'd'}
+    assert valid_change(dict(base, deleted=False, data=data))
+    assert valid_change(dict(base, deleted=True, data=None))
+    assert not valid_change(dict(base, deleted=0, data=data))
+    assert not valid_change(dict(base, deleted=False, data=None))
+    assert not valid_change(dict(base, deleted=False, data={k: v for k, v in data.items() if k != 'package'}))
+    assert not valid_change(['u'])
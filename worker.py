@@ -0,0 +1,101 @@
+"""
+تنفيذ عمليات قاعدة البيانات خارج thread الواجهة
+جميع المهام تُنفذ بالترتيب في thread واحد، لذلك تُطبق عمليات الكتابة
+بنفس ترتيب إرسالها وترى القراءات اللاحقة نتائجها.
+"""
+
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def call_directly(callback, *args):
+    """توصيل النتيجة في نفس الـ thread (للاستخدام بدون واجهة)"""
+    callback(*args)
+
+
+class DatabaseWorker:
+    """منفذ مهام قاعدة البيانات في thread منفصل"""
+
+    def __init__(self, deliver=call_directly, on_busy=None):
+        """
+        deliver: دالة (callback, *args) تنقل استدعاء النتيجة إلى thread الواجهة
+        on_busy: تُستدعى بـ True/False عند بدء وانتهاء انشغال المنفذ
+        """
+        self.deliver = deliver
+        self.on_busy = on_busy
+        self.tasks = queue.Queue()
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name='database-worker', daemon=True)
+        self.thread.start()
+
+    def submit(self, func, *args, on_result=None, on_error=None):
+        """إضافة مهمة إلى الطابور"""
+        with self.lock:
+            self.pending += 1
+            became_busy = self.pending == 1
+        if became_busy:
+            self.notify_busy(True)
+        self.tasks.put((func, args, on_result, on_error))
+
+    def call(self, func, *args):
+        """
+        تنفيذ مهمة بالترتيب مع باقي المهام وانتظار نتيجتها (أو إعادة رفع خطئها)
+        للاستخدام من threads أخرى فقط، وليس من thread المنفذ أو الواجهة
+        """
+        done = threading.Event()
+        outcome = {}
+
+        def task():
+            try:
+                outcome['result'] = func(*args)
+            except BaseException as e:
+                outcome['error'] = e
+            finally:
+                done.set()
+
+        self.submit(task)
+        done.wait()
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['result']
+
+    def run(self):
+        """حلقة تنفيذ المهام"""
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+
+            func, args, on_result, on_error = task
+            try:
+                result = func(*args)
+            except Exception as e:
+                if on_error is not None:
+                    self.deliver(on_error, e)
+                else:
+                    # مهام بدون on_error: الخطأ يظهر في السجل على الأقل
+                    logger.exception('Worker: فشلت المهمة %s', getattr(func, '__name__', func))
+            else:
+                if on_result is not None:
+                    self.deliver(on_result, result)
+
+            with self.lock:
+                self.pending -= 1
+                became_idle = self.pending == 0
+            if became_idle:
+                self.notify_busy(False)
+
+    def notify_busy(self, busy):
+        """إبلاغ الواجهة بحالة الانشغال"""
+        if self.on_busy is not None:
+            self.deliver(self.on_busy, busy)
+
+    def stop(self, wait=True):
+        """إيقاف المنفذ بعد إنهاء المهام الموجودة في الطابور"""
+        self.tasks.put(None)
+        if wait:
+            self.thread.join()